@@ -2,6 +2,9 @@
 ASGI config for GenEX project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP goes to Django; WebSocket paths listed in ``WEBSOCKET_ROUTES`` are
+served by plain ASGI handlers (run with an ASGI server, e.g.
+``gunicorn GenEX.asgi:application -k uvicorn.workers.UvicornWorker``).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -13,4 +16,21 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'GenEX.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up
+from voice_eval.streaming import pronunciation_websocket  # noqa: E402
+
+WEBSOCKET_ROUTES = {
+    '/ws/voice/pronunciation/': pronunciation_websocket,
+}
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        handler = WEBSOCKET_ROUTES.get(scope['path'])
+        if handler is None:
+            await send({'type': 'websocket.close', 'code': 4404})
+            return
+        return await handler(scope, receive, send)
+    return await django_application(scope, receive, send)
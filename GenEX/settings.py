@@ -158,6 +158,9 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # Media files (uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Internal nginx location (e.g. "/protected-media/") that serves MEDIA_ROOT: when set,
+# media downloads are handed off with X-Accel-Redirect after the permission check
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX', '')
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -188,6 +191,59 @@ LOGIN_URL = '/users/login/'
 SITE_URL = os.environ.get('SITE_URL', 'http://127.0.0.1:8000')
 GROQ_API_KEY = os.environ.get('GROQ_API_KEY', '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')
 
+# Voice evaluation processing
+# When enabled, uploads return 202 and are processed by `manage.py process_voice_evaluations`
+VOICE_EVAL_BACKGROUND_PROCESSING = os.environ.get('VOICE_EVAL_BACKGROUND_PROCESSING', 'False') == 'True'
+
+# Cascaded ASR: transcribe with Vosk first and run Whisper only when the mean Vosk
+# word confidence is below the threshold or the transcription quality check flags it
+VOICE_EVAL_ASR_CASCADE = os.environ.get('VOICE_EVAL_ASR_CASCADE', 'False') == 'True'
+VOICE_EVAL_CASCADE_MIN_CONFIDENCE = float(os.environ.get('VOICE_EVAL_CASCADE_MIN_CONFIDENCE', '0.85'))
+
+# Whisper profile ('fast', 'standard' or 'accurate') of evaluations uploaded by users.
+# Certificates always require 'accurate': requesting one re-transcribes other evaluations
+VOICE_EVAL_TRANSCRIPTION_PROFILE = os.environ.get('VOICE_EVAL_TRANSCRIPTION_PROFILE', 'standard')
+
+# Constrain Vosk to the words of the practice text (plus an unknown-word token)
+# when the expected text is known, instead of decoding with the full vocabulary
+VOICE_EVAL_PRACTICE_GRAMMAR = os.environ.get('VOICE_EVAL_PRACTICE_GRAMMAR', 'True') == 'True'
+
+# ML models loaded at worker boot, e.g. "whisper:base,spacy:en,spacy:fr,sentence_transformer"
+# (everything else is loaded lazily on first use)
+ML_WARMUP_MODELS = [m for m in os.environ.get('ML_WARMUP_MODELS', '').split(',') if m.strip()]
+
+# Local inference service (`manage.py run_inference_server`): when set, web workers
+# send Whisper/embedding/Vosk/summarization calls to this Unix socket instead of
+# loading their own copy of the models
+ML_INFERENCE_SOCKET = os.environ.get('ML_INFERENCE_SOCKET', '')
+ML_INFERENCE_TIMEOUT = int(os.environ.get('ML_INFERENCE_TIMEOUT', '300'))
+
+# Sentence-transformer micro-batching: concurrent encode requests arriving within
+# this many milliseconds are embedded together, up to the batch size
+VOICE_EVAL_EMBEDDING_BATCH_SIZE = int(os.environ.get('VOICE_EVAL_EMBEDDING_BATCH_SIZE', '64'))
+VOICE_EVAL_EMBEDDING_MAX_WAIT_MS = float(os.environ.get('VOICE_EVAL_EMBEDDING_MAX_WAIT_MS', '5'))
+
+# Memory-mapped embedding indexes (reference texts and past submissions for originality checking)
+VOICE_EVAL_INDEX_DIR = os.environ.get('VOICE_EVAL_INDEX_DIR', str(BASE_DIR / 'ml_models' / 'indexes'))
+# Single-row index updates appended to a language's delta segment before it is
+# merged into the base matrix (each merge rewrites the whole index)
+VOICE_EVAL_INDEX_MAX_DELTA_ROWS = int(os.environ.get('VOICE_EVAL_INDEX_MAX_DELTA_ROWS', '1024'))
+# Inverted lists of the past-submissions index scanned per originality check
+# (more lists: better recall, slower queries)
+VOICE_EVAL_SUBMISSION_NPROBE = int(os.environ.get('VOICE_EVAL_SUBMISSION_NPROBE', '8'))
+
+# Content-addressed cache of transcriptions and audio features (0 MB disables it)
+VOICE_EVAL_CACHE_DIR = os.environ.get('VOICE_EVAL_CACHE_DIR', str(BASE_DIR / 'ml_models' / 'cache'))
+VOICE_EVAL_CACHE_MAX_MB = int(os.environ.get('VOICE_EVAL_CACHE_MAX_MB', '256'))
+
+# Shared by all workers on the host (rendered testing-center maps, ...)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DJANGO_CACHE_DIR', str(BASE_DIR / 'ml_models' / 'django_cache')),
+    }
+}
+
 # Security settings for production
 if not DEBUG:
     # Render handles SSL termination, trust the X-Forwarded-Proto header
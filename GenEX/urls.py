@@ -19,6 +19,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from main.views import protected_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('main.urls')),  # Main frontend pages
@@ -29,9 +31,10 @@ urlpatterns = [
     path('chat/', include('chat_tutor.urls')),
      path('voice/', include('voice_eval.urls')),
     path('chatbot/', include('chatbot.urls')),
+    # Uploaded media, with per-user permission checks (also in production)
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:path>", protected_media, name='protected_media'),
 ]
 
-# Serve media and static files in development
+# Serve static files in development
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
@@ -6,6 +6,8 @@ import io
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
@@ -205,9 +207,28 @@ class CoursePDFGenerator:
             logger.error(f"Erreur lors de la sauvegarde du PDF: {str(e)}")
             raise e
 
-def generate_course_pdf_response(course, sections, filename=None):
-    """Génère une réponse HTTP avec le PDF du cours"""
+def course_pdf_validators(course):
+    """ETag et date Last-Modified du PDF d'un cours (le PDF ne dépend que du cours)"""
+    last_modified = int(course.updated_at.timestamp())
+    return f'"course-{course.pk}-{last_modified:x}"', last_modified
+
+
+def generate_course_pdf_response(course, sections, filename=None, request=None):
+    """Génère une réponse HTTP avec le PDF du cours
+
+    Avec ``request``, un GET conditionnel sur un cours inchangé reçoit 304
+    sans régénérer le PDF.
+    """
     try:
+        etag, last_modified = course_pdf_validators(course)
+        if request is not None:
+            conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if conditional is not None:
+                conditional['ETag'] = etag
+                conditional['Last-Modified'] = http_date(last_modified)
+                conditional['Cache-Control'] = 'private, no-cache'
+                return conditional
+
         generator = CoursePDFGenerator()
         pdf_content = generator.generate_course_pdf(course, sections)
         
@@ -219,6 +240,10 @@ def generate_course_pdf_response(course, sections, filename=None):
         # Créer la réponse HTTP
         response = HttpResponse(pdf_content, content_type='application/pdf')
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # Revalider à chaque fois : le cours peut être modifié à tout moment
+        response['Cache-Control'] = 'private, no-cache'
         
         return response
         
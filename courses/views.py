@@ -23,6 +23,8 @@ import json  # Ajouté pour gérer les données JSON dans course_summary
 from .models import Course, Folder
 from .forms import FolderForm, CourseCreateForm, CourseEditForm
 from .tts_service import TTSService
+from voice_eval.model_registry import model_registry
+from voice_eval.inference_client import inference_client
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -43,13 +45,18 @@ try:
 except ImportError:
     KEYBERT_AVAILABLE = False
 
-# Cache global pour les modèles et pipelines
-_model_cache = {}
-_pipeline_cache = {}
+# Modèles de résumé préchargés (partagés via le registre de modèles du processus)
+SUMMARY_MODELS = {
+    "fr": "moussaKam/barthez-orangesum-abstract",
+    "en": "distilbart-cnn-12-6"  # Modèle plus léger
+}
 
 # Préchargement des modèles
 def preload_models():
     """Précharge les modèles les plus utilisés en arrière-plan avec gestion des ressources"""
+    if inference_client.enabled:
+        # Les modèles sont chargés une seule fois par le service d'inférence
+        return
     if PSUTIL_AVAILABLE:
         max_memory = psutil.virtual_memory().available / (1024 ** 3)  # Mémoire en Go
     else:
@@ -58,30 +65,10 @@ def preload_models():
         logger.warning("Mémoire insuffisante pour précharger les modèles")
         return
 
-    models_to_preload = {
-        "fr": "moussaKam/barthez-orangesum-abstract",
-        "en": "distilbart-cnn-12-6"  # Modèle plus léger
-    }
-
-    def load_model(model_name):
-        try:
-            logger.info(f"Préchargement du modèle: {model_name}")
-            start_time = time.time()
-            tokenizer = AutoTokenizer.from_pretrained(model_name)
-            model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
-            _model_cache[model_name] = {
-                'tokenizer': tokenizer,
-                'model': model,
-                'loaded_at': time.time()
-            }
-            load_time = time.time() - start_time
-            logger.info(f"Modèle {model_name} préchargé en {load_time:.2f} secondes")
-        except Exception as e:
-            logger.error(f"Erreur préchargement {model_name}: {e}")
-
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        for model_name in models_to_preload.values():
-            executor.submit(load_model, model_name)
+    model_registry.warm_up(
+        [f"summarizer:{model_name}" for model_name in SUMMARY_MODELS.values()],
+        background=True
+    )
 
 # Lancer le préchargement au démarrage (désactivé en production pour économiser la mémoire)
 # Le chargement se fera à la demande lors de la première utilisation
@@ -236,27 +223,12 @@ def parse_course_content(content):
     return sections
 
 def get_cached_pipeline(model_name):
-    """Obtient un pipeline depuis le cache ou le crée"""
+    """Obtient un pipeline depuis le registre de modèles (chargé une seule fois par processus)"""
     if not TRANSFORMERS_AVAILABLE:
         return None
 
-    if model_name in _pipeline_cache:
-        return _pipeline_cache[model_name]
-
     try:
-        logger.info(f"Chargement du pipeline: {model_name}")
-        start_time = time.time()
-        summarizer = pipeline(
-            "summarization",
-            model=model_name,
-            tokenizer=model_name,
-            device=-1,  # CPU
-            framework="pt"
-        )
-        load_time = time.time() - start_time
-        logger.info(f"Pipeline {model_name} chargé en {load_time:.2f} secondes")
-        _pipeline_cache[model_name] = summarizer
-        return summarizer
+        return model_registry.get('summarizer', model_name)
     except Exception as e:
         logger.error(f"Erreur chargement pipeline {model_name}: {e}")
         return None
@@ -266,7 +238,7 @@ def extract_keywords(content, language="fr"):
     if not KEYBERT_AVAILABLE:
         return []
     try:
-        kw_model = KeyBERT()
+        kw_model = model_registry.get('keybert')
         keywords = kw_model.extract_keywords(
             content,
             keyphrase_ngram_range=(1, 2),
@@ -285,13 +257,16 @@ def generate_summary_with_preloaded_model(content, model_name, language, max_len
             logger.warning("Contenu trop court pour génération de résumé")
             return generate_fallback_summary(content, language, max_length)
 
-        model_data = _model_cache.get(model_name)
-        if not model_data:
+        if inference_client.enabled:
+            return generate_summary_with_pipeline(content, model_name, language, max_length)
+
+        summarizer = model_registry.get_if_loaded('summarizer', model_name)
+        if not summarizer:
             logger.error(f"Modèle {model_name} non trouvé dans le cache")
             return generate_summary_with_pipeline(content, model_name, language, max_length)
 
-        tokenizer = model_data['tokenizer']
-        model = model_data['model']
+        tokenizer = summarizer.tokenizer
+        model = summarizer.model
         clean_content = preprocess_content(content)
         max_input_length = 1024  # Augmenté pour traiter plus de contenu
         if len(clean_content) > max_input_length:
@@ -326,7 +301,11 @@ def generate_summary_with_preloaded_model(content, model_name, language, max_len
 def generate_summary_with_pipeline(content, model_name, language, max_length=400):
     """Utilise le pipeline standard pour la génération de résumé"""
     try:
-        summarizer = get_cached_pipeline(model_name)
+        if inference_client.enabled:
+            # Pipeline exécuté par le service d'inférence partagé
+            summarizer = lambda text, **options: inference_client.summarize(model_name, text, **options)
+        else:
+            summarizer = get_cached_pipeline(model_name)
         if not summarizer:
             return generate_fallback_summary(content, language, max_length)
 
@@ -1235,7 +1214,7 @@ def course_download_pdf(request, pk):
         filename = f"{safe_title}.pdf"
         
         # Générer et retourner le PDF
-        return generate_course_pdf_response(course, sections, filename)
+        return generate_course_pdf_response(course, sections, filename, request=request)
         
     except Exception as e:
         logger.error(f"Erreur lors du téléchargement du PDF: {str(e)}")
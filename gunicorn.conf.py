@@ -0,0 +1,7 @@
+"""Gunicorn configuration (picked up automatically from the project root)"""
+
+
+def post_fork(server, worker):
+    """Warm up the models listed in ML_WARMUP_MODELS in each new worker"""
+    from voice_eval.model_registry import warm_up_from_settings
+    warm_up_from_settings(background=True)
@@ -0,0 +1,217 @@
+"""
+Delivery of user media files (recordings, certificates, course PDFs and audio)
+Files are streamed with ETag/Last-Modified validation and HTTP Range
+support, after the same per-user permission checks as the pages that link
+to them
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+# ----------------------------------------------------------------------
+# Access rules: path prefix under MEDIA_ROOT -> check(user, relative_path)
+# ----------------------------------------------------------------------
+
+def _can_access_course(user, course):
+    # Same rule as the course views
+    return course.user_id == user.id or course.user.is_superuser
+
+
+def _voice_recording(user, path):
+    from voice_eval.models import VoiceEvaluation
+    return VoiceEvaluation.objects.filter(audio_file=path, user=user).exists()
+
+
+def _certificate(user, path):
+    from voice_eval.models import Certificate
+    return Certificate.objects.filter(pdf_file=path, user=user).exists()
+
+
+def _pronunciation_practice(user, path):
+    from voice_eval.models import PronunciationPractice
+    return PronunciationPractice.objects.filter(audio_file=path, user=user).exists()
+
+
+def _course_from_name(path):
+    # Generated course files are named course_<id>_... (TTSService, save_course_pdf)
+    from courses.models import Course
+    match = re.match(r'course_(\d+)_', os.path.basename(path))
+    return Course.objects.filter(pk=match.group(1)).select_related('user').first() if match else None
+
+
+def _course_pdf(user, path):
+    from courses.models import Course
+    course = Course.objects.filter(pdf_file=path).select_related('user').first() or _course_from_name(path)
+    return course is not None and _can_access_course(user, course)
+
+
+def _course_audio(user, path):
+    course = _course_from_name(path)
+    return course is not None and _can_access_course(user, course)
+
+
+def _chatbot_file(user, path):
+    from chatbot.models import UploadedFile
+    return UploadedFile.objects.filter(file=path, user=user).exists()
+
+
+MEDIA_ACCESS_RULES = {
+    'voice_recordings/': _voice_recording,
+    'certificates/': _certificate,
+    'pronunciation_practice/': _pronunciation_practice,
+    'courses/pdfs/': _course_pdf,
+    'course_audio/': _course_audio,
+    'chatbot_files/': _chatbot_file,
+}
+
+
+def user_can_access(user, path):
+    """Whether a user may download a media file (path relative to MEDIA_ROOT)"""
+    if not user.is_authenticated:
+        return False
+    if user.is_staff:
+        return True
+    for prefix, check in MEDIA_ACCESS_RULES.items():
+        if path.startswith(prefix):
+            return check(user, path)
+    return False
+
+
+# ----------------------------------------------------------------------
+# Streaming with validators and ranges
+# ----------------------------------------------------------------------
+
+def file_etag(stat_result):
+    """Strong validator from size and modification time"""
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def serve_file(request, full_path, filename=None, as_attachment=False, content_type=None,
+               cache_control='private, max-age=3600', relative_path=None):
+    """
+    Stream a file with conditional GET and Range support
+
+    Args:
+        request: HttpRequest
+        full_path: Absolute path of the file
+        filename: Download name (defaults to the file's name)
+        as_attachment: Send Content-Disposition: attachment
+        content_type: MIME type (guessed from the name by default)
+        cache_control: Cache-Control header value
+        relative_path: Path under MEDIA_ROOT, used for X-Accel-Redirect offload
+
+    Returns:
+        200, 206, 304, 412 or 416 response
+    """
+    stat_result = os.stat(full_path)
+    size = stat_result.st_size
+    etag = file_etag(stat_result)
+    last_modified = int(stat_result.st_mtime)
+    content_type = content_type or mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    filename = filename or os.path.basename(full_path)
+
+    # 304 Not Modified / 412 Precondition Failed
+    conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if conditional is not None:
+        _set_validators(conditional, etag, last_modified, cache_control)
+        return conditional
+
+    accel_prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '')
+    if accel_prefix and relative_path:
+        # Let the front proxy (nginx internal location) send the bytes, ranges included
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + relative_path
+        response['Content-Disposition'] = _disposition(filename, as_attachment)
+        _set_validators(response, etag, last_modified, cache_control)
+        return response
+
+    byte_range = _requested_range(request, size, etag, last_modified)
+    if byte_range == 'unsatisfiable':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(
+            open(full_path, 'rb'), as_attachment=as_attachment, filename=filename, content_type=content_type
+        )
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read_range(full_path, start, end - start + 1), status=206, content_type=content_type
+        )
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Disposition'] = _disposition(filename, as_attachment)
+
+    response['Accept-Ranges'] = 'bytes'
+    _set_validators(response, etag, last_modified, cache_control)
+    return response
+
+
+def _requested_range(request, size, etag, last_modified):
+    """(start, end) inclusive, None for the full file, or 'unsatisfiable'"""
+    header = request.META.get('HTTP_RANGE', '').strip()
+    if not header or request.method != 'GET':
+        return None
+
+    # A stale If-Range means the client's partial copy is outdated: send everything
+    if_range = request.META.get('HTTP_IF_RANGE', '').strip()
+    if if_range:
+        if if_range.startswith('"') or if_range.startswith('W/'):
+            if if_range != etag:
+                return None
+        elif parse_http_date_safe(if_range) != last_modified:
+            return None
+
+    match = _RANGE_RE.match(header)
+    if not match or match.groups() == ('', ''):
+        # Multiple or malformed ranges: ignoring the header is allowed
+        return None
+
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return 'unsatisfiable'
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return 'unsatisfiable'
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _disposition(filename, as_attachment):
+    # Same header FileResponse builds for full responses
+    return content_disposition_header(as_attachment, filename) or 'inline'
+
+
+def _set_validators(response, etag, last_modified, cache_control):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if cache_control:
+        response['Cache-Control'] = cache_control
@@ -1,11 +1,19 @@
+import os
+
 from django.shortcuts import render, redirect
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth.forms import PasswordResetForm
 from django.core.mail import send_mail
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404
+from django.utils._os import safe_join
 from users.models import User
 
+from .media import serve_file, user_can_access
+
 
 def home(request):
     """Home page view"""
@@ -147,3 +155,17 @@ def dashboard(request):
         'user': request.user,
     }
     return render(request, 'main/dashboard.html', context)
+
+
+def protected_media(request, path):
+    """Serve an uploaded file to the users allowed to see it"""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('File not found')
+
+    # Same 404 for missing and forbidden files, so paths cannot be probed
+    if not os.path.isfile(full_path) or not user_can_access(request.user, path):
+        raise Http404('File not found')
+
+    return serve_file(request, full_path, relative_path=path)
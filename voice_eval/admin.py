@@ -1,20 +1,27 @@
+from datetime import timedelta
+
 from django.contrib import admin
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+
 from .models import (
     VoiceEvaluation, ReferenceText, VoiceEvaluationHistory,
-    Certificate, PronunciationPractice, TestingCenter
+    Certificate, PronunciationPractice, TestingCenter, VoiceProgressSummary
 )
+from .processing_service import stage_timing_percentiles
 
 
 @admin.register(VoiceEvaluation)
 class VoiceEvaluationAdmin(admin.ModelAdmin):
     list_display = ('user', 'language', 'estimated_level', 'total_score', 'processing_status', 'created_at')
-    list_filter = ('language', 'estimated_level', 'processing_status', 'created_at')
+    list_filter = ('language', 'estimated_level', 'processing_status', 'transcription_profile', 'created_at')
     search_fields = ('user__username', 'transcription', 'theme')
     readonly_fields = (
         'transcription', 'fluency_score', 'vocabulary_score', 'structure_score',
         'verbal_score', 'pitch_score', 'pace_score', 'energy_score',
         'paraverbal_score', 'originality_score', 'total_score',
-        'estimated_level', 'feedback', 'audio_features', 'duration', 'created_at'
+        'estimated_level', 'feedback', 'audio_features', 'stage_timings', 'duration', 'created_at'
     )
     
     fieldsets = (
@@ -22,7 +29,7 @@ class VoiceEvaluationAdmin(admin.ModelAdmin):
             'fields': ('user', 'audio_file', 'language', 'theme', 'processing_status', 'error_message')
         }),
         ('Transcription', {
-            'fields': ('transcription', 'duration')
+            'fields': ('transcription', 'transcription_profile', 'duration')
         }),
         ('Verbal Communication', {
             'fields': ('fluency_score', 'vocabulary_score', 'structure_score', 'verbal_score')
@@ -37,10 +44,53 @@ class VoiceEvaluationAdmin(admin.ModelAdmin):
             'fields': ('total_score', 'estimated_level', 'feedback')
         }),
         ('Technical Data', {
-            'fields': ('audio_features', 'created_at'),
+            'fields': ('audio_features', 'stage_timings', 'created_at'),
             'classes': ('collapse',)
         }),
     )
+    change_list_template = 'admin/voice_eval/voiceevaluation/change_list.html'
+
+    # Windows offered on the stage timings page, in days
+    TIMING_WINDOWS = (1, 7, 30, 90)
+
+    def get_urls(self):
+        urls = [
+            path(
+                'stage-timings/',
+                self.admin_site.admin_view(self.stage_timings_view),
+                name='voice_eval_voiceevaluation_stage_timings',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def stage_timings_view(self, request):
+        """p50/p95/p99 wall-clock and CPU time per pipeline stage over a window"""
+        try:
+            days = int(request.GET.get('days', 7))
+        except ValueError:
+            days = 7
+        if days not in self.TIMING_WINDOWS:
+            days = 7
+
+        evaluations = VoiceEvaluation.objects.filter(
+            processing_status='completed',
+            processing_finished_at__gte=timezone.now() - timedelta(days=days),
+        )
+        language = request.GET.get('language')
+        if language:
+            evaluations = evaluations.filter(language=language)
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Evaluation stage timings',
+            'days': days,
+            'windows': self.TIMING_WINDOWS,
+            'language': language or '',
+            'languages': VoiceEvaluation.LANGUAGE_CHOICES,
+            'rows': stage_timing_percentiles(evaluations.values_list('stage_timings', flat=True).iterator()),
+        }
+        return TemplateResponse(request, 'admin/voice_eval/voiceevaluation/stage_timings.html', context)
 
 
 @admin.register(ReferenceText)
@@ -59,6 +109,14 @@ class VoiceEvaluationHistoryAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at',)
 
 
+@admin.register(VoiceProgressSummary)
+class VoiceProgressSummaryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'evaluation_count', 'latest_score', 'best_score', 'latest_level', 'updated_at')
+    list_filter = ('latest_level',)
+    search_fields = ('user__username',)
+    readonly_fields = [field.name for field in VoiceProgressSummary._meta.fields]
+
+
 @admin.register(Certificate)
 class CertificateAdmin(admin.ModelAdmin):
     list_display = ('user', 'certificate_id', 'level', 'score', 'issued_date')
@@ -3,59 +3,147 @@ AI Service for Voice Evaluation
 Handles speech-to-text, NLP analysis, audio analysis, and originality checking
 """
 from __future__ import annotations
+import logging
 import os
 import numpy as np
 import json
 from typing import Dict, List, Tuple, Optional
 import tempfile
 
+from django.conf import settings
+
+from .audio_ingest import AudioDecodeError, DecodedAudio, load_audio, to_pcm16
+from .model_registry import model_registry
+from .inference_client import inference_client
+from .embedding_service import embedding_service
+from .paraverbal_features import FEATURES_VERSION as PARAVERBAL_FEATURES_VERSION, extract_paraverbal_metrics
+from .result_cache import result_cache
+from .vad import VAD_VERSION, SpeechChunk, speech_chunks
+from .text_stats import FALLBACK_FILLER_WORDS, text_stats
+from .verbal_features import VerbalStats, collect_verbal_stats
+
+logger = logging.getLogger(__name__)
+
 
 class VoiceEvaluationService:
     """Main service class for voice evaluation processing"""
     
-    def __init__(self):
-        self.whisper_model = None
-        self.nlp_en = None
-        self.nlp_fr = None
-        self.sentence_model = None
-        
+    WHISPER_MODEL_SIZE = 'base'
+    
+    # Whisper model and decoding options per transcription profile
+    # (VoiceEvaluation.transcription_profile):
+    # - fast: small model, greedy decoding (no temperature fallback), no word
+    #   alignment pass; confidence comes from the segments' avg_logprob
+    # - standard: the default model with word-level confidence
+    # - accurate: larger model, beam search, word-level confidence
+    TRANSCRIPTION_PROFILES = {
+        'fast': {'model_size': 'tiny', 'options': {'temperature': 0.0, 'word_timestamps': False}},
+        'standard': {'model_size': WHISPER_MODEL_SIZE, 'options': {'word_timestamps': True}},
+        'accurate': {'model_size': 'small', 'options': {'beam_size': 5, 'best_of': 5, 'word_timestamps': True}},
+    }
+    DEFAULT_TRANSCRIPTION_PROFILE = 'standard'
+    
+    # Cascaded ASR (VOICE_EVAL_ASR_CASCADE): a pause this long (seconds)
+    # between two Vosk words ends a sentence
+    CASCADE_SENTENCE_PAUSE = 0.7
+    
+    @property
+    def whisper_model(self):
+        return model_registry.get('whisper', self.WHISPER_MODEL_SIZE)
+    
+    @property
+    def nlp_en(self):
+        return model_registry.get('spacy', 'en')
+    
+    @property
+    def nlp_fr(self):
+        return model_registry.get('spacy', 'fr')
+    
+    @property
+    def sentence_model(self):
+        return model_registry.get('sentence_transformer')
+    
     def initialize_models(self):
-        """Lazy load models to avoid loading on import"""
-        try:
-            # Import here to avoid loading on module import
-            import whisper
-            from sentence_transformers import SentenceTransformer
-            
-            if self.whisper_model is None:
-                print("Loading Whisper model...")
-                self.whisper_model = whisper.load_model("base")
-            
-            # Try to load spaCy, but use fallback if unavailable
-            if self.nlp_en is None:
-                try:
-                    import spacy
-                    print("Loading English spaCy model...")
-                    self.nlp_en = spacy.load("en_core_web_sm")
-                except (ImportError, OSError) as e:
-                    print(f"spaCy not available ({e}), using fallback NLP")
-                    self.nlp_en = None
-            
-            if self.nlp_fr is None:
-                try:
-                    import spacy
-                    print("Loading French spaCy model...")
-                    self.nlp_fr = spacy.load("fr_core_news_sm")
-                except (ImportError, OSError) as e:
-                    print(f"French model not available ({e}), using fallback NLP")
-                    self.nlp_fr = None
-            
-            if self.sentence_model is None:
-                print("Loading sentence transformer...")
-                self.sentence_model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
-                
-        except ImportError as e:
-            print(f"Error importing required libraries: {e}")
-            raise
+        """
+        Load every model used by the service
+        
+        Models are otherwise loaded lazily, one at a time, through the
+        process-wide model registry on first use.
+        """
+        self.whisper_model
+        self.nlp_en
+        self.nlp_fr
+        self.sentence_model
+    
+    def run_whisper(self, audio_input, language: str, model_size: Optional[str] = None, **options) -> Dict:
+        """
+        Run Whisper in-process, or in the shared inference service when
+        ML_INFERENCE_SOCKET is configured
+        
+        Args:
+            audio_input: 16 kHz float32 samples or a path to an audio file
+            language: Language code
+            model_size: Whisper checkpoint (defaults to WHISPER_MODEL_SIZE)
+            **options: Passed to ``whisper_model.transcribe``
+        """
+        model_size = model_size or self.WHISPER_MODEL_SIZE
+        if inference_client.enabled:
+            samples = audio_input if isinstance(audio_input, np.ndarray) else load_audio(audio_input).samples
+            return inference_client.transcribe(samples, language, model_size, **options)
+        
+        model = model_registry.get('whisper', model_size)
+        return model.transcribe(audio_input, language=language, **options)
+    
+    def encode_texts(self, texts):
+        """
+        Sentence-transformer embeddings, in-process or through the inference service
+        
+        Concurrent calls are micro-batched by the embedding service.
+        
+        Args:
+            texts: A single string or a list of strings
+        
+        Returns:
+            1-D array for a string, 2-D array (one row per text) for a list
+        """
+        if isinstance(texts, str):
+            return embedding_service.encode(texts)
+        return embedding_service.encode_many(texts)
+    
+    def _transcribe_chunks(self, audio: DecodedAudio, chunks: List[SpeechChunk], language: str,
+                           model_size: Optional[str] = None, **options) -> Dict:
+        """
+        Run Whisper on each speech chunk and merge the results
+        
+        Segment and word timestamps are mapped back to the source recording.
+        Chunks run one after the other: Whisper's decoder keeps its KV cache
+        in hooks on the shared model, and the inference service runs one
+        call per model at a time.
+        
+        Returns:
+            Whisper-style result (text, language, segments) for the whole recording
+        """
+        merged = {'text': '', 'language': language, 'segments': []}
+        texts = []
+        for chunk in chunks:
+            result = self.run_whisper(chunk.extract(audio.samples), language, model_size, **options)
+            merged['language'] = result.get('language', merged['language'])
+            texts.append(result.get('text', '').strip())
+            for segment in result.get('segments', []):
+                segment = {**self._to_source_times(segment, chunk), 'id': len(merged['segments'])}
+                if segment.get('words'):
+                    segment['words'] = [self._to_source_times(word, chunk) for word in segment['words']]
+                merged['segments'].append(segment)
+        merged['text'] = ' '.join(text for text in texts if text)
+        return merged
+    
+    @staticmethod
+    def _to_source_times(entry: Dict, chunk: SpeechChunk) -> Dict:
+        """Copy of a Whisper segment or word with start/end on the source recording"""
+        return {
+            **entry,
+            **{key: round(chunk.source_time(entry[key]), 2) for key in ('start', 'end') if key in entry},
+        }
     
     def _check_transcription_quality(self, text: str, confidence: float) -> List[str]:
         """
@@ -68,8 +156,7 @@ class VoiceEvaluationService:
         Returns:
             List of quality issue warnings
         """
-        import re
-        
+        stats = text_stats(text)
         issues = []
         
         # 1. Check confidence score
@@ -79,74 +166,86 @@ class VoiceEvaluationService:
             issues.append("MEDIUM_CONFIDENCE: Transcription may have some errors. Check audio quality.")
         
         # 2. Check for gibberish patterns
-        words = text.lower().split()
-        if len(words) > 5:
+        if stats.token_count > 5:
             # Check for excessive repetition
-            unique_words = set(words)
-            if len(unique_words) / len(words) < 0.3:
+            if stats.type_token_ratio < 0.3:
                 issues.append("REPETITIVE_TEXT: Too many repeated words detected.")
             
             # Check for nonsensical word combinations
-            nonsense_patterns = [
-                r'\b(\w+)\s+and\s+\1\s+and\b',  # "book and book and"
-                r'\b(a|an|the)\s+(a|an|the)\s+(a|an|the)\b',  # "a a the"
-                r'\b\w{1,2}\s+\w{1,2}\s+\w{1,2}\s+\w{1,2}\s+\w{1,2}\b',  # Too many short words
-            ]
-            
-            for pattern in nonsense_patterns:
-                if re.search(pattern, text.lower()):
-                    issues.append("NONSENSICAL_PATTERN: Unusual word patterns detected. May indicate transcription errors.")
-                    break
+            if stats.has_nonsense_pattern:
+                issues.append("NONSENSICAL_PATTERN: Unusual word patterns detected. May indicate transcription errors.")
         
         # 3. Check for very short or empty transcription
         if len(text.strip()) < 10:
             issues.append("TOO_SHORT: Transcription is too short. Audio may be unclear or silent.")
         
         # 4. Check for missing punctuation (might indicate poor segmentation)
-        if len(text) > 50 and not re.search(r'[.!?,;:]', text):
+        if len(text) > 50 and not stats.punctuation:
             issues.append("NO_PUNCTUATION: No punctuation detected. Transcription quality may be poor.")
         
         # 5. Check for excessive numbers or random characters
-        if len(words) > 5:
-            number_count = sum(1 for w in words if w.isdigit())
-            if number_count / len(words) > 0.3:
-                issues.append("EXCESSIVE_NUMBERS: Too many numbers detected. May indicate audio noise.")
+        if stats.token_count > 5 and stats.digit_ratio > 0.3:
+            issues.append("EXCESSIVE_NUMBERS: Too many numbers detected. May indicate audio noise.")
         
         return issues
     
-    def transcribe_audio(self, audio_path: str, language: str = 'en') -> Dict:
+    def transcribe_audio(self, audio_path: str, language: str = 'en', audio: Optional[DecodedAudio] = None,
+                         profile: str = DEFAULT_TRANSCRIPTION_PROFILE) -> Dict:
         """
         Transcribe audio file using Whisper
         
         Args:
             audio_path: Path to audio file
             language: Language code ('en' or 'fr')
+            audio: Already decoded 16 kHz buffer (skips Whisper's own ffmpeg decode)
+            profile: Transcription profile (see TRANSCRIPTION_PROFILES)
         
         Returns:
             Dict with transcription and metadata including confidence scores
         """
         import os
         
+        if profile not in self.TRANSCRIPTION_PROFILES:
+            raise ValueError(f"Unknown transcription profile: {profile}")
+        whisper_settings = self.TRANSCRIPTION_PROFILES[profile]
+        
         # Check if file exists
-        if not os.path.exists(audio_path):
+        if audio is None and not os.path.exists(audio_path):
             return {
                 'text': '',
                 'error': f'Audio file not found: {audio_path}',
                 'success': False
             }
         
-        self.initialize_models()
-        
         try:
             print(f"Transcribing audio file: {audio_path}")
-            print(f"File size: {os.path.getsize(audio_path)} bytes")
+            if audio is not None:
+                logger.debug("Using decoded buffer: %s", audio)
+            else:
+                print(f"File size: {os.path.getsize(audio_path)} bytes")
+                audio = load_audio(audio_path)
             
-            result = self.whisper_model.transcribe(
-                audio_path,
-                language=language,
+            # Same recording, same model and language: reuse the earlier result
+            cache_key = result_cache.make_key(
+                audio.digest, 'whisper', profile, whisper_settings['model_size'], language, VAD_VERSION
+            )
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                print("Transcription served from cache")
+                return cached
+            
+            # Only the speech is transcribed, one Whisper window per chunk
+            chunks = speech_chunks(audio.samples, audio.sample_rate)
+            logger.debug("Speech: %.1fs of %.1fs in %d chunk(s)",
+                         sum(c.duration for c in chunks), audio.duration, len(chunks))
+            result = self._transcribe_chunks(
+                audio,
+                chunks,
+                language,
+                model_size=whisper_settings['model_size'],
                 task='transcribe',
                 verbose=False,
-                word_timestamps=True  # Get word-level confidence
+                **whisper_settings['options']
             )
             
             # Calculate average confidence from segments
@@ -171,14 +270,17 @@ class VoiceEvaluationService:
             # Quality check: Detect poor transcription
             quality_issues = self._check_transcription_quality(transcribed_text, avg_confidence)
             
-            return {
+            transcription = {
                 'text': transcribed_text,
                 'language': result.get('language', language),
                 'segments': result.get('segments', []),
                 'confidence': avg_confidence,
                 'quality_issues': quality_issues,
+                'profile': profile,
                 'success': True
             }
+            result_cache.set(cache_key, transcription)
+            return transcription
         except FileNotFoundError as e:
             error_msg = "FFmpeg not found. Please install FFmpeg to process audio files. See INSTALL_FFMPEG.md for instructions."
             print(f"FFmpeg error: {error_msg}")
@@ -204,6 +306,93 @@ class VoiceEvaluationService:
                 'success': False
             }
     
+    def transcribe_cascaded(self, audio_path: str, language: str = 'en', audio: Optional[DecodedAudio] = None,
+                            profile: str = DEFAULT_TRANSCRIPTION_PROFILE) -> Dict:
+        """
+        Vosk first pass, Whisper only when the Vosk transcription is not trusted
+        
+        Whisper runs when the mean Vosk word confidence is below
+        VOICE_EVAL_CASCADE_MIN_CONFIDENCE, when the quality check flags the
+        Vosk text, when Vosk is unavailable, and always for the 'accurate'
+        profile.
+        
+        Args:
+            audio_path: Path to audio file
+            language: Language code ('en' or 'fr')
+            audio: Already decoded 16 kHz buffer
+            profile: Transcription profile used if Whisper runs
+        
+        Returns:
+            Same dict as transcribe_audio, plus 'engine' ('vosk' or 'whisper')
+        """
+        if profile != 'accurate':
+            try:
+                if audio is None:
+                    audio = load_audio(audio_path)
+                first_pass = self._transcribe_vosk(audio, language)
+            except (AudioDecodeError, OSError) as e:
+                logger.warning("Vosk first pass skipped: %s", e)
+                first_pass = None
+            
+            min_confidence = getattr(settings, 'VOICE_EVAL_CASCADE_MIN_CONFIDENCE', 0.85)
+            if first_pass and first_pass['confidence'] >= min_confidence and not first_pass['quality_issues']:
+                return first_pass
+            if first_pass:
+                logger.debug("Vosk confidence %.2f, issues %s: refining with Whisper",
+                             first_pass['confidence'], first_pass['quality_issues'])
+        
+        return {**self.transcribe_audio(audio_path, language, audio=audio, profile=profile), 'engine': 'whisper'}
+    
+    def _transcribe_vosk(self, audio: DecodedAudio, language: str) -> Optional[Dict]:
+        """Vosk transcription in transcribe_audio's format, or None if Vosk is unavailable"""
+        from .pronunciation_service import pronunciation_service
+        
+        try:
+            result = pronunciation_service.recognize_pcm(to_pcm16(audio), audio.sample_rate, language)
+        except Exception as e:
+            logger.warning("Vosk transcription error: %s", e)
+            return None
+        if not result.get('success'):
+            return None
+        
+        # Vosk gives neither punctuation nor casing: sentences are cut at pauses
+        segments = []
+        words = result.get('words', [])
+        start = 0
+        for i in range(1, len(words) + 1):
+            if i == len(words) or words[i]['start'] - words[i - 1]['end'] >= self.CASCADE_SENTENCE_PAUSE:
+                segments.append(self._vosk_sentence(words[start:i], language))
+                start = i
+        
+        text = ' '.join(segment['text'] for segment in segments)
+        confidence = float(np.mean([w.get('conf', 0.0) for w in words])) if words else 0.0
+        return {
+            'text': text,
+            'language': language,
+            'segments': segments,
+            'confidence': confidence,
+            'quality_issues': self._check_transcription_quality(text, confidence),
+            'engine': 'vosk',
+            'success': True
+        }
+    
+    @staticmethod
+    def _vosk_sentence(words: List[Dict], language: str) -> Dict:
+        """Whisper-style segment from consecutive Vosk words"""
+        tokens = [w['word'] for w in words]
+        if language == 'en':
+            tokens = ['I' if t == 'i' else t for t in tokens]
+        text = ' '.join(tokens)
+        return {
+            'start': words[0]['start'],
+            'end': words[-1]['end'],
+            'text': text[:1].upper() + text[1:] + '.',
+            'words': [
+                {'word': w['word'], 'start': w['start'], 'end': w['end'], 'probability': w.get('conf', 0.0)}
+                for w in words
+            ],
+        }
+    
     def analyze_verbal_communication(self, text: str, language: str = 'en', quality_issues: List[str] = None) -> Dict:
         """
         Analyze verbal communication aspects with quality awareness
@@ -216,24 +405,47 @@ class VoiceEvaluationService:
         Returns:
             Dict with fluency, vocabulary, and structure scores
         """
-        self.initialize_models()
-        
         nlp = self.nlp_en if language == 'en' else self.nlp_fr
         
         if nlp is None:
             # Use fallback simple NLP when spaCy is not available
             return self._analyze_verbal_simple(text, language, quality_issues)
         
-        doc = nlp(text)
+        return self._score_verbal(collect_verbal_stats(nlp(text), text))
+    
+    def analyze_verbal_batch(self, texts: List[str], language: str = 'en', batch_size: int = 32,
+                             quality_issues: Optional[List[List[str]]] = None) -> List[Dict]:
+        """
+        Analyze many transcriptions of one language (re-scoring)
+        
+        Documents are parsed in batches through nlp.pipe instead of one
+        pipeline call per text.
+        
+        Args:
+            texts: Transcribed texts
+            language: Language code
+            batch_size: Documents per nlp.pipe batch
+            quality_issues: Transcription quality issues of each text
         
-        # Fluency Analysis
-        fluency_score = self._analyze_fluency(doc, text)
+        Returns:
+            One analyze_verbal_communication result per text, in order
+        """
+        nlp = self.nlp_en if language == 'en' else self.nlp_fr
         
-        # Vocabulary Analysis
-        vocabulary_score = self._analyze_vocabulary(doc, language)
+        if nlp is None:
+            issues = quality_issues or [None] * len(texts)
+            return [self._analyze_verbal_simple(text, language, text_issues) for text, text_issues in zip(texts, issues)]
         
-        # Structure Analysis
-        structure_score = self._analyze_structure(doc)
+        return [
+            self._score_verbal(collect_verbal_stats(doc, text))
+            for doc, text in zip(nlp.pipe(texts, batch_size=batch_size), texts)
+        ]
+    
+    def _score_verbal(self, stats: VerbalStats) -> Dict:
+        """Fluency, vocabulary and structure scores from one document's statistics"""
+        fluency_score = self._analyze_fluency(stats)
+        vocabulary_score = self._analyze_vocabulary(stats)
+        structure_score = self._analyze_structure(stats)
         
         # Calculate overall verbal score
         verbal_score = (fluency_score + vocabulary_score + structure_score) / 3
@@ -244,9 +456,9 @@ class VoiceEvaluationService:
             'structure_score': round(structure_score, 2),
             'verbal_score': round(verbal_score, 2),
             'details': {
-                'word_count': len([token for token in doc if not token.is_punct]),
-                'sentence_count': len(list(doc.sents)),
-                'unique_words': len(set([token.lemma_.lower() for token in doc if not token.is_punct and not token.is_stop])),
+                'word_count': stats.word_count,
+                'sentence_count': stats.sentence_count,
+                'unique_words': stats.unique_content_lemmas,
             }
         }
     
@@ -260,23 +472,7 @@ class VoiceEvaluationService:
             language: Language code
             quality_issues: List of transcription quality issues
         """
-        import re
-        import string
-        
-        # Tokenize into sentences
-        sentences = re.split(r'[.!?]+', text)
-        sentences = [s.strip() for s in sentences if s.strip()]
-        
-        # Tokenize into words
-        words = re.findall(r'\b\w+\b', text.lower())
-        
-        # Remove common stop words (basic list)
-        stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 
-                     'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'been',
-                     'le', 'la', 'les', 'un', 'une', 'des', 'de', 'et', 'ou', 'dans', 'sur'}
-        
-        content_words = [w for w in words if w not in stop_words and len(w) > 2]
-        unique_words = set(content_words)
+        stats = text_stats(text)
         
         # Apply quality penalty if there are transcription issues
         quality_penalty = 1.0
@@ -294,34 +490,31 @@ class VoiceEvaluationService:
         
         # Fluency Analysis (simplified)
         fluency_score = 50.0
-        word_count = len(words)
+        word_count = stats.word_count
         
         if 100 <= word_count <= 300:
             fluency_score += 20
         elif 50 <= word_count < 100 or 300 < word_count <= 500:
             fluency_score += 10
         
-        if len(sentences) > 0:
-            avg_sentence_length = word_count / len(sentences)
+        if stats.sentence_count > 0:
+            avg_sentence_length = word_count / stats.sentence_count
             if 10 <= avg_sentence_length <= 20:
                 fluency_score += 15
             elif 5 <= avg_sentence_length < 10 or 20 < avg_sentence_length <= 30:
                 fluency_score += 5
         
         # Check for filler words
-        filler_words = ['um', 'uh', 'like', 'you know', 'basically', 'actually', 'euh', 'ben']
-        filler_count = sum(text.lower().count(filler) for filler in filler_words)
-        fluency_score -= min(filler_count * 2, 20)
+        fluency_score -= min(stats.filler_count(FALLBACK_FILLER_WORDS) * 2, 20)
         
         # Vocabulary Analysis (simplified)
         vocabulary_score = 50.0
         
-        if len(words) > 0:
-            ttr = len(unique_words) / len(content_words) if content_words else 0
-            vocabulary_score += min(ttr * 30, 25)
+        if stats.word_count > 0:
+            vocabulary_score += min(stats.content_type_token_ratio * 30, 25)
         
-        if content_words:
-            avg_word_length = sum(len(w) for w in content_words) / len(content_words)
+        if stats.content_words:
+            avg_word_length = stats.average_content_word_length
             if avg_word_length >= 5:
                 vocabulary_score += 15
             elif avg_word_length >= 4:
@@ -332,18 +525,16 @@ class VoiceEvaluationService:
         # Structure Analysis (simplified)
         structure_score = 50.0
         
-        if len(sentences) > 0:
+        if stats.sentence_count > 0:
             # Check for varied sentence lengths
-            sent_lengths = [len(s.split()) for s in sentences]
-            if len(set(sent_lengths)) > 1:
+            if len(set(stats.sentence_lengths)) > 1:
                 structure_score += 15
             
             # Check for proper capitalization
-            capitalized = sum(1 for s in sentences if s and s[0].isupper())
-            structure_score += (capitalized / len(sentences)) * 20
+            structure_score += (stats.capitalized_sentences / stats.sentence_count) * 20
         
         # Check for basic punctuation
-        if any(p in text for p in '.!?,;'):
+        if stats.punctuation - {':'}:
             structure_score += 15
         
         # Ensure scores are in valid range
@@ -364,9 +555,9 @@ class VoiceEvaluationService:
             'structure_score': round(structure_score, 2),
             'verbal_score': round(verbal_score, 2),
             'details': {
-                'word_count': len(words),
-                'sentence_count': len(sentences),
-                'unique_words': len(unique_words),
+                'word_count': stats.word_count,
+                'sentence_count': stats.sentence_count,
+                'unique_words': stats.unique_content_count,
                 'note': 'Using fallback NLP (spaCy not available)'
             }
         }
@@ -378,7 +569,7 @@ class VoiceEvaluationService:
         
         return result
     
-    def _analyze_fluency(self, doc, text: str) -> float:
+    def _analyze_fluency(self, stats: VerbalStats) -> float:
         """
         Analyze fluency based on:
         - Speech length
@@ -389,7 +580,7 @@ class VoiceEvaluationService:
         score = 50.0  # Base score
         
         # Word count bonus (ideal: 100-300 words)
-        word_count = len([token for token in doc if not token.is_punct])
+        word_count = stats.word_count
         if 100 <= word_count <= 300:
             score += 20
         elif 50 <= word_count < 100 or 300 < word_count <= 500:
@@ -398,7 +589,7 @@ class VoiceEvaluationService:
             score -= 10
         
         # Sentence length variation (good fluency has varied sentence lengths)
-        sent_lengths = [len([t for t in sent if not t.is_punct]) for sent in doc.sents]
+        sent_lengths = stats.sentence_lengths
         if sent_lengths:
             avg_length = np.mean(sent_lengths)
             std_dev = np.std(sent_lengths)
@@ -408,20 +599,16 @@ class VoiceEvaluationService:
                 score += 5
         
         # Check for common filler words
-        filler_words = ['um', 'uh', 'like', 'you know', 'basically', 'actually', 'euh', 'ben', 'donc']
-        text_lower = text.lower()
-        filler_count = sum(text_lower.count(filler) for filler in filler_words)
-        score -= min(filler_count * 2, 20)  # Penalize up to 20 points
+        score -= min(stats.filler_count * 2, 20)  # Penalize up to 20 points
         
         # Check for repetitions
-        words = [token.text.lower() for token in doc if not token.is_punct and not token.is_stop]
-        if len(words) > 0:
-            repetition_ratio = 1 - (len(set(words)) / len(words))
+        if stats.content_word_count > 0:
+            repetition_ratio = 1 - (stats.unique_content_words / stats.content_word_count)
             score -= repetition_ratio * 15
         
         return max(0, min(100, score))
     
-    def _analyze_vocabulary(self, doc, language: str) -> float:
+    def _analyze_vocabulary(self, stats: VerbalStats) -> float:
         """
         Analyze vocabulary richness:
         - Lexical diversity
@@ -430,18 +617,15 @@ class VoiceEvaluationService:
         """
         score = 50.0  # Base score
         
-        words = [token for token in doc if not token.is_punct and not token.is_stop]
-        
-        if len(words) == 0:
+        if stats.content_word_count == 0:
             return 0
         
         # Lexical diversity (Type-Token Ratio)
-        unique_words = set([token.lemma_.lower() for token in words])
-        ttr = len(unique_words) / len(words) if len(words) > 0 else 0
+        ttr = stats.unique_content_lemmas / stats.content_word_count
         score += min(ttr * 30, 25)  # Up to 25 points
         
         # Average word length (complexity indicator)
-        avg_word_length = np.mean([len(token.text) for token in words])
+        avg_word_length = stats.average_content_word_length
         if avg_word_length >= 5:
             score += 15
         elif avg_word_length >= 4:
@@ -450,13 +634,12 @@ class VoiceEvaluationService:
             score += 5
         
         # Part of speech diversity
-        pos_tags = set([token.pos_ for token in words])
-        pos_diversity = len(pos_tags) / 10  # Normalize by typical POS tag count
+        pos_diversity = len(stats.content_pos_tags) / 10  # Normalize by typical POS tag count
         score += min(pos_diversity * 15, 10)
         
         return max(0, min(100, score))
     
-    def _analyze_structure(self, doc) -> float:
+    def _analyze_structure(self, stats: VerbalStats) -> float:
         """
         Analyze grammatical structure:
         - Complete sentences
@@ -465,74 +648,51 @@ class VoiceEvaluationService:
         """
         score = 50.0  # Base score
         
-        sentences = list(doc.sents)
-        if len(sentences) == 0:
+        sentence_count = stats.sentence_count
+        if sentence_count == 0:
             return 0
         
-        # Check for complete sentences (has subject and verb)
-        complete_sentences = 0
-        for sent in sentences:
-            has_verb = any(token.pos_ == 'VERB' for token in sent)
-            has_subject = any(token.dep_ in ['nsubj', 'nsubjpass'] for token in sent)
-            if has_verb and has_subject:
-                complete_sentences += 1
-        
-        completeness_ratio = complete_sentences / len(sentences)
+        # Complete sentences (has subject and verb)
+        completeness_ratio = stats.complete_sentences / sentence_count
         score += completeness_ratio * 25
         
-        # Sentence variety (different sentence structures)
-        sentence_patterns = set()
-        for sent in sentences:
-            pattern = '-'.join([token.pos_ for token in sent if not token.is_punct][:5])  # First 5 POS tags
-            sentence_patterns.add(pattern)
-        
-        variety_score = min(len(sentence_patterns) / len(sentences) * 15, 15)
+        # Sentence variety (different sentence structures, first 5 POS tags)
+        variety_score = min(stats.sentence_patterns / sentence_count * 15, 15)
         score += variety_score
         
-        # Check for proper capitalization and punctuation
-        proper_sentences = sum(1 for sent in sentences if sent[0].text[0].isupper() and sent[-1].is_punct)
-        punctuation_score = (proper_sentences / len(sentences)) * 10
+        # Proper capitalization and punctuation
+        punctuation_score = (stats.well_formed_sentences / sentence_count) * 10
         score += punctuation_score
         
         return max(0, min(100, score))
     
-    def analyze_paraverbal_communication(self, audio_path: str) -> Dict:
+    def analyze_paraverbal_communication(self, audio_path: str, audio: Optional[DecodedAudio] = None) -> Dict:
         """
-        Analyze paraverbal communication using librosa
+        Analyze paraverbal communication from a single STFT pass
         
         Args:
             audio_path: Path to audio file
+            audio: Already decoded 16 kHz buffer (avoids decoding the file again)
         
         Returns:
             Dict with pitch, pace, energy scores
         """
         try:
-            import librosa
-            
             # Load audio
-            y, sr = librosa.load(audio_path, sr=None)
-            duration = librosa.get_duration(y=y, sr=sr)
-            
-            # Pitch analysis
-            pitch_score = self._analyze_pitch(y, sr)
+            if audio is None:
+                audio = load_audio(audio_path)
+            duration = audio.duration
             
-            # Pace analysis
-            pace_score = self._analyze_pace(y, sr, duration)
-            
-            # Energy analysis
-            energy_score = self._analyze_energy(y)
-            
-            # Overall paraverbal score
-            paraverbal_score = (pitch_score + pace_score + energy_score) / 3
-            
-            # Extract audio features for storage
-            audio_features = self._extract_audio_features(y, sr)
+            # Every metric comes from the same frame grid and spectrogram;
+            # scores are always recomputed from the (possibly cached) metrics
+            cache_key = result_cache.make_key(audio.digest, 'paraverbal', PARAVERBAL_FEATURES_VERSION)
+            audio_features = result_cache.get(cache_key)
+            if audio_features is None:
+                audio_features = extract_paraverbal_metrics(audio.samples, audio.sample_rate)
+                result_cache.set(cache_key, audio_features)
             
             return {
-                'pitch_score': round(pitch_score, 2),
-                'pace_score': round(pace_score, 2),
-                'energy_score': round(energy_score, 2),
-                'paraverbal_score': round(paraverbal_score, 2),
+                **self.score_paraverbal(audio_features),
                 'duration': round(duration, 2),
                 'audio_features': audio_features,
                 'success': True
@@ -550,145 +710,124 @@ class VoiceEvaluationService:
                 'success': False
             }
     
-    def _analyze_pitch(self, y, sr) -> float:
-        """Analyze pitch variation and range"""
-        import librosa
+    def score_paraverbal(self, audio_features: Dict) -> Dict:
+        """
+        Turn stored paraverbal metrics into scores (no audio needed)
+        
+        Args:
+            audio_features: Metrics from ``extract_paraverbal_metrics``
+        
+        Returns:
+            Dict with pitch, pace, energy and overall paraverbal scores
+        """
+        pitch_score = self._analyze_pitch(audio_features)
+        pace_score = self._analyze_pace(audio_features)
+        energy_score = self._analyze_energy(audio_features)
         
+        # Overall paraverbal score
+        paraverbal_score = (pitch_score + pace_score + energy_score) / 3
+        
+        return {
+            'pitch_score': round(pitch_score, 2),
+            'pace_score': round(pace_score, 2),
+            'energy_score': round(energy_score, 2),
+            'paraverbal_score': round(paraverbal_score, 2),
+        }
+    
+    def _analyze_pitch(self, features: Dict) -> float:
+        """Analyze pitch variation and range"""
         score = 50.0
         
-        try:
-            # Extract pitch using piptrack
-            pitches, magnitudes = librosa.piptrack(y=y, sr=sr)
-            
-            # Get pitch values where magnitude is highest
-            pitch_values = []
-            for t in range(pitches.shape[1]):
-                index = magnitudes[:, t].argmax()
-                pitch = pitches[index, t]
-                if pitch > 0:
-                    pitch_values.append(pitch)
-            
-            if len(pitch_values) > 0:
-                # Pitch variation (good speakers vary their pitch)
-                pitch_std = np.std(pitch_values)
-                if pitch_std > 50:
-                    score += 25
-                elif pitch_std > 30:
-                    score += 15
-                elif pitch_std > 10:
-                    score += 5
-                
-                # Pitch range
-                pitch_range = np.max(pitch_values) - np.min(pitch_values)
-                if pitch_range > 200:
-                    score += 25
-                elif pitch_range > 100:
-                    score += 15
-                elif pitch_range > 50:
-                    score += 5
+        if features.get('voiced_ratio', 0) > 0:
+            # Pitch variation (good speakers vary their pitch)
+            pitch_std = features.get('pitch_std', 0)
+            if pitch_std > 50:
+                score += 25
+            elif pitch_std > 30:
+                score += 15
+            elif pitch_std > 10:
+                score += 5
             
-        except Exception:
-            pass
+            # Pitch range
+            pitch_range = features.get('pitch_range', 0)
+            if pitch_range > 200:
+                score += 25
+            elif pitch_range > 100:
+                score += 15
+            elif pitch_range > 50:
+                score += 5
         
         return max(0, min(100, score))
     
-    def _analyze_pace(self, y, sr, duration) -> float:
+    def _analyze_pace(self, features: Dict) -> float:
         """Analyze speaking pace"""
-        import librosa
-        
         score = 50.0
         
-        try:
-            # Detect onsets (beginnings of sounds/syllables)
-            onset_env = librosa.onset.onset_strength(y=y, sr=sr)
-            onsets = librosa.onset.onset_detect(onset_envelope=onset_env, sr=sr)
-            
-            # Calculate speaking rate (onsets per second as proxy for syllables/second)
-            speaking_rate = len(onsets) / duration if duration > 0 else 0
-            
-            # Ideal speaking rate: 3-6 syllables per second
-            if 3 <= speaking_rate <= 6:
-                score += 30
-            elif 2 <= speaking_rate < 3 or 6 < speaking_rate <= 8:
-                score += 15
-            elif speaking_rate < 2 or speaking_rate > 8:
-                score -= 10
-            
-            # Pace consistency
-            if len(onsets) > 1:
-                onset_times = librosa.frames_to_time(onsets, sr=sr)
-                intervals = np.diff(onset_times)
-                consistency = 1 / (np.std(intervals) + 0.1)  # Lower std = more consistent
-                score += min(consistency * 10, 20)
-            
-        except Exception:
-            pass
+        # Speaking rate (onsets per second as proxy for syllables/second)
+        speaking_rate = features.get('speaking_rate', 0)
+        
+        # Ideal speaking rate: 3-6 syllables per second
+        if 3 <= speaking_rate <= 6:
+            score += 30
+        elif 2 <= speaking_rate < 3 or 6 < speaking_rate <= 8:
+            score += 15
+        elif speaking_rate < 2 or speaking_rate > 8:
+            score -= 10
+        
+        # Pace consistency
+        if features.get('onset_count', 0) > 1:
+            consistency = 1 / (features.get('onset_interval_std', 0) + 0.1)  # Lower std = more consistent
+            score += min(consistency * 10, 20)
         
         return max(0, min(100, score))
     
-    def _analyze_energy(self, y) -> float:
+    def _analyze_energy(self, features: Dict) -> float:
         """Analyze voice energy and dynamics"""
         score = 50.0
         
-        try:
-            # RMS energy
-            import librosa
-            rms = librosa.feature.rms(y=y)[0]
-            
-            # Energy variation (good speakers vary their volume)
-            energy_std = np.std(rms)
-            if energy_std > 0.02:
-                score += 25
-            elif energy_std > 0.01:
-                score += 15
-            elif energy_std > 0.005:
-                score += 5
-            
-            # Average energy (not too quiet, not too loud)
-            avg_energy = np.mean(rms)
-            if 0.05 <= avg_energy <= 0.3:
-                score += 25
-            elif 0.02 <= avg_energy < 0.05 or 0.3 < avg_energy <= 0.5:
-                score += 10
-            
-        except Exception:
-            pass
+        # Energy variation (good speakers vary their volume)
+        energy_std = features.get('rms_std', 0)
+        if energy_std > 0.02:
+            score += 25
+        elif energy_std > 0.01:
+            score += 15
+        elif energy_std > 0.005:
+            score += 5
         
-        return max(0, min(100, score))
-    
-    def _extract_audio_features(self, y, sr) -> Dict:
-        """Extract audio features for storage"""
-        import librosa
+        # Average energy (not too quiet, not too loud)
+        avg_energy = features.get('rms_mean', 0)
+        if 0.05 <= avg_energy <= 0.3:
+            score += 25
+        elif 0.02 <= avg_energy < 0.05 or 0.3 < avg_energy <= 0.5:
+            score += 10
         
-        try:
-            features = {
-                'spectral_centroid': float(np.mean(librosa.feature.spectral_centroid(y=y, sr=sr))),
-                'spectral_rolloff': float(np.mean(librosa.feature.spectral_rolloff(y=y, sr=sr))),
-                'zero_crossing_rate': float(np.mean(librosa.feature.zero_crossing_rate(y))),
-                'rms_mean': float(np.mean(librosa.feature.rms(y=y))),
-                'rms_std': float(np.std(librosa.feature.rms(y=y))),
-            }
-            return features
-        except Exception:
-            return {}
+        return max(0, min(100, score))
     
-    def check_originality(self, text: str, language: str, reference_texts: List[Dict]) -> Dict:
+    def check_originality(self, text: str, language: str, reference_texts: List[Dict] = None,
+                          user_id: Optional[int] = None) -> Dict:
         """
         Check originality by comparing with reference texts
         
         Args:
             text: Input text to check
             language: Language code
-            reference_texts: List of reference texts with embeddings
+            reference_texts: Optional explicit list of reference texts with
+                embeddings; by default the precomputed reference index is used
+            user_id: Author of the text; with the reference index, past
+                submissions of other users are compared as well
         
         Returns:
-            Dict with originality score and similar texts
+            Dict with originality score, similar texts and submissions, and
+            the text's embedding
         """
-        self.initialize_models()
-        
         try:
             # Generate embedding for input text
-            input_embedding = self.sentence_model.encode(text)
+            input_embedding = self.encode_texts(text)
+            
+            if reference_texts is None:
+                result = self._check_originality_indexed(input_embedding, language, user_id)
+                result['embedding'] = np.asarray(input_embedding, dtype=np.float32).tolist()
+                return result
             
             # Calculate similarity with reference texts
             similarities = []
@@ -711,23 +850,12 @@ class VoiceEvaluationService:
                             'text_preview': ref.get('text', '')[:100] + '...'
                         })
             
-            # Calculate originality score
-            if similarities:
-                max_similarity = max(similarities)
-                avg_similarity = np.mean(similarities)
-                
-                # Higher similarity = lower originality
-                originality_score = 100 * (1 - max_similarity * 0.7 - avg_similarity * 0.3)
-            else:
-                # No references to compare with
-                originality_score = 75.0  # Neutral score
-            
-            return {
-                'originality_score': max(0, min(100, round(originality_score, 2))),
-                'max_similarity': round(max(similarities), 3) if similarities else 0,
-                'similar_texts': sorted(similar_texts, key=lambda x: x['similarity'], reverse=True)[:3],
-                'success': True
-            }
+            max_similarity = max(similarities) if similarities else 0
+            avg_similarity = np.mean(similarities) if similarities else 0
+            return self._originality_result(
+                len(similarities), max_similarity, avg_similarity,
+                sorted(similar_texts, key=lambda x: x['similarity'], reverse=True)[:3]
+            )
             
         except Exception as e:
             return {
@@ -736,10 +864,72 @@ class VoiceEvaluationService:
                 'success': False
             }
     
+    def _check_originality_indexed(self, input_embedding, language: str, user_id: Optional[int] = None) -> Dict:
+        """
+        Score against the memory-mapped reference index (one matrix-vector
+        product) and, for a known author, the closest past submissions of
+        other students (IVF index)
+        """
+        from .reference_index import reference_index
+        from .submission_index import submission_index
+        from .models import ReferenceText
+        
+        result = reference_index.score(language, input_embedding, k=3)
+        
+        # Only the top-k rows are fetched from the database, for previews
+        close_ids = [row_id for row_id, similarity in result['top'] if similarity > 0.7]
+        references = ReferenceText.objects.in_bulk(close_ids)
+        similar_texts = [
+            {
+                'theme': references[row_id].theme,
+                'similarity': similarity,
+                'text_preview': references[row_id].text[:100] + '...'
+            }
+            for row_id, similarity in result['top']
+            if row_id in references
+        ]
+        
+        count, max_similarity = result['count'], result['max_similarity']
+        similar_submissions = []
+        if user_id is not None:
+            # Only the nearest neighbours are known, so peers raise the
+            # maximum similarity but not the mean over the references
+            peers = submission_index.search_others(language, input_embedding, user_id, k=3)
+            if peers['top']:
+                # Only the other students' rows that were scored, not the whole index
+                count += peers['scanned']
+                max_similarity = max(max_similarity, peers['top'][0][2])
+            # Other students' transcriptions are private: ids only, no preview
+            similar_submissions = [
+                {'evaluation_id': evaluation_id, 'similarity': similarity}
+                for evaluation_id, _, similarity in peers['top']
+                if similarity > 0.7
+            ]
+        
+        originality = self._originality_result(count, max_similarity, result['mean_similarity'], similar_texts)
+        originality['similar_submissions'] = similar_submissions
+        return originality
+    
+    def _originality_result(self, count: int, max_similarity: float, avg_similarity: float,
+                            similar_texts: List[Dict]) -> Dict:
+        """Turn similarity statistics into the originality score"""
+        if count:
+            # Higher similarity = lower originality
+            originality_score = 100 * (1 - max_similarity * 0.7 - avg_similarity * 0.3)
+        else:
+            # No references to compare with
+            originality_score = 75.0  # Neutral score
+        
+        return {
+            'originality_score': max(0, min(100, round(float(originality_score), 2))),
+            'max_similarity': round(float(max_similarity), 3) if count else 0,
+            'similar_texts': similar_texts,
+            'success': True
+        }
+    
     def generate_text_embedding(self, text: str) -> List[float]:
         """Generate embedding for a text"""
-        self.initialize_models()
-        embedding = self.sentence_model.encode(text)
+        embedding = self.encode_texts(text)
         return embedding.tolist()
     
     def calculate_language_level(self, scores: Dict) -> str:
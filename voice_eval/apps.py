@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class VoiceEvalConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'voice_eval'
+
+    def ready(self):
+        from . import signals  # noqa: F401
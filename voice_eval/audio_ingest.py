@@ -0,0 +1,153 @@
+"""
+Audio ingest for Voice Evaluation
+Decodes each upload once into a 16 kHz mono float32 buffer shared by the
+transcription and audio analysis steps
+"""
+from __future__ import annotations
+import hashlib
+import io
+import subprocess
+import wave
+from math import gcd
+
+import numpy as np
+
+
+# Whisper, Vosk and the paraverbal analyzers all work at 16 kHz
+TARGET_SAMPLE_RATE = 16000
+
+
+class AudioDecodeError(Exception):
+    """Raised when an upload cannot be decoded"""
+
+
+class DecodedAudio:
+    """In-memory mono float32 samples in [-1, 1] at a fixed sample rate"""
+
+    def __init__(self, samples: np.ndarray, sample_rate: int = TARGET_SAMPLE_RATE):
+        self.samples = np.ascontiguousarray(samples, dtype=np.float32)
+        self.sample_rate = sample_rate
+        self._digest = None
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds"""
+        return len(self.samples) / self.sample_rate if self.sample_rate else 0.0
+
+    @property
+    def digest(self) -> str:
+        """SHA-256 of the decoded samples (same audio, same digest whatever the container)"""
+        if self._digest is None:
+            hasher = hashlib.sha256(str(self.sample_rate).encode())
+            hasher.update(self.samples.tobytes())
+            self._digest = hasher.hexdigest()
+        return self._digest
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __repr__(self):
+        return f"<DecodedAudio {self.duration:.2f}s @ {self.sample_rate} Hz>"
+
+
+def load_audio(audio_path: str, sample_rate: int = TARGET_SAMPLE_RATE) -> DecodedAudio:
+    """
+    Decode an audio file into a mono float32 buffer
+
+    libsndfile (WAV, FLAC, OGG...) is tried first so common uploads are
+    decoded in-process; anything else (WebM/Opus from browsers, M4A...) is
+    piped through a single ffmpeg call, as Whisper would have done.
+
+    Args:
+        audio_path: Path to the audio file
+        sample_rate: Target sample rate
+
+    Returns:
+        DecodedAudio at ``sample_rate``
+    """
+    samples = _decode_with_soundfile(audio_path, sample_rate)
+    if samples is None:
+        samples = _decode_with_ffmpeg(['-i', audio_path], None, sample_rate)
+    return DecodedAudio(samples, sample_rate)
+
+
+def decode_audio_bytes(data: bytes, sample_rate: int = TARGET_SAMPLE_RATE) -> DecodedAudio:
+    """Same as ``load_audio`` for an in-memory upload (no temporary file)"""
+    samples = _decode_with_soundfile(io.BytesIO(data), sample_rate)
+    if samples is None:
+        samples = _decode_with_ffmpeg(['-i', 'pipe:0'], data, sample_rate)
+    return DecodedAudio(samples, sample_rate)
+
+
+def to_pcm16(audio: DecodedAudio) -> bytes:
+    """Convert a decoded buffer to 16-bit little-endian PCM bytes"""
+    clipped = np.clip(audio.samples, -1.0, 1.0)
+    return (clipped * 32767).astype('<i2').tobytes()
+
+
+def pcm16_to_wav(pcm: bytes, sample_rate: int = TARGET_SAMPLE_RATE) -> bytes:
+    """Wrap 16-bit mono PCM bytes in a WAV container"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def resample(samples: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """Polyphase resampling of a mono signal"""
+    if orig_sr == target_sr:
+        return samples
+    from scipy.signal import resample_poly
+
+    factor = gcd(orig_sr, target_sr)
+    return resample_poly(samples, target_sr // factor, orig_sr // factor).astype(np.float32)
+
+
+def _decode_with_soundfile(source, sample_rate: int):
+    """Decode with libsndfile; returns None when the format is not supported"""
+    try:
+        import soundfile as sf
+    except ImportError:
+        return None
+
+    try:
+        samples, orig_sr = sf.read(source, dtype='float32', always_2d=True)
+    except Exception:
+        return None
+
+    # Downmix to mono
+    samples = samples.mean(axis=1) if samples.shape[1] > 1 else samples[:, 0]
+    return resample(samples, orig_sr, sample_rate)
+
+
+def _decode_with_ffmpeg(input_args, data, sample_rate: int) -> np.ndarray:
+    """Decode with ffmpeg to raw s16le PCM on stdout"""
+    cmd = [
+        'ffmpeg', '-nostdin', '-threads', '0',
+        *input_args,
+        '-f', 's16le',
+        '-ac', '1',
+        '-acodec', 'pcm_s16le',
+        '-ar', str(sample_rate),
+        '-'
+    ]
+    try:
+        result = subprocess.run(
+            cmd,
+            input=data,
+            stdin=None if data is not None else subprocess.DEVNULL,
+            capture_output=True
+        )
+    except FileNotFoundError:
+        raise AudioDecodeError(
+            "FFmpeg not found. Please install FFmpeg to process audio files. "
+            "See INSTALL_FFMPEG.md for instructions."
+        )
+
+    if result.returncode != 0:
+        raise AudioDecodeError(f"FFmpeg failed to decode audio: {result.stderr.decode(errors='ignore')[-500:]}")
+
+    return np.frombuffer(result.stdout, np.int16).astype(np.float32) / 32768.0
@@ -0,0 +1,288 @@
+"""
+Benchmarks for the voice scoring functions
+Deterministic synthetic speech-like audio and transcripts, a small timing
+harness and a JSON report, so runs can be compared across commits
+(``manage.py benchmark_voice_eval``)
+"""
+from __future__ import annotations
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+SAMPLE_RATE = 16000
+DEFAULT_DURATIONS = (10, 60, 300)
+DEFAULT_REFERENCE_COUNTS = (10, 1000, 10000)
+EMBEDDING_DIM = 384  # paraphrase-multilingual-MiniLM-L12-v2
+REPORT_VERSION = 1
+
+# Speaking rate used to size transcripts for a given audio duration
+WORDS_PER_SECOND = 2.5
+
+_VOCABULARY = (
+    "i think that the most important thing about learning a language is practice every day "
+    "because when you speak with other people you discover new words and you also improve "
+    "your pronunciation my favourite topic is travel and i would like to visit many countries "
+    "in the future although it is sometimes difficult to understand native speakers"
+).split()
+
+
+# ----------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------
+
+def synthetic_speech(seconds: float, sample_rate: int = SAMPLE_RATE, seed: int = 0) -> np.ndarray:
+    """
+    Speech-like test signal: voiced syllables, noise bursts and pauses
+
+    Syllables are harmonic tones with a drifting pitch (90-240 Hz) and a
+    raised-cosine envelope at a few syllables per second; fricative-like
+    noise bursts and silent pauses are mixed in, so pitch tracking, onset
+    detection and energy statistics all have something to measure.
+    """
+    rng = np.random.default_rng(seed)
+    total = int(seconds * sample_rate)
+    signal = np.zeros(total, dtype=np.float32)
+    position = 0
+    while position < total:
+        kind = rng.choice(['syllable', 'noise', 'pause'], p=[0.7, 0.15, 0.15])
+        length = int(sample_rate * (rng.uniform(0.12, 0.3) if kind != 'pause' else rng.uniform(0.2, 0.6)))
+        length = min(length, total - position)
+        if kind == 'syllable':
+            t = np.arange(length) / sample_rate
+            f0 = rng.uniform(90, 240) * (1 + 0.1 * np.sin(2 * np.pi * rng.uniform(0.5, 2) * t))
+            phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+            tone = sum(np.sin(h * phase) / h for h in range(1, 6))
+            envelope = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(length) / max(length - 1, 1))
+            signal[position:position + length] = 0.3 * rng.uniform(0.5, 1.0) * envelope * tone
+        elif kind == 'noise':
+            signal[position:position + length] = 0.05 * rng.standard_normal(length)
+        position += length
+    return signal
+
+
+def synthetic_transcript(seconds: float, seed: int = 0) -> str:
+    """Transcript matching ``seconds`` of speech, with sentence punctuation"""
+    rng = np.random.default_rng(seed)
+    words = [str(w) for w in rng.choice(_VOCABULARY, size=max(int(seconds * WORDS_PER_SECOND), 1))]
+    sentences, start = [], 0
+    while start < len(words):
+        end = start + int(rng.integers(6, 16))
+        sentence = ' '.join(words[start:end])
+        sentences.append(sentence[0].upper() + sentence[1:] + rng.choice(['.', '.', ',', '?']))
+        start = end
+    return ' '.join(sentences)
+
+
+def reference_embeddings(count: int, dim: int = EMBEDDING_DIM, seed: int = 0) -> np.ndarray:
+    """Random unit vectors standing in for reference text embeddings"""
+    vectors = np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+# ----------------------------------------------------------------------
+# Harness
+# ----------------------------------------------------------------------
+
+def time_call(fn: Callable, repeat: int = 5, warmup: int = 1) -> Dict:
+    """Wall-clock statistics of ``fn()`` in milliseconds"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        'repeat': repeat,
+        'min_ms': round(min(samples), 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'max_ms': round(max(samples), 3),
+    }
+
+
+class BenchmarkRun:
+    """Collects benchmark results and the environment they ran in"""
+
+    def __init__(self, repeat: int = 5, only: Optional[str] = None):
+        self.repeat = repeat
+        self.only = only
+        self.results: List[Dict] = []
+
+    def wanted(self, name: str) -> bool:
+        return not self.only or self.only in name
+
+    def measure(self, name: str, fn: Callable, repeat: Optional[int] = None, **params):
+        if not self.wanted(name):
+            return
+        try:
+            stats = time_call(fn, repeat=repeat or self.repeat)
+        except Exception as e:
+            self.results.append({'name': name, 'params': params, 'skipped': f'{type(e).__name__}: {e}'})
+            return
+        self.results.append({'name': name, 'params': params, **stats})
+
+    def skip(self, name: str, reason: str, **params):
+        if self.wanted(name):
+            self.results.append({'name': name, 'params': params, 'skipped': reason})
+
+    def report(self) -> Dict:
+        return {
+            'version': REPORT_VERSION,
+            'created_at': timezone.now().isoformat(),
+            'environment': environment(),
+            'results': self.results,
+        }
+
+
+def environment() -> Dict:
+    """Commit and library versions, to tell runs apart"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+
+    versions = {}
+    for module in ('numpy', 'scipy', 'spacy', 'sentence_transformers', 'whisper', 'librosa'):
+        try:
+            versions[module] = __import__(module).__version__
+        except Exception:
+            versions[module] = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'libraries': versions,
+    }
+
+
+def result_key(result: Dict) -> str:
+    """Stable identifier of a benchmark case (name plus parameters)"""
+    params = ','.join(f'{k}={v}' for k, v in sorted(result.get('params', {}).items()))
+    return f"{result['name']}[{params}]" if params else result['name']
+
+
+def compare_reports(baseline: Dict, current: Dict) -> List[Dict]:
+    """Median-time ratio (current / baseline) for every case present in both reports"""
+    previous = {result_key(r): r for r in baseline.get('results', []) if 'median_ms' in r}
+    rows = []
+    for result in current.get('results', []):
+        key = result_key(result)
+        if 'median_ms' in result and key in previous and previous[key]['median_ms'] > 0:
+            rows.append({
+                'case': key,
+                'baseline_ms': previous[key]['median_ms'],
+                'current_ms': result['median_ms'],
+                'ratio': round(result['median_ms'] / previous[key]['median_ms'], 3),
+            })
+    return rows
+
+
+# ----------------------------------------------------------------------
+# Suite
+# ----------------------------------------------------------------------
+
+def _optional_model(getter: Callable):
+    """The model, or None when it (or its library) is not installed"""
+    try:
+        return getter()
+    except Exception:
+        return None
+
+
+def run_benchmarks(durations: Iterable[float] = DEFAULT_DURATIONS,
+                   reference_counts: Iterable[int] = DEFAULT_REFERENCE_COUNTS,
+                   repeat: int = 5, only: Optional[str] = None, language: str = 'en') -> Dict:
+    """
+    Time the voice scoring functions on synthetic fixtures
+
+    Cases that need a model that is not installed (spaCy, sentence
+    transformer) are reported as skipped rather than failing the run.
+    """
+    from .ai_service import voice_service
+    from .paraverbal_features import extract_paraverbal_metrics
+    from .pronunciation_service import pronunciation_service
+    from .reference_index import EmbeddingIndex
+    from .submission_index import SubmissionIndex
+    from .text_stats import text_stats
+    from .vad import speech_chunks
+
+    run = BenchmarkRun(repeat=repeat, only=only)
+
+    for seconds in durations:
+        text = synthetic_transcript(seconds)
+        # The text statistics are cached per transcript: clear them so every
+        # call pays for the tokenization, as the first one does in production
+        run.measure('text_stats', lambda: text_stats.__wrapped__(text), seconds=seconds)
+        run.measure('transcription_quality',
+                    lambda: (text_stats.cache_clear(), voice_service._check_transcription_quality(text, 0.8)),
+                    seconds=seconds)
+        run.measure('verbal_simple', lambda: (text_stats.cache_clear(), voice_service._analyze_verbal_simple(text, language)),
+                    seconds=seconds)
+
+        if run.wanted('verbal_spacy'):
+            nlp = _optional_model(lambda: voice_service.nlp_en if language == 'en' else voice_service.nlp_fr)
+            if nlp is None:
+                run.skip('verbal_spacy', 'spaCy model not available', seconds=seconds)
+            else:
+                run.measure('verbal_spacy', lambda: voice_service.analyze_verbal_communication(text, language),
+                            seconds=seconds)
+
+        # Voice activity detection ahead of Whisper; paraverbal: the shared
+        # STFT engine, then each analyzer on its metrics
+        audio_cases = ('speech_chunks', 'paraverbal_features', 'analyze_pitch', 'analyze_pace', 'analyze_energy')
+        if any(map(run.wanted, audio_cases)):
+            audio = synthetic_speech(seconds)
+            run.measure('speech_chunks', lambda: speech_chunks(audio, SAMPLE_RATE), seconds=seconds)
+            features = extract_paraverbal_metrics(audio, SAMPLE_RATE)
+            run.measure('paraverbal_features', lambda: extract_paraverbal_metrics(audio, SAMPLE_RATE),
+                        repeat=max(1, repeat // 2) if seconds >= 300 else None, seconds=seconds)
+            run.measure('analyze_pitch', lambda: voice_service._analyze_pitch(features), seconds=seconds)
+            run.measure('analyze_pace', lambda: voice_service._analyze_pace(features), seconds=seconds)
+            run.measure('analyze_energy', lambda: voice_service._analyze_energy(features), seconds=seconds)
+
+        expected = synthetic_transcript(seconds, seed=1)
+        spoken = synthetic_transcript(seconds, seed=2)
+        run.measure('compare_texts', lambda: pronunciation_service.compare_texts(expected, spoken), seconds=seconds)
+
+    # Originality: index search always, the full check only with the embedding model
+    query = reference_embeddings(1, seed=99)[0]
+    text = synthetic_transcript(60)
+    with tempfile.TemporaryDirectory() as root:
+        index = EmbeddingIndex('benchmark', root)
+        submissions = SubmissionIndex(root)
+        for count in reference_counts:
+            if run.wanted('submission_index_search'):
+                submissions.rebuild(language, ((i, i % 50, e) for i, e in enumerate(reference_embeddings(count).tolist(), start=1)))
+                run.measure('submission_index_search', lambda: submissions.search_others(language, query, user_id=0, k=3),
+                            references=count)
+            if any(map(run.wanted, ('originality_index_search', 'originality_check'))):
+                embeddings = reference_embeddings(count)
+                index.rebuild(language, enumerate(embeddings.tolist(), start=1))
+                run.measure('originality_index_search', lambda: index.search(language, query, k=3),
+                            references=count)
+
+                if _optional_model(lambda: voice_service.sentence_model) is None:
+                    run.skip('originality_check', 'sentence transformer not available', references=count)
+                    continue
+                references = [
+                    {'language': language, 'theme': f'theme {i}', 'text': 'reference', 'embedding': e}
+                    for i, e in enumerate(embeddings.tolist())
+                ]
+                run.measure('originality_check',
+                            lambda: voice_service.check_originality(text, language, reference_texts=references),
+                            references=count)
+
+    return run.report()
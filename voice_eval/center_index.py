@@ -0,0 +1,98 @@
+"""
+Spatial index of active testing centers for nearest-center queries
+Centers are stored as 3-D unit vectors in a KD-tree per language; the
+straight-line (chord) distance between unit vectors is monotonic in the
+great-circle distance, so k-nearest on the tree is k-nearest on the globe.
+The index is rebuilt lazily when the testing center data version changes.
+"""
+from __future__ import annotations
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from .map_service import map_service
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def to_unit_vectors(latitudes, longitudes) -> np.ndarray:
+    """(n, 3) unit-sphere coordinates of latitude/longitude pairs in degrees"""
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def chord_to_km(chord) -> np.ndarray:
+    """Great-circle (haversine) distance for a chord length on the unit sphere"""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0.0, 1.0))
+
+
+class TestingCenterIndex:
+    """Per-language KD-trees over the active testing centers, kept in memory"""
+
+    def __init__(self):
+        self._version = None
+        self._trees: Dict[Optional[str], Tuple[cKDTree, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def nearest(self, latitude: float, longitude: float, language: Optional[str] = None,
+                k: int = 5, max_distance_km: Optional[float] = None) -> List[Tuple[int, float]]:
+        """
+        The k active centers closest to a point
+
+        Args:
+            latitude, longitude: Query point in degrees
+            language: Only centers supporting this language (all when None)
+            k: Number of centers to return
+            max_distance_km: Optional distance cut-off
+
+        Returns:
+            List of (center_id, distance_km), closest first
+        """
+        tree, ids = self._tree(language)
+        if not len(ids) or k <= 0:
+            return []
+
+        point = to_unit_vectors([latitude], [longitude])[0]
+        chords, rows = tree.query(point, k=min(k, len(ids)))
+        chords, rows = np.atleast_1d(chords), np.atleast_1d(rows)
+        distances = chord_to_km(chords)
+
+        results = []
+        for row, distance in zip(rows, distances):
+            if max_distance_km is not None and distance > max_distance_km:
+                break
+            results.append((int(ids[row]), round(float(distance), 2)))
+        return results
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+            self._trees = {}
+
+    def _tree(self, language: Optional[str]) -> Tuple[cKDTree, np.ndarray]:
+        version = map_service.centers_version()
+        with self._lock:
+            if version != self._version:
+                self._trees = {}
+                self._version = version
+            if language not in self._trees:
+                self._trees[language] = self._build(language)
+            return self._trees[language]
+
+    @staticmethod
+    def _build(language: Optional[str]) -> Tuple[cKDTree, np.ndarray]:
+        from .models import TestingCenter
+
+        rows = TestingCenter.objects.filter(is_active=True).values_list('pk', 'latitude', 'longitude', 'languages')
+        # Filter in Python since SQLite doesn't support JSONField contains
+        rows = [row for row in rows if language is None or language in (row[3] or [])]
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        points = to_unit_vectors([row[1] for row in rows], [row[2] for row in rows]) if rows else np.empty((0, 3))
+        return cKDTree(points), ids
+
+
+# Global index instance
+center_index = TestingCenterIndex()
@@ -2,6 +2,7 @@
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib import colors
 from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
 from reportlab.pdfgen import canvas
 from reportlab.platypus import Table, TableStyle, Paragraph
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -14,14 +15,34 @@ from PIL import Image
 from django.conf import settings
 from datetime import datetime
 import os
+import threading
 
 
+# Minimum total score for a certificate
+CERTIFICATE_MIN_SCORE = 70
+# Only scores computed from this transcription profile are certified
+CERTIFICATE_TRANSCRIPTION_PROFILE = 'accurate'
+
+# PDF form XObject holding everything that is identical on every certificate
+LAYOUT_FORM = 'certificate_layout'
+
 class CertificateGenerator:
-    """Generate professional certificates for language evaluation"""
+    """
+    Generate professional certificates for language evaluation
+    
+    The static artwork (borders, header, title, score box, QR code, footer
+    art) is drawn once per PDF into a form XObject and stamped on each page;
+    only the name, level, score, message and certificate details are drawn
+    per certificate. The QR image and wrapped messages are built once per
+    process and reused across documents.
+    """
     
     def __init__(self):
         self.width, self.height = A4
         self.margin = 0.75 * inch
+        self._qr_images = {}  # QR target URL -> ImageReader
+        self._message_lines = {}  # score tier -> wrapped lines
+        self._lock = threading.Lock()
     
     def generate_certificate(self, user, evaluation, certificate_id):
         """
@@ -37,15 +58,37 @@ class CertificateGenerator:
         """
         buffer = BytesIO()
         c = canvas.Canvas(buffer, pagesize=A4)
+        self._draw_certificate(c, user, evaluation, certificate_id)
+        c.save()
+        buffer.seek(0)
+        return buffer
+    
+    def generate_batch(self, entries):
+        """
+        Render many certificates into one multi-page PDF (e.g. for a ceremony)
         
-        # Add border
-        self._add_border(c)
-        
-        # Add header
-        self._add_header(c)
+        The layout form and the QR image are embedded once and shared by
+        every page, so each extra certificate only adds its own text.
         
-        # Add certificate title
-        self._add_title(c)
+        Args:
+            entries: Iterable of (user, evaluation, certificate_id)
+            
+        Returns:
+            BytesIO buffer containing the PDF (one page per certificate)
+        """
+        buffer = BytesIO()
+        c = canvas.Canvas(buffer, pagesize=A4)
+        for user, evaluation, certificate_id in entries:
+            self._draw_certificate(c, user, evaluation, certificate_id)
+            c.showPage()
+        c.save()
+        buffer.seek(0)
+        return buffer
+    
+    def _draw_certificate(self, c, user, evaluation, certificate_id):
+        """Stamp the shared layout, then draw the per-certificate fields"""
+        self._ensure_layout(c)
+        c.doForm(LAYOUT_FORM)
         
         # Add user information
         self._add_user_info(c, user, evaluation)
@@ -56,15 +99,35 @@ class CertificateGenerator:
         # Add credits/message
         self._add_credits(c, evaluation)
         
-        # Add QR code
-        self._add_qr_code(c, certificate_id)
-        
         # Add footer
         self._add_footer(c, certificate_id, evaluation.created_at)
+    
+    def _ensure_layout(self, c):
+        """Define the static layout form once per document"""
+        if c.hasForm(LAYOUT_FORM):
+            return
         
-        c.save()
-        buffer.seek(0)
-        return buffer
+        c.beginForm(LAYOUT_FORM)
+        
+        # Add border
+        self._add_border(c)
+        
+        # Add header
+        self._add_header(c)
+        
+        # Add certificate title
+        self._add_title(c)
+        
+        # Add fixed text and score box
+        self._add_static_text(c)
+        
+        # Add QR code
+        self._add_qr_code(c)
+        
+        # Add signature and verification footer
+        self._add_footer_art(c)
+        
+        c.endForm()
     
     def _add_border(self, c):
         """Add decorative border"""
@@ -110,17 +173,37 @@ class CertificateGenerator:
         c.line(line_start, self.height - self.margin - 130, 
                line_end, self.height - self.margin - 130)
     
-    def _add_user_info(self, c, user, evaluation):
-        """Add user information"""
-        y_position = self.height - self.margin - 180
-        
+    def _add_static_text(self, c):
+        """Add the fixed wording and the empty score box"""
         # "This certifies that"
         c.setFont("Helvetica", 14)
         c.setFillColor(colors.black)
-        c.drawCentredString(self.width / 2, y_position, "This certifies that")
+        c.drawCentredString(self.width / 2, self.height - self.margin - 180, "This certifies that")
+        
+        # Score box
+        y_position = self.height - self.margin - 345
+        box_width = 300
+        box_height = 80
+        box_x = (self.width - box_width) / 2
+        
+        # Score box background
+        c.setFillColor(colors.HexColor('#f8f9fa'))
+        c.rect(box_x, y_position - box_height, box_width, box_height, fill=1)
         
-        # User name
-        y_position -= 35
+        # Score box border
+        c.setStrokeColor(colors.HexColor('#dc3545'))
+        c.setLineWidth(2)
+        c.rect(box_x, y_position - box_height, box_width, box_height, fill=0)
+        
+        # Overall score label
+        c.setFont("Helvetica-Bold", 16)
+        c.setFillColor(colors.black)
+        c.drawCentredString(self.width / 2, y_position - 25, "Overall Score")
+    
+    def _add_user_info(self, c, user, evaluation):
+        """Add user information"""
+        # User name (below the "This certifies that" line of the layout)
+        y_position = self.height - self.margin - 215
         c.setFont("Helvetica-Bold", 20)
         c.setFillColor(colors.HexColor('#dc3545'))
         full_name = f"{user.first_name} {user.last_name}" if user.first_name else user.username
@@ -151,26 +234,8 @@ class CertificateGenerator:
         text = f"at {level_name} level"
         c.drawCentredString(self.width / 2, y_position, text)
         
-        # Score box
+        # Overall score, inside the layout's score box
         y_position -= 50
-        box_width = 300
-        box_height = 80
-        box_x = (self.width - box_width) / 2
-        
-        # Score box background
-        c.setFillColor(colors.HexColor('#f8f9fa'))
-        c.rect(box_x, y_position - box_height, box_width, box_height, fill=1)
-        
-        # Score box border
-        c.setStrokeColor(colors.HexColor('#dc3545'))
-        c.setLineWidth(2)
-        c.rect(box_x, y_position - box_height, box_width, box_height, fill=0)
-        
-        # Overall score
-        c.setFont("Helvetica-Bold", 16)
-        c.setFillColor(colors.black)
-        c.drawCentredString(self.width / 2, y_position - 25, "Overall Score")
-        
         c.setFont("Helvetica-Bold", 32)
         c.setFillColor(colors.HexColor('#dc3545'))
         c.drawCentredString(self.width / 2, y_position - 60, f"{evaluation.total_score:.0f}/100")
@@ -182,8 +247,17 @@ class CertificateGenerator:
         c.setFont("Helvetica", 11)
         c.setFillColor(colors.black)
         
+        for i, line in enumerate(self._credit_lines(c, evaluation.total_score)):
+            c.drawCentredString(self.width / 2, y_position - i * 15, line)
+    
+    def _credit_lines(self, c, score):
+        """Congratulatory message for a score, wrapped to the page width (cached per tier)"""
+        tier = 90 if score >= 90 else 80 if score >= 80 else 70 if score >= 70 else 0
+        lines = self._message_lines.get(tier)
+        if lines is not None:
+            return lines
+        
         # Determine message based on score
-        score = evaluation.total_score
         if score >= 90:
             message = ("Exceptional performance! Your outstanding language skills demonstrate "
                       "mastery and excellence in communication. Continue inspiring others with your expertise.")
@@ -214,33 +288,16 @@ class CertificateGenerator:
         if current_line:
             lines.append(' '.join(current_line))
         
-        # Draw lines
-        for i, line in enumerate(lines):
-            c.drawCentredString(self.width / 2, y_position - i * 15, line)
+        self._message_lines[tier] = lines
+        return lines
     
-    def _add_qr_code(self, c, certificate_id):
+    def _add_qr_code(self, c):
         """Add QR code linking to platform"""
-        # Generate QR code
-        qr = qrcode.QRCode(version=1, box_size=10, border=2)
-        # Link to home page
-        qr_url = f"{settings.SITE_URL or 'http://127.0.0.1:8000'}/"
-        qr.add_data(qr_url)
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Save to BytesIO
-        qr_buffer = BytesIO()
-        img.save(qr_buffer, format='PNG')
-        qr_buffer.seek(0)
-        
-        # Add to PDF - use ImageReader for BytesIO
-        from reportlab.lib.utils import ImageReader
         qr_size = 80
         x = self.width - self.margin - qr_size - 20
         y = self.margin + 40
         
-        c.drawImage(ImageReader(qr_buffer), x, y, width=qr_size, height=qr_size)
+        c.drawImage(self._qr_image(), x, y, width=qr_size, height=qr_size)
         
         # QR code label
         c.setFont("Helvetica", 8)
@@ -248,6 +305,27 @@ class CertificateGenerator:
         c.drawCentredString(x + qr_size / 2, y - 10, "Scan to visit")
         c.drawCentredString(x + qr_size / 2, y - 20, "GENEX Platform")
     
+    def _qr_image(self):
+        """QR code image for the platform URL, generated once per URL"""
+        # Link to home page
+        qr_url = f"{settings.SITE_URL or 'http://127.0.0.1:8000'}/"
+        with self._lock:
+            image = self._qr_images.get(qr_url)
+            if image is None:
+                # Generate QR code
+                qr = qrcode.QRCode(version=1, box_size=10, border=2)
+                qr.add_data(qr_url)
+                qr.make(fit=True)
+                
+                img = qr.make_image(fill_color="black", back_color="white")
+                
+                # Save to BytesIO - use ImageReader for BytesIO
+                qr_buffer = BytesIO()
+                img.save(qr_buffer, format='PNG')
+                qr_buffer.seek(0)
+                image = self._qr_images[qr_url] = ImageReader(qr_buffer)
+        return image
+    
     def _add_footer(self, c, certificate_id, issue_date):
         """Add footer with certificate details"""
         y_position = self.margin + 60
@@ -260,9 +338,11 @@ class CertificateGenerator:
         # Issue date
         date_str = issue_date.strftime("%B %d, %Y")
         c.drawString(self.margin + 20, y_position - 15, f"Issued on: {date_str}")
-        
+    
+    def _add_footer_art(self, c):
+        """Add signature line and verification text"""
         # Signature line
-        y_position -= 40
+        y_position = self.margin + 20
         sig_width = 150
         sig_x = self.width / 2 - sig_width / 2
         
@@ -0,0 +1,168 @@
+"""
+Embedding service
+Collects concurrent sentence-transformer encode requests for a few
+milliseconds and runs them through the model as one batch, so originality
+checks arriving together and bulk imports use the model's batched matrix
+products instead of encoding one string per call
+"""
+from __future__ import annotations
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+from django.conf import settings
+
+from .model_registry import model_registry
+from .inference_client import inference_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+
+
+class MicroBatcher:
+    """
+    Background thread turning single encode requests into batches
+
+    A batch starts with the oldest queued text and takes every text that
+    arrives within ``max_wait_ms`` of it, up to ``max_batch_size``; when
+    more texts are already queued (bulk submissions) a full batch goes out
+    without waiting. Only the batcher thread calls ``encode_batch``, so the
+    model is never entered concurrently.
+    """
+
+    def __init__(self, encode_batch: Callable[[List[str]], np.ndarray],
+                 max_batch_size: Optional[int] = None, max_wait_ms: Optional[float] = None):
+        self._encode_batch = encode_batch
+        self._max_batch_size = max_batch_size
+        self._max_wait_ms = max_wait_ms
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self.batches = 0
+        self.texts = 0
+
+    @property
+    def max_batch_size(self) -> int:
+        return max(1, int(self._max_batch_size or getattr(
+            settings, 'VOICE_EVAL_EMBEDDING_BATCH_SIZE', DEFAULT_MAX_BATCH_SIZE)))
+
+    @property
+    def max_wait_ms(self) -> float:
+        if self._max_wait_ms is not None:
+            return self._max_wait_ms
+        return float(getattr(settings, 'VOICE_EVAL_EMBEDDING_MAX_WAIT_MS', DEFAULT_MAX_WAIT_MS))
+
+    def submit(self, text: str) -> Future:
+        """Queue one text; the future resolves to its 1-D embedding"""
+        return self.submit_many([text])[0]
+
+    def submit_many(self, texts: Iterable[str]) -> List[Future]:
+        """Queue several texts at once, one future per text"""
+        requests = [(text, Future()) for text in texts]
+        work = self._ensure_worker()
+        for request in requests:
+            work.put(request)
+        return [future for _, future in requests]
+
+    def stats(self) -> Dict:
+        return {
+            'batches': self.batches,
+            'texts': self.texts,
+            'mean_batch_size': round(self.texts / self.batches, 2) if self.batches else 0.0,
+        }
+
+    def _ensure_worker(self) -> queue.Queue:
+        with self._lock:
+            # A forked process inherits the queue but not the thread
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, args=(self._queue,),
+                                                name='embedding-batcher', daemon=True)
+                self._thread.start()
+            return self._queue
+
+    def _run(self, work: queue.Queue):
+        while True:
+            batch = [work.get()]
+            limit = self.max_batch_size
+            deadline = time.monotonic() + self.max_wait_ms / 1000
+            while len(batch) < limit:
+                try:
+                    batch.append(work.get_nowait())
+                    continue
+                except queue.Empty:
+                    pass
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(work.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            embeddings = np.asarray(self._encode_batch([text for text, _ in batch]))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.texts += len(batch)
+        for (_, future), embedding in zip(batch, embeddings):
+            future.set_result(embedding)
+
+
+class EmbeddingService:
+    """
+    Sentence-transformer embeddings through a shared micro-batcher
+
+    Batches run in-process, or as one call to the inference service when
+    ML_INFERENCE_SOCKET is configured (which batches across workers again).
+    """
+
+    def __init__(self, model: Optional[str] = None):
+        self.model = model
+        self.batcher = MicroBatcher(self._encode_batch)
+
+    def submit(self, text: str) -> Future:
+        """Future resolving to the embedding of one text"""
+        return self.batcher.submit(text)
+
+    def encode(self, text: str) -> np.ndarray:
+        """1-D embedding of one text (waits for its batch)"""
+        return self.submit(text).result()
+
+    def encode_many(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        Embeddings of many texts, one row per text
+
+        For bulk paths: the texts are queued together, so they are encoded
+        in full batches without waiting.
+        """
+        futures = self.batcher.submit_many(texts)
+        if not futures:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([future.result() for future in futures])
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        if inference_client.enabled:
+            return inference_client.embed(texts, self.model)
+        return model_registry.get('sentence_transformer', self.model).encode(texts)
+
+
+# Global embedding service instance
+embedding_service = EmbeddingService()
@@ -0,0 +1,148 @@
+"""
+Client for the local inference service
+Web workers use it to reach the ASR, embedding and summarization models
+hosted once by ``manage.py run_inference_server`` over a Unix socket,
+instead of loading their own copy of every model
+"""
+from __future__ import annotations
+import json
+import socket
+import struct
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+
+class InferenceError(Exception):
+    """Raised when the inference service is unreachable or a call fails"""
+
+
+# ----------------------------------------------------------------------
+# Wire protocol
+#
+# Every message is: 4-byte big-endian header length, UTF-8 JSON header,
+# then ``header['payload_bytes']`` bytes of raw binary payload (audio
+# samples, PCM or an embedding matrix). Binary data never goes through JSON.
+# ----------------------------------------------------------------------
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def send_message(sock: socket.socket, header: Dict, payload: bytes = b'') -> None:
+    header = dict(header, payload_bytes=len(payload))
+    encoded = json.dumps(header, default=_json_default).encode('utf-8')
+    sock.sendall(struct.pack('>I', len(encoded)) + encoded + payload)
+
+
+def recv_message(sock: socket.socket) -> Tuple[Dict, bytes]:
+    (header_length,) = struct.unpack('>I', _recv_exact(sock, 4))
+    header = json.loads(_recv_exact(sock, header_length).decode('utf-8'))
+    payload = _recv_exact(sock, header.get('payload_bytes', 0))
+    return header, payload
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(min(remaining, 1 << 20))
+        if not chunk:
+            raise ConnectionError('Connection closed by peer')
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+def encode_array(array: np.ndarray) -> Tuple[Dict, bytes]:
+    array = np.ascontiguousarray(array, dtype=np.float32)
+    return {'dtype': 'float32', 'shape': list(array.shape)}, array.tobytes()
+
+
+def decode_array(meta: Dict, payload: bytes) -> np.ndarray:
+    return np.frombuffer(payload, dtype=meta.get('dtype', 'float32')).reshape(meta['shape'])
+
+
+# ----------------------------------------------------------------------
+# Client
+# ----------------------------------------------------------------------
+
+class InferenceClient:
+    """Thin RPC client; one short-lived connection per call (thread-safe)"""
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: Optional[float] = None):
+        self._socket_path = socket_path
+        self._timeout = timeout
+        self._force_local = False
+
+    @property
+    def socket_path(self) -> str:
+        return self._socket_path or getattr(settings, 'ML_INFERENCE_SOCKET', '')
+
+    @property
+    def timeout(self) -> float:
+        return self._timeout or getattr(settings, 'ML_INFERENCE_TIMEOUT', 300)
+
+    @property
+    def enabled(self) -> bool:
+        """True when callers should use the remote service instead of local models"""
+        return bool(self.socket_path) and not self._force_local
+
+    def force_local(self):
+        """Used by the inference server itself so it never calls itself"""
+        self._force_local = True
+
+    def transcribe(self, samples: np.ndarray, language: str, model_size: str = 'base', **options) -> Dict:
+        """Whisper transcription of a 16 kHz float32 buffer; returns Whisper's result dict"""
+        meta, payload = encode_array(samples)
+        result, _ = self._call('transcribe', {
+            'language': language, 'model_size': model_size, 'options': options, 'audio': meta
+        }, payload)
+        return result
+
+    def embed(self, texts: List[str], model: Optional[str] = None) -> np.ndarray:
+        """Sentence-transformer embeddings, one row per text"""
+        result, payload = self._call('embed', {'texts': list(texts), 'model': model})
+        return decode_array(result['embeddings'], payload)
+
+    def summarize(self, model_name: str, text: str, **options) -> List[Dict]:
+        """Run a summarization pipeline; returns the pipeline output"""
+        result, _ = self._call('summarize', {'model_name': model_name, 'text': text, 'options': options})
+        return result['summaries']
+
+    def vosk_transcribe(self, pcm: bytes, language: str, sample_rate: int = 16000, **options) -> Dict:
+        """Vosk recognition of 16-bit mono PCM; returns {'text', 'words', 'success'}"""
+        result, _ = self._call('vosk_transcribe', {
+            'language': language, 'sample_rate': sample_rate, 'options': options
+        }, pcm)
+        return result
+
+    def status(self) -> Dict:
+        result, _ = self._call('status', {})
+        return result
+
+    def _call(self, op: str, args: Dict, payload: bytes = b'') -> Tuple[Dict, bytes]:
+        if not self.socket_path:
+            raise InferenceError('ML_INFERENCE_SOCKET is not configured')
+
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(self.socket_path)
+                send_message(sock, {'op': op, 'args': args}, payload)
+                header, response_payload = recv_message(sock)
+        except (OSError, ConnectionError, ValueError) as e:
+            raise InferenceError(f'Inference service unavailable at {self.socket_path}: {e}')
+
+        if not header.get('ok'):
+            raise InferenceError(header.get('error', f'Inference call {op} failed'))
+        return header.get('result', {}), response_payload
+
+
+# Global client instance
+inference_client = InferenceClient()
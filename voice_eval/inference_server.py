@@ -0,0 +1,155 @@
+"""
+Local inference service
+Hosts Whisper, sentence-transformers, Vosk and the summarization pipelines
+once per machine and serves the web workers over a Unix socket (see
+``inference_client`` for the wire protocol)
+"""
+from __future__ import annotations
+import logging
+import os
+import socketserver
+import threading
+import time
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+
+from .embedding_service import MicroBatcher
+from .inference_client import decode_array, encode_array, recv_message, send_message
+from .model_registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceHandlers:
+    """
+    Implementation of every RPC operation
+
+    Each handler receives (args, payload) and returns (result, payload).
+    Models are shared by all connections; a lock per model serializes calls
+    into it, since Whisper and the torch pipelines are not safe to run
+    concurrently on the same instance while unrelated models still can.
+    Embedding requests from all workers are micro-batched instead.
+    """
+
+    def __init__(self):
+        self._locks = {}
+        self._batchers = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.calls = {}
+
+    def dispatch(self, op: str, args: Dict, payload: bytes) -> Tuple[Dict, bytes]:
+        handler: Callable = getattr(self, f'op_{op}', None)
+        if handler is None:
+            raise ValueError(f'Unknown operation: {op}')
+        self.calls[op] = self.calls.get(op, 0) + 1
+        return handler(args, payload)
+
+    def op_transcribe(self, args: Dict, payload: bytes) -> Tuple[Dict, bytes]:
+        samples = decode_array(args['audio'], payload)
+        model_size = args.get('model_size') or 'base'
+        model = model_registry.get('whisper', model_size)
+        with self._model_lock('whisper', model_size):
+            result = model.transcribe(samples, language=args.get('language'), **args.get('options', {}))
+        return result, b''
+
+    def op_embed(self, args: Dict, payload: bytes) -> Tuple[Dict, bytes]:
+        texts = args.get('texts', [])
+        futures = self._embedding_batcher(args.get('model')).submit_many(texts)
+        embeddings = np.stack([future.result() for future in futures]) if futures else np.empty((0, 0), dtype=np.float32)
+        meta, data = encode_array(embeddings)
+        return {'embeddings': meta}, data
+
+    def op_summarize(self, args: Dict, payload: bytes) -> Tuple[Dict, bytes]:
+        model_name = args['model_name']
+        summarizer = model_registry.get('summarizer', model_name)
+        if summarizer is None:
+            raise RuntimeError(f'Summarization model {model_name} is not available')
+        with self._model_lock('summarizer', model_name):
+            summaries = summarizer(args['text'], **args.get('options', {}))
+        return {'summaries': summaries}, b''
+
+    def op_vosk_transcribe(self, args: Dict, payload: bytes) -> Tuple[Dict, bytes]:
+        from .pronunciation_service import pronunciation_service
+        # Recognizers come from the service's pool (one per concurrent call); the Vosk model is shared
+        return pronunciation_service.recognize_pcm(
+            payload, args.get('sample_rate', 16000), args.get('language', 'en'),
+            args.get('options', {}).get('expected_text')
+        ), b''
+
+    def op_status(self, args: Dict, payload: bytes) -> Tuple[Dict, bytes]:
+        return {
+            'pid': os.getpid(),
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'calls': dict(self.calls),
+            'embedding_batches': {str(variant): batcher.stats() for variant, batcher in self._batchers.items()},
+            'models': model_registry.report(),
+        }, b''
+
+    def _embedding_batcher(self, variant) -> MicroBatcher:
+        # The batcher thread is the only caller of the model, so no model lock
+        with self._lock:
+            batcher = self._batchers.get(variant)
+            if batcher is None:
+                batcher = self._batchers[variant] = MicroBatcher(
+                    lambda texts: model_registry.get('sentence_transformer', variant).encode(texts)
+                )
+            return batcher
+
+    def _model_lock(self, name, variant) -> threading.Lock:
+        with self._lock:
+            lock = self._locks.get((name, variant))
+            if lock is None:
+                lock = self._locks[(name, variant)] = threading.Lock()
+            return lock
+
+
+class InferenceRequestHandler(socketserver.BaseRequestHandler):
+    """One request/response exchange per connection"""
+
+    def handle(self):
+        try:
+            header, payload = recv_message(self.request)
+        except (ConnectionError, ValueError) as e:
+            logger.warning("Dropping malformed inference request: %s", e)
+            return
+
+        op = header.get('op', '')
+        started = time.monotonic()
+        try:
+            result, response_payload = self.server.handlers.dispatch(op, header.get('args', {}), payload)
+            response = {'ok': True, 'result': result}
+        except Exception as e:
+            logger.exception("Inference operation %s failed", op)
+            response, response_payload = {'ok': False, 'error': f'{type(e).__name__}: {e}'}, b''
+
+        try:
+            send_message(self.request, response, response_payload)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("Could not send %s response: %s", op, e)
+        logger.debug("%s handled in %.3fs", op, time.monotonic() - started)
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, handlers: InferenceHandlers = None):
+        # A stale socket file from a previous run would make bind() fail
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        directory = os.path.dirname(socket_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.socket_path = socket_path
+        self.handlers = handlers or InferenceHandlers()
+        super().__init__(socket_path, InferenceRequestHandler)
+        os.chmod(socket_path, 0o660)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.remove(self.socket_path)
+        except OSError:
+            pass
@@ -0,0 +1,67 @@
+"""Management command timing the voice scoring functions on synthetic fixtures"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voice_eval.benchmarks import (
+    DEFAULT_DURATIONS, DEFAULT_REFERENCE_COUNTS, compare_reports, result_key, run_benchmarks
+)
+
+
+def _numbers(value, cast):
+    try:
+        return [cast(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise CommandError(f'Expected a comma-separated list of numbers, got "{value}"')
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the voice scoring functions and write a JSON report (compare runs across commits)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--durations', default=','.join(map(str, DEFAULT_DURATIONS)),
+                            help='Synthetic audio/transcript lengths in seconds (default: 10,60,300)')
+        parser.add_argument('--references', default=','.join(map(str, DEFAULT_REFERENCE_COUNTS)),
+                            help='Reference set sizes for originality (default: 10,1000,10000)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case (default: 5)')
+        parser.add_argument('--only', help='Only run cases whose name contains this string')
+        parser.add_argument('--language', choices=['en', 'fr'], default='en')
+        parser.add_argument('--output', help='Write the JSON report to this file (default: stdout)')
+        parser.add_argument('--compare', help='Baseline JSON report to compare median times against')
+
+    def handle(self, *args, **options):
+        report = run_benchmarks(
+            durations=[int(d) if d.is_integer() else d for d in _numbers(options['durations'], float)],
+            reference_counts=_numbers(options['references'], int),
+            repeat=max(options['repeat'], 1),
+            only=options['only'],
+            language=options['language'],
+        )
+
+        for result in report['results']:
+            if 'skipped' in result:
+                self.stderr.write(f"{result_key(result):<55} skipped: {result['skipped']}")
+            else:
+                self.stderr.write(f"{result_key(result):<55} {result['median_ms']:>12.3f} ms")
+
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Could not read baseline report: {e}')
+            report['comparison'] = {
+                'baseline_commit': baseline.get('environment', {}).get('commit'),
+                'cases': compare_reports(baseline, report),
+            }
+            for row in report['comparison']['cases']:
+                style = self.style.ERROR if row['ratio'] > 1.1 else self.style.SUCCESS
+                self.stderr.write(style(f"{row['case']:<55} x{row['ratio']:.2f} vs baseline"))
+
+        data = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(data + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+        else:
+            self.stdout.write(data)
@@ -0,0 +1,86 @@
+"""Management command generating certificates in bulk (end-of-term ceremonies)"""
+from datetime import datetime
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from voice_eval.certificate_service import (
+    certificate_generator, CERTIFICATE_MIN_SCORE, CERTIFICATE_TRANSCRIPTION_PROFILE,
+)
+from voice_eval.models import Certificate, VoiceEvaluation
+
+
+class Command(BaseCommand):
+    help = ('Issue certificates for every qualifying evaluation (transcribed with the accurate profile) '
+            'and optionally write one printable PDF')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Only evaluations created on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--language', choices=['en', 'fr'], help='Only this language')
+        parser.add_argument('--min-score', type=float, default=CERTIFICATE_MIN_SCORE,
+                            help=f'Minimum total score (default: {CERTIFICATE_MIN_SCORE})')
+        parser.add_argument('--output', help='Also write every certificate into this multi-page PDF')
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate the PDF of certificates that already have one')
+
+    def handle(self, *args, **options):
+        min_score = max(options['min_score'], CERTIFICATE_MIN_SCORE)
+        evaluations = VoiceEvaluation.objects.filter(
+            processing_status='completed', total_score__gte=min_score
+        ).select_related('user').order_by('user__last_name', 'user__username', 'created_at')
+
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d')
+            except ValueError:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+            evaluations = evaluations.filter(created_at__gte=timezone.make_aware(since))
+        if options['language']:
+            evaluations = evaluations.filter(language=options['language'])
+
+        # Scores from a faster transcription profile are not certified
+        uncertified = evaluations.exclude(transcription_profile=CERTIFICATE_TRANSCRIPTION_PROFILE).count()
+        if uncertified:
+            self.stderr.write(f'{uncertified} qualifying evaluation(s) skipped: not transcribed with the '
+                              f'{CERTIFICATE_TRANSCRIPTION_PROFILE} profile')
+        evaluations = evaluations.filter(transcription_profile=CERTIFICATE_TRANSCRIPTION_PROFILE)
+
+        existing = {
+            certificate.evaluation_id: certificate
+            for certificate in Certificate.objects.filter(evaluation__in=evaluations)
+        }
+
+        entries = []
+        issued = rendered = 0
+        for evaluation in evaluations:
+            certificate = existing.get(evaluation.pk)
+            if certificate is None:
+                certificate = Certificate.objects.create(
+                    user=evaluation.user,
+                    evaluation=evaluation,
+                    language=evaluation.language,
+                    level=evaluation.estimated_level,
+                    score=evaluation.total_score
+                )
+                issued += 1
+
+            if options['force'] or not certificate.pdf_file:
+                pdf_buffer = certificate_generator.generate_certificate(
+                    evaluation.user, evaluation, certificate.certificate_id
+                )
+                certificate.pdf_file.save(
+                    f'certificate_{certificate.certificate_id}.pdf', ContentFile(pdf_buffer.read()), save=True
+                )
+                rendered += 1
+
+            entries.append((evaluation.user, evaluation, certificate.certificate_id))
+
+        if options['output'] and entries:
+            with open(options['output'], 'wb') as f:
+                f.write(certificate_generator.generate_batch(entries).getvalue())
+            self.stdout.write(f'Wrote {len(entries)} page(s) to {options["output"]}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(entries)} certificate(s): {issued} issued, {rendered} PDF(s) rendered'
+        ))
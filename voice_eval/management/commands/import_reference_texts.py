@@ -0,0 +1,76 @@
+"""Management command to bulk import reference texts with their embeddings"""
+import csv
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voice_eval.models import ReferenceText, VoiceEvaluation
+from voice_eval.embedding_service import embedding_service
+from voice_eval.reference_index import reference_index
+
+LANGUAGES = [code for code, _ in VoiceEvaluation.LANGUAGE_CHOICES]
+
+
+class Command(BaseCommand):
+    help = 'Import reference texts from a CSV, JSON or JSON Lines file, embedding them in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File with language, theme, text and optional source columns/keys')
+        parser.add_argument('--language', choices=LANGUAGES,
+                            help='Language of rows that do not specify one')
+        parser.add_argument('--source', help='Source of rows that do not specify one')
+        parser.add_argument('--batch-size', type=int, default=256,
+                            help='Texts embedded and inserted per batch (default: 256)')
+
+    def handle(self, *args, **options):
+        rows = self._read(options['path'])
+        existing = set(ReferenceText.objects.values_list('language', 'theme', 'text'))
+
+        references, skipped = [], 0
+        for number, row in enumerate(rows, start=1):
+            language = (row.get('language') or options['language'] or '').strip()
+            theme = (row.get('theme') or '').strip()
+            text = (row.get('text') or '').strip()
+            if language not in LANGUAGES or not theme or not text:
+                self.stderr.write(f'Row {number}: language, theme and text are required, skipped')
+                skipped += 1
+                continue
+            if (language, theme, text) in existing:
+                skipped += 1
+                continue
+            existing.add((language, theme, text))
+            references.append(ReferenceText(
+                language=language, theme=theme, text=text,
+                source=(row.get('source') or options['source'] or None),
+            ))
+
+        batch_size = max(options['batch_size'], 1)
+        for start in range(0, len(references), batch_size):
+            batch = references[start:start + batch_size]
+            embeddings = embedding_service.encode_many(reference.text for reference in batch)
+            for reference, embedding in zip(batch, embeddings):
+                reference.embedding = embedding.tolist()
+            # bulk_create skips the post_save signal: the index is rebuilt below
+            ReferenceText.objects.bulk_create(batch)
+            self.stdout.write(f'Imported {start + len(batch)}/{len(references)} reference(s)')
+
+        for language in sorted({reference.language for reference in references}):
+            count = reference_index.rebuild_from_db(language)[language]
+            self.stdout.write(f'{language}: {count} reference(s) indexed')
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(references)} reference text(s) imported, {skipped} skipped'
+        ))
+
+    def _read(self, path):
+        if not os.path.exists(path):
+            raise CommandError(f'File not found: {path}')
+        extension = os.path.splitext(path)[1].lower()
+        with open(path, encoding='utf-8') as f:
+            if extension == '.csv':
+                return list(csv.DictReader(f))
+            if extension == '.json':
+                return json.load(f)
+            if extension in ('.jsonl', '.ndjson'):
+                return [json.loads(line) for line in f if line.strip()]
+        raise CommandError('Expected a .csv, .json or .jsonl file')
@@ -0,0 +1,66 @@
+"""Management command running the background worker for voice evaluations"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from voice_eval.model_registry import warm_up_from_settings
+from voice_eval.processing_service import evaluation_processor
+
+
+class Command(BaseCommand):
+    help = 'Process pending voice evaluations (background worker for VOICE_EVAL_BACKGROUND_PROCESSING)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the pending queue once and exit instead of polling forever')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to sleep when the queue is empty (default: 2)')
+        parser.add_argument('--max-jobs', type=int, default=0,
+                            help='Exit after processing this many evaluations (0 = unlimited)')
+        parser.add_argument('--stale-after', type=int, default=30,
+                            help='Requeue evaluations stuck in processing for this many minutes (default: 30)')
+
+    def handle(self, *args, **options):
+        poll_interval = options['poll_interval']
+        max_jobs = options['max_jobs']
+        stale_after = timedelta(minutes=options['stale_after'])
+        processed = 0
+
+        self.stdout.write(self.style.SUCCESS('Voice evaluation worker started'))
+        warm_up_from_settings(background=False)
+
+        try:
+            while True:
+                close_old_connections()
+
+                requeued = evaluation_processor.requeue_stale(stale_after)
+                if requeued:
+                    self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale evaluation(s)'))
+
+                evaluation = evaluation_processor.claim_next()
+                if evaluation is None:
+                    if options['once']:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                started = time.monotonic()
+                ok = evaluation_processor.run(evaluation)
+                elapsed = time.monotonic() - started
+                processed += 1
+
+                if ok:
+                    self.stdout.write(f'Evaluation {evaluation.id} completed in {elapsed:.1f}s')
+                else:
+                    self.stdout.write(self.style.ERROR(
+                        f'Evaluation {evaluation.id} failed after {elapsed:.1f}s: {evaluation.error_message}'
+                    ))
+
+                if max_jobs and processed >= max_jobs:
+                    break
+        except KeyboardInterrupt:
+            self.stdout.write('Interrupted')
+
+        self.stdout.write(self.style.SUCCESS(f'Worker stopped after {processed} evaluation(s)'))
@@ -0,0 +1,34 @@
+"""Management command to rebuild the reference embedding index"""
+from django.core.management.base import BaseCommand
+
+from voice_eval.models import ReferenceText
+from voice_eval.embedding_service import embedding_service
+from voice_eval.reference_index import reference_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the memory-mapped reference text embedding index used for originality checks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--language', choices=['en', 'fr'],
+                            help='Only rebuild this language (default: all)')
+        parser.add_argument('--embed-missing', action='store_true',
+                            help='Generate embeddings for reference texts that have none')
+
+    def handle(self, *args, **options):
+        language = options.get('language')
+
+        if options['embed_missing']:
+            missing = ReferenceText.objects.filter(embedding=[])
+            if language:
+                missing = missing.filter(language=language)
+            missing = list(missing)
+            embeddings = embedding_service.encode_many(reference.text for reference in missing)
+            for reference, embedding in zip(missing, embeddings):
+                reference.embedding = embedding.tolist()
+                self.stdout.write(f'Embedded reference {reference.pk} ({reference.theme})')
+            ReferenceText.objects.bulk_update(missing, ['embedding'], batch_size=500)
+
+        counts = reference_index.rebuild_from_db(language)
+        for lang, count in counts.items():
+            self.stdout.write(self.style.SUCCESS(f'{lang}: {count} reference(s) indexed'))
@@ -0,0 +1,45 @@
+"""Management command to rebuild the past-submissions embedding index"""
+from django.core.management.base import BaseCommand
+
+from voice_eval.models import VoiceEvaluation
+from voice_eval.ai_service import voice_service
+from voice_eval.submission_index import submission_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the IVF index of completed evaluations used for cross-student originality checks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--language', choices=['en', 'fr'],
+                            help='Only rebuild this language (default: all)')
+        parser.add_argument('--embed-missing', action='store_true',
+                            help='Generate embeddings for completed evaluations that have none')
+        parser.add_argument('--batch-size', type=int, default=64,
+                            help='Transcriptions encoded per call with --embed-missing (default: 64)')
+
+    def handle(self, *args, **options):
+        language = options.get('language')
+
+        if options['embed_missing']:
+            missing = (
+                VoiceEvaluation.objects.filter(processing_status='completed', transcription_embedding=[])
+                .exclude(transcription__isnull=True).exclude(transcription='')
+                .only('id', 'transcription').order_by('pk')
+            )
+            if language:
+                missing = missing.filter(language=language)
+            batch_size = max(options['batch_size'], 1)
+            embedded = 0
+            batch = list(missing[:batch_size])
+            while batch:
+                embeddings = voice_service.encode_texts([evaluation.transcription for evaluation in batch])
+                for evaluation, embedding in zip(batch, embeddings):
+                    evaluation.transcription_embedding = embedding.tolist()
+                VoiceEvaluation.objects.bulk_update(batch, ['transcription_embedding'])
+                embedded += len(batch)
+                self.stdout.write(f'Embedded {embedded} evaluation(s)')
+                batch = list(missing[:batch_size])
+
+        counts = submission_index.rebuild_from_db(language)
+        for lang, count in counts.items():
+            self.stdout.write(self.style.SUCCESS(f'{lang}: {count} submission(s) indexed'))
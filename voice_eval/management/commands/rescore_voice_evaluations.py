@@ -0,0 +1,57 @@
+"""Management command recomputing scores, levels and feedback of completed voice evaluations"""
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voice_eval.rescore_service import DEFAULT_CHECKPOINT, rescore_service
+
+
+class Command(BaseCommand):
+    help = ('Rescore completed voice evaluations from their stored transcription and audio features '
+            '(after changing score weights, level thresholds or feedback)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (default: number of CPUs, 1 = in this process)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Evaluations per database write and checkpoint (default: 500)')
+        parser.add_argument('--language', choices=['en', 'fr'], help='Only rescore evaluations in this language')
+        parser.add_argument('--resume', action='store_true',
+                            help='Continue an interrupted run from its checkpoint')
+        parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT,
+                            help=f'Checkpoint file (default: {DEFAULT_CHECKPOINT})')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--workers and --batch-size must be at least 1')
+        if not options['resume'] and os.path.exists(options['checkpoint']):
+            self.stdout.write(self.style.WARNING(
+                'A previous run was interrupted; starting over (use --resume to continue it)'
+            ))
+
+        stats = rescore_service.run(
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            language=options['language'],
+            checkpoint=options['checkpoint'],
+            resume=options['resume'],
+            on_progress=self._report,
+        )
+
+        recomputed = stats['recomputed']
+        self.stdout.write(self.style.SUCCESS(
+            f"Rescored {stats['rescored']} evaluation(s), {stats['failed']} failed "
+            f"(re-transcribed {recomputed['transcription']}, re-extracted audio features {recomputed['audio_features']})"
+        ))
+
+    def _report(self, stats):
+        done = stats['rescored'] + stats['failed']
+        elapsed = time.monotonic() - stats['started_at']
+        rate = (done - stats['resumed']) / elapsed if elapsed > 0 else 0.0
+        remaining = (stats['total'] - done) / rate if rate else 0.0
+        percent = done * 100 / stats['total'] if stats['total'] else 100
+        self.stdout.write(
+            f"{done}/{stats['total']} ({percent:.0f}%) - {stats['failed']} failed - "
+            f"{rate:.1f}/s, about {remaining:.0f}s left"
+        )
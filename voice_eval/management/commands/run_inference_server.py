@@ -0,0 +1,38 @@
+"""Management command running the local inference service shared by the web workers"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from voice_eval.inference_client import inference_client
+from voice_eval.inference_server import InferenceServer
+from voice_eval.model_registry import warm_up_from_settings
+
+
+class Command(BaseCommand):
+    help = 'Serve Whisper, embedding, Vosk and summarization models over a Unix socket (ML_INFERENCE_SOCKET)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default='',
+                            help='Socket path (default: settings.ML_INFERENCE_SOCKET)')
+        parser.add_argument('--no-warmup', action='store_true',
+                            help='Load models on first request instead of at startup')
+
+    def handle(self, *args, **options):
+        socket_path = options['socket'] or settings.ML_INFERENCE_SOCKET
+        if not socket_path:
+            raise CommandError('No socket path: pass --socket or set ML_INFERENCE_SOCKET')
+
+        # This process hosts the models, it must never forward calls to itself
+        inference_client.force_local()
+
+        if not options['no_warmup']:
+            self.stdout.write('Warming up models...')
+            warm_up_from_settings(background=False)
+
+        server = InferenceServer(socket_path)
+        self.stdout.write(self.style.SUCCESS(f'Inference service listening on {socket_path}'))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('Interrupted')
+        finally:
+            server.server_close()
@@ -1,7 +1,15 @@
 """Service for generating maps with testing center locations"""
+import time
+
 import folium
 from folium import plugins
 from django.conf import settings
+from django.core.cache import cache
+
+# Bumped by the TestingCenter save/delete signals; part of every map cache key
+CENTERS_VERSION_KEY = 'testing_centers:version'
+# Rendered maps only change with the version, the timeout just frees space
+MAP_CACHE_TIMEOUT = 7 * 24 * 3600
 
 
 class TestingCenterMapService:
@@ -128,6 +136,36 @@ class TestingCenterMapService:
         
         # Return HTML
         return m._repr_html_()
+
+    def centers_version(self):
+        """Current version of the testing center data"""
+        # Seeded from the clock so a lost version key never revives stale maps
+        return cache.get_or_set(CENTERS_VERSION_KEY, lambda: int(time.time() * 1000), timeout=None)
+
+    def bump_centers_version(self):
+        """Invalidate every cached map (called when a testing center changes)"""
+        try:
+            cache.incr(CENTERS_VERSION_KEY)
+        except ValueError:
+            cache.set(CENTERS_VERSION_KEY, int(time.time() * 1000), timeout=None)
+
+    def get_language_map(self, language, centers):
+        """
+        Map of the testing centers for one language, rendered once per data version
+
+        Args:
+            language: Language code the centers were filtered on
+            centers: Active TestingCenter objects supporting that language
+
+        Returns:
+            HTML string of the folium map
+        """
+        key = f'testing_centers:map:{language}:{self.centers_version()}'
+        map_html = cache.get(key)
+        if map_html is None:
+            map_html = self.generate_map(centers)
+            cache.set(key, map_html, MAP_CACHE_TIMEOUT)
+        return map_html
     
     def get_nearby_centers(self, centers, user_location, max_distance_km=50):
         """
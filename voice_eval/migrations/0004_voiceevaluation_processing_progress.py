@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voice_eval', '0003_testingcenter_pronunciationpractice_certificate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voiceevaluation',
+            name='processing_finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='voiceevaluation',
+            name='processing_progress',
+            field=models.JSONField(blank=True, default=dict, help_text='Per-stage processing progress'),
+        ),
+        migrations.AddField(
+            model_name='voiceevaluation',
+            name='processing_stage',
+            field=models.CharField(blank=True, default='', help_text='Pipeline stage currently running', max_length=30),
+        ),
+        migrations.AddField(
+            model_name='voiceevaluation',
+            name='processing_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('voice_eval', '0004_voiceevaluation_processing_progress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoiceProgressSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('evaluation_count', models.PositiveIntegerField(default=0)),
+                ('average_scores', models.JSONField(blank=True, default=dict, help_text='Running average of each score field')),
+                ('first_score', models.FloatField(default=0.0)),
+                ('previous_score', models.FloatField(default=0.0)),
+                ('latest_score', models.FloatField(default=0.0)),
+                ('latest_level', models.CharField(blank=True, choices=[('A1', 'Beginner - A1'), ('A2', 'Elementary - A2'), ('B1', 'Intermediate - B1'), ('B2', 'Upper Intermediate - B2'), ('C1', 'Advanced - C1'), ('C2', 'Proficient - C2')], max_length=2, null=True)),
+                ('best_score', models.FloatField(default=0.0)),
+                ('level_transitions', models.JSONField(blank=True, default=list, help_text='Recent estimated level changes')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('best_evaluation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='voice_eval.voiceevaluation')),
+                ('latest_evaluation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='voice_eval.voiceevaluation')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='voice_progress', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Voice Progress Summaries',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voice_eval', '0005_voiceprogresssummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voiceevaluation',
+            name='stage_timings',
+            field=models.JSONField(blank=True, default=dict, help_text='Per-stage wall-clock and CPU time (ms)'),
+        ),
+    ]
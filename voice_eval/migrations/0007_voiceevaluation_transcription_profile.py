@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voice_eval', '0006_voiceevaluation_stage_timings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voiceevaluation',
+            name='transcription_profile',
+            field=models.CharField(choices=[('fast', 'Fast (practice and preview)'), ('standard', 'Standard'), ('accurate', 'Accurate (certificate grade)')], default='standard', help_text='Whisper model and decoding settings used for the transcription', max_length=10),
+        ),
+    ]
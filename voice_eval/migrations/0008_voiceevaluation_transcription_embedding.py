@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 08:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voice_eval', '0007_voiceevaluation_transcription_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voiceevaluation',
+            name='transcription_embedding',
+            field=models.JSONField(blank=True, default=list, help_text='Transcription embedding vector (cross-student originality index)'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 08:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voice_eval', '0008_voiceevaluation_transcription_embedding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voiceevaluation',
+            name='progress_recorded',
+            field=models.BooleanField(default=False, help_text="Counted in the user's progress summary (kept when requeued for reprocessing)"),
+        ),
+    ]
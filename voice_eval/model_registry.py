@@ -0,0 +1,291 @@
+"""
+Process-wide registry for heavy ML models
+Loads each model (Whisper, spaCy, sentence-transformers, Vosk, BART,
+KeyBERT) on demand, once per process and per variant, and keeps load
+times and memory estimates for reporting
+"""
+from __future__ import annotations
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def _current_rss_bytes() -> int:
+    """Resident set size of this process (0 when it cannot be measured)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def _parameter_bytes(model) -> int:
+    """Size of the weights for torch-based models (0 for anything else)"""
+    modules = [model]
+    # Pipelines and wrappers expose the torch module as an attribute
+    for attr in ('model', 'model_'):
+        inner = getattr(model, attr, None)
+        if inner is not None:
+            modules.append(inner)
+
+    for module in modules:
+        parameters = getattr(module, 'parameters', None)
+        if callable(parameters):
+            try:
+                return sum(p.numel() * p.element_size() for p in parameters())
+            except Exception:
+                return 0
+    return 0
+
+
+class ModelRegistry:
+    """
+    Thread-safe lazy model loader
+
+    Models are identified by a name and an optional variant (language code,
+    model size or checkpoint name). Each (name, variant) has its own lock so
+    concurrent first requests wait for a single load instead of loading the
+    model twice, while unrelated models can load in parallel.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable] = {}
+        self._models = {}
+        self._stats = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[Optional[str]], object]):
+        """
+        Register a loader
+
+        Args:
+            name: Model name used with ``get``
+            loader: Callable receiving the variant and returning the model,
+                or None when the model is unavailable (missing package or
+                files); None is cached like a loaded model
+        """
+        self._loaders[name] = loader
+
+    def get(self, name: str, variant: Optional[str] = None):
+        """Return the model, loading it on first use"""
+        key = (name, variant)
+        model = self._models.get(key, _MISSING)
+        if model is not _MISSING:
+            return model
+
+        with self._key_lock(key):
+            # Another thread may have finished loading while we waited
+            model = self._models.get(key, _MISSING)
+            if model is not _MISSING:
+                return model
+            return self._load(key)
+
+    def get_if_loaded(self, name: str, variant: Optional[str] = None):
+        """Return the model only if it is already in memory"""
+        return self._models.get((name, variant))
+
+    def is_loaded(self, name: str, variant: Optional[str] = None) -> bool:
+        return (name, variant) in self._models
+
+    def unload(self, name: str, variant: Optional[str] = None):
+        """Drop a model so it can be garbage collected"""
+        key = (name, variant)
+        with self._key_lock(key):
+            self._models.pop(key, None)
+            self._stats.pop(key, None)
+
+    def warm_up(self, specs: Iterable[str], background: bool = False):
+        """
+        Load a list of models ahead of the first request
+
+        Args:
+            specs: Entries like ``"whisper:base"``, ``"spacy:en"`` or
+                ``"sentence_transformer"`` (name, optional ``:variant``)
+            background: Load in a daemon thread so the caller is not blocked;
+                requests arriving meanwhile wait on the model locks
+        """
+        parsed = []
+        for spec in specs:
+            spec = spec.strip()
+            if not spec:
+                continue
+            name, _, variant = spec.partition(':')
+            parsed.append((name, variant or None))
+
+        def _run():
+            for name, variant in parsed:
+                if name not in self._loaders:
+                    logger.warning("Warm-up: unknown model %s", name)
+                    continue
+                try:
+                    self.get(name, variant)
+                except Exception:
+                    logger.exception("Warm-up failed for %s:%s", name, variant)
+
+        if background:
+            threading.Thread(target=_run, name='model-warmup', daemon=True).start()
+        else:
+            _run()
+
+    def report(self) -> List[Dict]:
+        """Load time and memory estimate for every model loaded in this process"""
+        report = []
+        for (name, variant), stats in sorted(self._stats.items(), key=lambda item: str(item[0])):
+            report.append({
+                'name': name,
+                'variant': variant,
+                'available': (name, variant) in self._models and self._models[(name, variant)] is not None,
+                **stats,
+            })
+        return report
+
+    def _key_lock(self, key) -> threading.Lock:
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def _load(self, key):
+        name, variant = key
+        loader = self._loaders.get(name)
+        if loader is None:
+            raise KeyError(f"No loader registered for model '{name}'")
+
+        rss_before = _current_rss_bytes()
+        started = time.monotonic()
+        model = loader(variant)
+        load_seconds = time.monotonic() - started
+        rss_delta = max(_current_rss_bytes() - rss_before, 0)
+
+        self._stats[key] = {
+            'load_seconds': round(load_seconds, 3),
+            # RSS delta is only an estimate when several models load at once
+            'rss_delta_mb': round(rss_delta / (1024 ** 2), 1),
+            'parameter_mb': round(_parameter_bytes(model) / (1024 ** 2), 1) if model is not None else 0,
+            'loaded_at': time.time(),
+        }
+        self._models[key] = model
+
+        if model is None:
+            logger.warning("Model %s:%s is not available", name, variant)
+        else:
+            logger.info("Loaded model %s:%s in %.2fs (~%.0f MB)", name, variant,
+                        load_seconds, self._stats[key]['rss_delta_mb'])
+        return model
+
+
+# ----------------------------------------------------------------------
+# Default loaders
+# ----------------------------------------------------------------------
+
+SPACY_MODELS = {
+    'en': 'en_core_web_sm',
+    'fr': 'fr_core_news_sm',
+}
+
+# The verbal scorers only read POS tags, lemmas, dependencies and sentence
+# bounds (tok2vec, tagger/morphologizer, parser, lemmatizer), so the
+# entity recognizer is never loaded
+SPACY_EXCLUDE = ['ner']
+
+VOSK_MODELS = {
+    'en': 'vosk-model-small-en-us-0.15',
+    'fr': 'vosk-model-small-fr-0.22',
+}
+
+SENTENCE_TRANSFORMER_MODEL = 'paraphrase-multilingual-MiniLM-L12-v2'
+
+
+def _load_whisper(variant):
+    import whisper
+    return whisper.load_model(variant or 'base')
+
+
+def _load_spacy(language):
+    try:
+        import spacy
+        return spacy.load(SPACY_MODELS.get(language or 'en', SPACY_MODELS['en']), exclude=SPACY_EXCLUDE)
+    except (ImportError, OSError) as e:
+        logger.warning("spaCy model for %s not available (%s), using fallback NLP", language, e)
+        return None
+
+
+def _load_sentence_transformer(variant):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(variant or SENTENCE_TRANSFORMER_MODEL)
+
+
+def _load_vosk(language):
+    try:
+        from vosk import Model
+    except ImportError:
+        logger.warning("Vosk not available. Pronunciation service disabled.")
+        return None
+
+    path = os.path.join(settings.BASE_DIR, 'ml_models', 'vosk', VOSK_MODELS.get(language, ''))
+    if language not in VOSK_MODELS or not os.path.exists(path):
+        logger.warning("Vosk model not found at %s. Please download from: https://alphacephei.com/vosk/models", path)
+        return None
+    try:
+        return Model(path)
+    except Exception as e:
+        logger.error("Error loading Vosk model for %s: %s", language, e)
+        return None
+
+
+def _load_summarizer(model_name):
+    try:
+        from transformers import pipeline
+    except ImportError:
+        return None
+    return pipeline(
+        "summarization",
+        model=model_name,
+        tokenizer=model_name,
+        device=-1,  # CPU
+        framework="pt"
+    )
+
+
+def _load_keybert(variant):
+    try:
+        from keybert import KeyBERT
+    except ImportError:
+        return None
+    return KeyBERT(variant) if variant else KeyBERT()
+
+
+# Global registry instance
+model_registry = ModelRegistry()
+model_registry.register('whisper', _load_whisper)
+model_registry.register('spacy', _load_spacy)
+model_registry.register('sentence_transformer', _load_sentence_transformer)
+model_registry.register('vosk', _load_vosk)
+model_registry.register('summarizer', _load_summarizer)
+model_registry.register('keybert', _load_keybert)
+
+
+def warm_up_from_settings(background: bool = True):
+    """Warm up the models listed in ``settings.ML_WARMUP_MODELS``"""
+    from .inference_client import inference_client
+    if inference_client.enabled:
+        # The inference service holds the models; clients stay lightweight
+        return
+    specs = getattr(settings, 'ML_WARMUP_MODELS', [])
+    if specs:
+        model_registry.warm_up(specs, background=background)
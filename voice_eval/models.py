@@ -31,6 +31,12 @@ class VoiceEvaluation(models.Model):
         ('C2', 'Proficient - C2'),
     ]
     
+    TRANSCRIPTION_PROFILE_CHOICES = [
+        ('fast', 'Fast (practice and preview)'),
+        ('standard', 'Standard'),
+        ('accurate', 'Accurate (certificate grade)'),
+    ]
+    
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='voice_evaluations')
     audio_file = models.FileField(upload_to=voice_upload_path, max_length=500)
     language = models.CharField(max_length=2, choices=LANGUAGE_CHOICES, default='en')
@@ -38,6 +44,13 @@ class VoiceEvaluation(models.Model):
     
     # Transcription
     transcription = models.TextField(blank=True, null=True)
+    transcription_profile = models.CharField(
+        max_length=10, choices=TRANSCRIPTION_PROFILE_CHOICES, default='standard',
+        help_text="Whisper model and decoding settings used for the transcription"
+    )
+    transcription_embedding = models.JSONField(
+        default=list, blank=True, help_text="Transcription embedding vector (cross-student originality index)"
+    )
     
     # Verbal Communication Scores (0-100)
     fluency_score = models.FloatField(default=0.0, help_text="Fluency evaluation (0-100)")
@@ -78,8 +91,16 @@ class VoiceEvaluation(models.Model):
         ],
         default='pending'
     )
+    processing_stage = models.CharField(max_length=30, blank=True, default='', help_text="Pipeline stage currently running")
+    processing_progress = models.JSONField(default=dict, blank=True, help_text="Per-stage processing progress")
+    stage_timings = models.JSONField(default=dict, blank=True, help_text="Per-stage wall-clock and CPU time (ms)")
+    processing_started_at = models.DateTimeField(blank=True, null=True)
+    processing_finished_at = models.DateTimeField(blank=True, null=True)
+    progress_recorded = models.BooleanField(
+        default=False, help_text="Counted in the user's progress summary (kept when requeued for reprocessing)"
+    )
     error_message = models.TextField(blank=True, null=True)
-    
+
     class Meta:
         ordering = ['-created_at']
         indexes = [
@@ -127,6 +148,37 @@ class VoiceEvaluationHistory(models.Model):
         return f"{self.user.username} - Progress on {self.created_at.strftime('%Y-%m-%d')}"
 
 
+class VoiceProgressSummary(models.Model):
+    """Per-user voice progress statistics, updated as each evaluation completes"""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='voice_progress')
+    evaluation_count = models.PositiveIntegerField(default=0)
+    average_scores = models.JSONField(default=dict, blank=True, help_text="Running average of each score field")
+    first_score = models.FloatField(default=0.0)
+    previous_score = models.FloatField(default=0.0)
+    latest_score = models.FloatField(default=0.0)
+    latest_level = models.CharField(max_length=2, choices=VoiceEvaluation.LEVEL_CHOICES, blank=True, null=True)
+    latest_evaluation = models.ForeignKey(
+        VoiceEvaluation, on_delete=models.SET_NULL, blank=True, null=True, related_name='+'
+    )
+    best_score = models.FloatField(default=0.0)
+    best_evaluation = models.ForeignKey(
+        VoiceEvaluation, on_delete=models.SET_NULL, blank=True, null=True, related_name='+'
+    )
+    level_transitions = models.JSONField(default=list, blank=True, help_text="Recent estimated level changes")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Voice Progress Summaries"
+
+    def __str__(self):
+        return f"{self.user.username} - {self.evaluation_count} evaluations"
+
+    @property
+    def improvement(self):
+        """Latest score compared with the first one"""
+        return self.latest_score - self.first_score if self.evaluation_count > 1 else 0.0
+
+
 class Certificate(models.Model):
     """Store certificates for high-scoring evaluations"""
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='certificates')
@@ -0,0 +1,233 @@
+"""
+Paraverbal feature engine
+Computes one windowed STFT per recording on a fixed frame grid and derives
+every paraverbal metric (energy, zero-crossing rate, spectral shape, onset
+envelope and pitch) from it with vectorized NumPy, instead of running a
+separate librosa pass per feature
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict
+
+import numpy as np
+from scipy.ndimage import maximum_filter1d, uniform_filter1d
+
+# Bump when the metrics change so cached features are recomputed
+FEATURES_VERSION = 1
+
+# Same frame grid as librosa's defaults, so stored features stay comparable
+FRAME_LENGTH = 2048
+HOP_LENGTH = 512
+
+# Fundamental frequency search range for speech
+PITCH_FMIN = 65.0
+PITCH_FMAX = 500.0
+# Normalized autocorrelation peak needed to call a frame voiced
+VOICING_THRESHOLD = 0.35
+# Shortest-lag peak within this fraction of the best one wins (octave errors)
+OCTAVE_TOLERANCE = 0.9
+# Frames quieter than this fraction of the loudest frame are never voiced
+SILENCE_RATIO = 0.05
+
+SPECTRAL_ROLLOFF_PERCENT = 0.85
+
+# Frames processed per block; bounds peak memory on long recordings
+BLOCK_FRAMES = 1024
+
+
+@dataclass
+class FrameFeatures:
+    """Per-frame feature tracks on the HOP_LENGTH grid"""
+    sample_rate: int
+    rms: np.ndarray
+    zcr: np.ndarray
+    centroid: np.ndarray
+    rolloff: np.ndarray
+    onset_envelope: np.ndarray
+    f0: np.ndarray  # Hz, NaN for unvoiced frames
+
+    @property
+    def frame_rate(self) -> float:
+        return self.sample_rate / HOP_LENGTH
+
+
+def frame_signal(y: np.ndarray) -> np.ndarray:
+    """Centered, zero-padded frames as a strided view (n_frames, FRAME_LENGTH)"""
+    y = np.asarray(y, dtype=np.float32)
+    padded = np.pad(y, FRAME_LENGTH // 2)
+    if len(padded) < FRAME_LENGTH:
+        padded = np.pad(padded, (0, FRAME_LENGTH - len(padded)))
+    return np.lib.stride_tricks.sliding_window_view(padded, FRAME_LENGTH)[::HOP_LENGTH]
+
+
+def compute_frame_features(y: np.ndarray, sr: int) -> FrameFeatures:
+    """Run the STFT once and derive every per-frame track from it"""
+    frames = frame_signal(y)
+    n_frames = len(frames)
+    window = np.hanning(FRAME_LENGTH + 1)[:-1].astype(np.float32)
+    freqs = np.fft.rfftfreq(FRAME_LENGTH, 1.0 / sr).astype(np.float32)
+    min_lag = max(int(sr / PITCH_FMAX), 2)
+    max_lag = min(int(sr / PITCH_FMIN), FRAME_LENGTH // 2 - 1)
+    # Autocorrelation of the window itself; dividing by it removes the bias
+    # towards short lags (high pitch) that windowing introduces
+    window_autocorrelation = np.fft.irfft(np.abs(np.fft.rfft(window)) ** 2, n=FRAME_LENGTH)[:max_lag + 2]
+    window_autocorrelation = (window_autocorrelation / window_autocorrelation[0]).astype(np.float32)
+
+    rms = np.empty(n_frames, dtype=np.float32)
+    zcr = np.empty(n_frames, dtype=np.float32)
+    centroid = np.empty(n_frames, dtype=np.float32)
+    rolloff = np.empty(n_frames, dtype=np.float32)
+    flux = np.zeros(n_frames, dtype=np.float32)
+    f0 = np.full(n_frames, np.nan, dtype=np.float32)
+    periodicity = np.zeros(n_frames, dtype=np.float32)
+    previous_log = None
+
+    for start in range(0, n_frames, BLOCK_FRAMES):
+        block = frames[start:start + BLOCK_FRAMES]
+        stop = start + len(block)
+
+        # Time-domain tracks share the frame view
+        rms[start:stop] = np.sqrt(np.mean(block ** 2, axis=1))
+        signs = np.signbit(block)
+        zcr[start:stop] = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+        # The one spectral transform
+        spectrum = np.fft.rfft(block * window, axis=1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        magnitude = np.sqrt(power)
+
+        total = magnitude.sum(axis=1)
+        safe_total = np.where(total > 0, total, 1.0)
+        centroid[start:stop] = (magnitude @ freqs) / safe_total
+        cumulative = np.cumsum(magnitude, axis=1)
+        rolloff_bins = np.argmax(cumulative >= SPECTRAL_ROLLOFF_PERCENT * cumulative[:, -1:], axis=1)
+        rolloff[start:stop] = np.where(total > 0, freqs[rolloff_bins], 0.0)
+
+        # Onset envelope: half-wave rectified flux of the log-compressed spectrum
+        log_magnitude = np.log1p(magnitude)
+        if previous_log is not None:
+            log_magnitude_prev = np.vstack([previous_log[None, :], log_magnitude[:-1]])
+            flux[start:stop] = np.maximum(log_magnitude - log_magnitude_prev, 0).mean(axis=1)
+        else:
+            flux[start + 1:stop] = np.maximum(np.diff(log_magnitude, axis=0), 0).mean(axis=1)
+        previous_log = log_magnitude[-1]
+
+        # Pitch: autocorrelation is the inverse FFT of the power spectrum we already have
+        autocorrelation = np.fft.irfft(power, n=FRAME_LENGTH, axis=1)[:, :max_lag + 2]
+        energy = autocorrelation[:, :1]
+        normalized = autocorrelation / np.where(energy > 0, energy, 1.0) / window_autocorrelation
+        # A periodic frame peaks at every multiple of its period; take the
+        # shortest-lag local peak close to the best one to avoid octave errors
+        search = normalized[:, min_lag - 1:max_lag + 2]
+        middle = search[:, 1:-1]
+        is_peak = (middle > search[:, :-2]) & (middle >= search[:, 2:])
+        near_best = middle >= OCTAVE_TOLERANCE * middle.max(axis=1, keepdims=True)
+        candidates = is_peak & near_best
+        lags = np.where(
+            candidates.any(axis=1), np.argmax(candidates, axis=1), np.argmax(middle, axis=1)
+        ) + min_lag
+        rows = np.arange(len(block))
+        peaks = normalized[rows, lags]
+
+        # Parabolic interpolation around the peak for sub-sample lag precision
+        left, right = normalized[rows, lags - 1], normalized[rows, lags + 1]
+        denominator = left - 2 * peaks + right
+        curved = np.abs(denominator) > 1e-9
+        offset = np.where(curved, 0.5 * (left - right) / np.where(curved, denominator, 1.0), 0.0)
+        periodicity[start:stop] = peaks
+        f0[start:stop] = sr / (lags + np.clip(offset, -1, 1))
+
+    # Voicing decision needs the whole-recording loudness reference
+    loud_enough = rms >= SILENCE_RATIO * (rms.max() if n_frames else 0)
+    f0[~((periodicity >= VOICING_THRESHOLD) & loud_enough)] = np.nan
+
+    return FrameFeatures(
+        sample_rate=sr,
+        rms=rms,
+        zcr=zcr,
+        centroid=centroid,
+        rolloff=rolloff,
+        onset_envelope=flux,
+        f0=f0,
+    )
+
+
+def detect_onsets(envelope: np.ndarray, frame_rate: float) -> np.ndarray:
+    """
+    Peak-pick an onset envelope (same parameters as librosa.onset.onset_detect)
+
+    Returns:
+        Frame indices of the detected onsets
+    """
+    if not len(envelope) or envelope.max() <= envelope.min():
+        return np.empty(0, dtype=int)
+
+    envelope = (envelope - envelope.min()) / (envelope.max() - envelope.min())
+    pre_max = max(int(0.03 * frame_rate), 1)
+    average = max(int(0.10 * frame_rate), 1)
+    wait = max(int(0.03 * frame_rate), 1)
+    delta = 0.07
+
+    # Maximum over the window ending at each frame (pre_max frames back)
+    local_max = maximum_filter1d(envelope, size=pre_max + 1, origin=pre_max // 2, mode='constant')
+    local_mean = uniform_filter1d(envelope, size=2 * average + 1, mode='nearest')
+    candidates = np.flatnonzero((envelope >= local_max) & (envelope >= local_mean + delta))
+
+    # Enforce the minimum gap between onsets
+    onsets = []
+    last = -wait - 1
+    for index in candidates:
+        if index - last > wait:
+            onsets.append(index)
+            last = index
+    return np.asarray(onsets, dtype=int)
+
+
+def summarize_features(features: FrameFeatures, duration: float) -> Dict:
+    """Scalar paraverbal metrics, JSON-ready (stored in VoiceEvaluation.audio_features)"""
+    voiced = features.f0[~np.isnan(features.f0)]
+    onsets = detect_onsets(features.onset_envelope, features.frame_rate)
+    onset_intervals = np.diff(onsets) / features.frame_rate
+
+    return {
+        # Pitch
+        'pitch_mean': float(voiced.mean()) if len(voiced) else 0.0,
+        'pitch_std': float(voiced.std()) if len(voiced) else 0.0,
+        'pitch_range': float(voiced.max() - voiced.min()) if len(voiced) else 0.0,
+        'voiced_ratio': float(len(voiced) / len(features.f0)) if len(features.f0) else 0.0,
+        # Pace
+        'onset_count': int(len(onsets)),
+        'speaking_rate': float(len(onsets) / duration) if duration > 0 else 0.0,
+        'onset_interval_std': float(onset_intervals.std()) if len(onset_intervals) else 0.0,
+        # Energy
+        'rms_mean': float(features.rms.mean()) if len(features.rms) else 0.0,
+        'rms_std': float(features.rms.std()) if len(features.rms) else 0.0,
+        # Spectral shape
+        'spectral_centroid': float(features.centroid.mean()) if len(features.centroid) else 0.0,
+        'spectral_rolloff': float(features.rolloff.mean()) if len(features.rolloff) else 0.0,
+        'zero_crossing_rate': float(features.zcr.mean()) if len(features.zcr) else 0.0,
+    }
+
+
+# Keys written by summarize_features
+METRIC_KEYS = frozenset({
+    'pitch_mean', 'pitch_std', 'pitch_range', 'voiced_ratio',
+    'onset_count', 'speaking_rate', 'onset_interval_std',
+    'rms_mean', 'rms_std',
+    'spectral_centroid', 'spectral_rolloff', 'zero_crossing_rate',
+})
+
+
+def has_current_metrics(metrics: Dict) -> bool:
+    """
+    Whether stored metrics can be scored as they are
+
+    Rows saved before this engine only hold the spectral and energy
+    metrics; the pitch and pace scorers would fall back to fixed scores.
+    """
+    return bool(metrics) and METRIC_KEYS.issubset(metrics)
+
+
+def extract_paraverbal_metrics(y: np.ndarray, sr: int) -> Dict:
+    """One STFT pass over a recording, reduced to the scalar paraverbal metrics"""
+    return summarize_features(compute_frame_features(y, sr), len(y) / sr if sr else 0.0)
@@ -0,0 +1,488 @@
+"""
+Processing Service for Voice Evaluation
+Runs the evaluation pipeline stage by stage, either inline in the request
+or from the background worker (``manage.py process_voice_evaluations``)
+"""
+from __future__ import annotations
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import VoiceEvaluation, VoiceEvaluationHistory
+from .ai_service import voice_service
+from .audio_ingest import load_audio, AudioDecodeError
+from .progress_service import progress_service
+from .submission_index import submission_index
+
+logger = logging.getLogger(__name__)
+
+
+# Ordered pipeline stages (key, label)
+PROCESSING_STAGES = [
+    ('ingest', 'Audio decoding'),
+    ('transcribe', 'Transcription'),
+    ('verbal', 'Verbal analysis'),
+    ('paraverbal', 'Paraverbal analysis'),
+    ('originality', 'Originality check'),
+    ('scoring', 'Level and feedback'),
+]
+
+TERMINAL_STATUSES = ('completed', 'failed')
+
+# Keys of VoiceEvaluation.stage_timings, in pipeline order
+TIMED_STAGES = [key for key, _ in PROCESSING_STAGES] + ['save', 'total']
+
+
+class StageTimer:
+    """
+    Wall-clock and CPU time of each pipeline stage, in milliseconds
+
+    Timings are written straight into ``evaluation.stage_timings`` so they
+    are saved with the evaluation, including when a stage fails. CPU time is
+    process time: it includes model threads (torch, BLAS) but also anything
+    else the process runs concurrently.
+    """
+
+    def __init__(self, evaluation: VoiceEvaluation):
+        evaluation.stage_timings = {}
+        self.timings = evaluation.stage_timings
+        self._stage = None
+        self._started = (time.perf_counter(), time.process_time())
+        self._stage_started = self._started
+
+    def start(self, stage: str):
+        self.stop()
+        self._stage = stage
+        self._stage_started = (time.perf_counter(), time.process_time())
+
+    def stop(self):
+        if self._stage is None:
+            return
+        self.timings[self._stage] = self._elapsed(self._stage_started)
+        self._stage = None
+
+    @contextmanager
+    def measure(self, stage: str):
+        self.start(stage)
+        try:
+            yield
+        finally:
+            self.stop()
+
+    def finish(self):
+        """Record the end-to-end time as the 'total' entry"""
+        self.stop()
+        self.timings['total'] = self._elapsed(self._started)
+
+    @staticmethod
+    def _elapsed(started) -> Dict:
+        wall, cpu = started
+        return {
+            'wall_ms': round((time.perf_counter() - wall) * 1000, 1),
+            'cpu_ms': round((time.process_time() - cpu) * 1000, 1),
+        }
+
+
+def stage_timing_percentiles(timings: Iterable[Dict], percentiles=(50, 95, 99)) -> List[Dict]:
+    """
+    Per-stage wall/CPU percentiles over many evaluations' ``stage_timings``
+
+    Returns:
+        One dict per stage present (pipeline order) with the sample count
+        and ``wall_p50``/``cpu_p50``-style keys, in milliseconds
+    """
+    samples = {stage: ([], []) for stage in TIMED_STAGES}
+    for entry in timings:
+        for stage, values in (entry or {}).items():
+            if stage in samples:
+                samples[stage][0].append(values.get('wall_ms', 0.0))
+                samples[stage][1].append(values.get('cpu_ms', 0.0))
+
+    rows = []
+    for stage in TIMED_STAGES:
+        wall, cpu = samples[stage]
+        if not wall:
+            continue
+        row = {'stage': stage, 'count': len(wall)}
+        for p, w, c in zip(percentiles, np.percentile(wall, percentiles), np.percentile(cpu, percentiles)):
+            row[f'wall_p{p}'] = round(float(w), 1)
+            row[f'cpu_p{p}'] = round(float(c), 1)
+        rows.append(row)
+    return rows
+
+
+class EvaluationProcessor:
+    """Run the voice evaluation pipeline and record per-stage progress"""
+
+    # Weights: Verbal 40%, Paraverbal 30%, Originality 30%
+    SCORE_WEIGHTS = {'verbal': 0.4, 'paraverbal': 0.3, 'originality': 0.3}
+
+    def process(self, evaluation: VoiceEvaluation) -> VoiceEvaluation:
+        """
+        Process an evaluation from its audio file to its final scores
+
+        Args:
+            evaluation: VoiceEvaluation to process
+
+        Returns:
+            The processed evaluation (saved, status 'completed')
+
+        Raises:
+            Exception: if a required stage fails; the caller decides how to
+                record the failure (see ``mark_failed``)
+        """
+        # Reprocessing a counted evaluation (completed, or requeued after completing)
+        # must not count it twice in the progress summary
+        was_recorded = evaluation.processing_status == 'completed' or evaluation.progress_recorded
+        timer = StageTimer(evaluation)
+        self._start(evaluation)
+        try:
+            self._run_stages(evaluation, timer)
+        finally:
+            # On failure this keeps the time spent in the failing stage for mark_failed
+            timer.stop()
+
+        with timer.measure('save'):
+            self._finish(evaluation)
+        timer.finish()
+        VoiceEvaluation.objects.filter(pk=evaluation.pk).update(stage_timings=evaluation.stage_timings)
+        self._log_timings(evaluation)
+        self._update_progress(evaluation, was_recorded)
+        self._index_submission(evaluation)
+        return evaluation
+
+    def _run_stages(self, evaluation: VoiceEvaluation, timer: StageTimer):
+        """The pipeline proper: every stage up to the level update"""
+        audio_path = evaluation.audio_file.path
+        language = evaluation.language
+        logger.info("Processing evaluation %s (%s, %s)", evaluation.id, language, audio_path)
+
+        # Step 0: Decode the upload once; every later step reuses this buffer
+        self._enter_stage(evaluation, timer, 'ingest')
+        try:
+            audio = load_audio(audio_path)
+        except AudioDecodeError as e:
+            raise Exception(f"Audio decoding failed: {e}")
+
+        # Step 1: Transcribe audio
+        self._enter_stage(evaluation, timer, 'transcribe')
+        transcription_result = self.transcribe(evaluation, audio)
+        if not transcription_result.get('success'):
+            raise Exception(f"Transcription failed: {transcription_result.get('error')}")
+        evaluation.transcription = transcription_result['text']
+
+        # Check transcription quality
+        quality_issues = transcription_result.get('quality_issues', [])
+        confidence = transcription_result.get('confidence', 1.0)
+
+        # Step 2: Analyze verbal communication (pass quality issues)
+        self._enter_stage(evaluation, timer, 'verbal')
+        verbal_result = voice_service.analyze_verbal_communication(
+            transcription_result['text'],
+            language,
+            quality_issues=quality_issues
+        )
+        evaluation.fluency_score = verbal_result['fluency_score']
+        evaluation.vocabulary_score = verbal_result['vocabulary_score']
+        evaluation.structure_score = verbal_result['structure_score']
+        evaluation.verbal_score = verbal_result['verbal_score']
+
+        # Step 3: Analyze paraverbal communication
+        self._enter_stage(evaluation, timer, 'paraverbal')
+        paraverbal_result = voice_service.analyze_paraverbal_communication(audio_path, audio=audio)
+        if paraverbal_result.get('success'):
+            evaluation.pitch_score = paraverbal_result['pitch_score']
+            evaluation.pace_score = paraverbal_result['pace_score']
+            evaluation.energy_score = paraverbal_result['energy_score']
+            evaluation.paraverbal_score = paraverbal_result['paraverbal_score']
+            evaluation.duration = paraverbal_result['duration']
+            evaluation.audio_features = paraverbal_result['audio_features']
+
+        # Step 4: Check originality
+        self._enter_stage(evaluation, timer, 'originality')
+        originality_result = voice_service.check_originality(
+            transcription_result['text'],
+            language,
+            user_id=evaluation.user_id
+        )
+        if originality_result.get('success'):
+            evaluation.originality_score = originality_result['originality_score']
+            evaluation.transcription_embedding = originality_result.get('embedding', [])
+
+        # Step 5: Total score, language level and feedback
+        self._enter_stage(evaluation, timer, 'scoring')
+        self.apply_scores(evaluation, verbal_result, quality_issues, round(confidence * 100, 1))
+
+        self._update_user_level(evaluation)
+
+    def run(self, evaluation: VoiceEvaluation) -> bool:
+        """Process an evaluation, recording any failure on the row instead of raising"""
+        try:
+            self.process(evaluation)
+            return True
+        except Exception as e:
+            logger.exception("Processing failed for evaluation %s", evaluation.id)
+            self.mark_failed(evaluation, e)
+            return False
+
+    def mark_failed(self, evaluation: VoiceEvaluation, error: Exception):
+        """Flag the evaluation and its current stage as failed"""
+        stage = evaluation.processing_stage
+        if stage:
+            progress = evaluation.processing_progress.get(stage, {})
+            progress.update({'status': 'failed', 'finished_at': timezone.now().isoformat()})
+            evaluation.processing_progress[stage] = progress
+        evaluation.processing_status = 'failed'
+        evaluation.processing_finished_at = timezone.now()
+        evaluation.error_message = str(error)
+        evaluation.save()
+        self._log_timings(evaluation)
+
+    def transcribe(self, evaluation: VoiceEvaluation, audio) -> Dict:
+        """Transcribe an evaluation's decoded audio with its profile (Vosk first in cascade mode)"""
+        if getattr(settings, 'VOICE_EVAL_ASR_CASCADE', False):
+            transcribe = voice_service.transcribe_cascaded
+        else:
+            transcribe = voice_service.transcribe_audio
+        return transcribe(evaluation.audio_file.path, evaluation.language, audio=audio,
+                          profile=evaluation.transcription_profile)
+
+    def apply_scores(self, evaluation: VoiceEvaluation, verbal_result: Dict,
+                     quality_issues: List[str], confidence: Optional[float]):
+        """
+        Set the total score, language level and feedback from the component scores
+
+        Args:
+            evaluation: Evaluation with its verbal, paraverbal and originality scores set
+            verbal_result: Result of the verbal analysis (for its quality warning)
+            quality_issues: Transcription quality issues
+            confidence: Transcription confidence in percent, if known
+        """
+        evaluation.total_score = self.calculate_total_score(evaluation)
+        scores = self.collect_scores(evaluation)
+        evaluation.estimated_level = voice_service.calculate_language_level(scores)
+        evaluation.feedback = voice_service.generate_feedback(scores, evaluation.language)
+
+        # Store quality warnings in feedback
+        if 'quality_warning' in verbal_result:
+            evaluation.feedback['transcription_quality'] = {
+                'confidence': confidence,
+                'issues': quality_issues,
+                'warning': verbal_result['quality_warning']
+            }
+
+    def calculate_total_score(self, evaluation: VoiceEvaluation) -> float:
+        """Weighted total of the verbal, paraverbal and originality scores"""
+        return (
+            evaluation.verbal_score * self.SCORE_WEIGHTS['verbal'] +
+            evaluation.paraverbal_score * self.SCORE_WEIGHTS['paraverbal'] +
+            evaluation.originality_score * self.SCORE_WEIGHTS['originality']
+        )
+
+    def collect_scores(self, evaluation: VoiceEvaluation) -> Dict:
+        """Scores dict expected by the level and feedback helpers"""
+        return {
+            'total_score': evaluation.total_score,
+            'verbal_score': evaluation.verbal_score,
+            'paraverbal_score': evaluation.paraverbal_score,
+            'originality_score': evaluation.originality_score,
+            'fluency_score': evaluation.fluency_score,
+            'vocabulary_score': evaluation.vocabulary_score,
+            'structure_score': evaluation.structure_score,
+            'pitch_score': evaluation.pitch_score,
+            'pace_score': evaluation.pace_score,
+        }
+
+    # ------------------------------------------------------------------
+    # Background worker helpers
+    # ------------------------------------------------------------------
+
+    def claim_next(self) -> Optional[VoiceEvaluation]:
+        """
+        Atomically claim the oldest pending evaluation
+
+        The conditional UPDATE guarantees that two workers never pick up
+        the same row, without holding a lock for the duration of the job.
+        """
+        candidates = VoiceEvaluation.objects.filter(
+            processing_status='pending'
+        ).order_by('created_at').values_list('pk', flat=True)[:10]
+
+        for pk in candidates:
+            claimed = VoiceEvaluation.objects.filter(pk=pk, processing_status='pending').update(
+                processing_status='processing',
+                processing_started_at=timezone.now()
+            )
+            if claimed:
+                return VoiceEvaluation.objects.select_related('user').get(pk=pk)
+        return None
+
+    def requeue(self, evaluation: VoiceEvaluation, transcription_profile: Optional[str] = None):
+        """Put a processed evaluation back in the queue, optionally with another transcription profile"""
+        if transcription_profile:
+            evaluation.transcription_profile = transcription_profile
+        # Still counted in the progress summary until it completes again
+        if evaluation.processing_status == 'completed':
+            evaluation.progress_recorded = True
+        evaluation.processing_status = 'pending'
+        evaluation.processing_stage = ''
+        evaluation.save(update_fields=[
+            'transcription_profile', 'processing_status', 'processing_stage', 'progress_recorded', 'updated_at'
+        ])
+
+    def run_detached(self, evaluation: VoiceEvaluation):
+        """
+        Process a queued evaluation in a daemon thread once the request commits
+
+        For deployments without the background worker: the request returns
+        right away and the row is claimed like the worker would, so a worker
+        started meanwhile cannot process it twice.
+        """
+        def _run():
+            try:
+                claimed = VoiceEvaluation.objects.filter(pk=evaluation.pk, processing_status='pending').update(
+                    processing_status='processing', processing_started_at=timezone.now()
+                )
+                if claimed:
+                    self.run(VoiceEvaluation.objects.select_related('user').get(pk=evaluation.pk))
+            finally:
+                connection.close()
+
+        transaction.on_commit(
+            lambda: threading.Thread(target=_run, name=f'evaluation-{evaluation.pk}', daemon=True).start()
+        )
+
+    def requeue_stale(self, older_than: timedelta) -> int:
+        """Put back evaluations left in 'processing' by a worker that died"""
+        cutoff = timezone.now() - older_than
+        return VoiceEvaluation.objects.filter(
+            processing_status='processing',
+            processing_started_at__lt=cutoff
+        ).update(processing_status='pending', processing_stage='')
+
+    def get_progress(self, evaluation: VoiceEvaluation) -> List[Dict]:
+        """Per-stage progress in pipeline order, for the status endpoint"""
+        stages = []
+        for key, label in PROCESSING_STAGES:
+            entry = evaluation.processing_progress.get(key, {})
+            stages.append({
+                'stage': key,
+                'label': label,
+                'status': entry.get('status', 'pending'),
+                'started_at': entry.get('started_at'),
+                'finished_at': entry.get('finished_at'),
+            })
+        return stages
+
+    def get_percent_complete(self, evaluation: VoiceEvaluation) -> int:
+        if evaluation.processing_status == 'completed':
+            return 100
+        done = sum(
+            1 for key, _ in PROCESSING_STAGES
+            if evaluation.processing_progress.get(key, {}).get('status') == 'done'
+        )
+        return int(done * 100 / len(PROCESSING_STAGES))
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _start(self, evaluation: VoiceEvaluation):
+        evaluation.processing_status = 'processing'
+        evaluation.processing_stage = ''
+        evaluation.processing_progress = {}
+        evaluation.processing_started_at = timezone.now()
+        evaluation.processing_finished_at = None
+        evaluation.error_message = None
+        evaluation.save(update_fields=[
+            'processing_status', 'processing_stage', 'processing_progress', 'stage_timings',
+            'processing_started_at', 'processing_finished_at', 'error_message', 'updated_at'
+        ])
+
+    def _enter_stage(self, evaluation: VoiceEvaluation, timer: StageTimer, stage: str):
+        """Close the running stage, open the next one and persist progress"""
+        timer.stop()
+        now = timezone.now().isoformat()
+        self._close_current_stage(evaluation, now)
+        evaluation.processing_stage = stage
+        evaluation.processing_progress[stage] = {'status': 'running', 'started_at': now}
+        evaluation.save(update_fields=['processing_stage', 'processing_progress', 'stage_timings', 'updated_at'])
+        timer.start(stage)
+
+    def _close_current_stage(self, evaluation: VoiceEvaluation, now: str):
+        current = evaluation.processing_stage
+        if current and current in evaluation.processing_progress:
+            evaluation.processing_progress[current].update({'status': 'done', 'finished_at': now})
+
+    def _finish(self, evaluation: VoiceEvaluation):
+        self._close_current_stage(evaluation, timezone.now().isoformat())
+        evaluation.processing_stage = ''
+        evaluation.processing_status = 'completed'
+        evaluation.processing_finished_at = timezone.now()
+        evaluation.progress_recorded = True
+        evaluation.save()
+
+    def _log_timings(self, evaluation: VoiceEvaluation):
+        timings = evaluation.stage_timings
+        if not timings:
+            return
+        logger.info(
+            "Evaluation %s %s stage timings: %s", evaluation.id, evaluation.processing_status,
+            ', '.join(f"{stage}={t['wall_ms']:.0f}ms (cpu {t['cpu_ms']:.0f}ms)" for stage, t in timings.items()),
+            extra={'evaluation_id': evaluation.id, 'stage_timings': timings}
+        )
+
+    def _update_progress(self, evaluation: VoiceEvaluation, rebuild: bool = False):
+        """Fold the completed evaluation into the user's progress summary"""
+        try:
+            if rebuild:
+                progress_service.rebuild(evaluation.user)
+            else:
+                progress_service.record(evaluation)
+        except Exception:
+            # Statistics only; the evaluation itself is already saved
+            logger.exception("Could not update progress summary for evaluation %s", evaluation.id)
+
+    def _index_submission(self, evaluation: VoiceEvaluation):
+        """Make the transcription searchable by later originality checks"""
+        def sync():
+            try:
+                submission_index.sync_evaluation(evaluation)
+            except Exception:
+                # The evaluation is saved; rebuild_submission_index can catch up later
+                logger.exception("Could not index evaluation %s for originality checks", evaluation.id)
+
+        transaction.on_commit(sync)
+
+    def _update_user_level(self, evaluation: VoiceEvaluation):
+        """Update user's level if it changed and keep a history record"""
+        user = evaluation.user
+        old_level = user.level
+
+        level_mapping = {'A1': 'weak', 'A2': 'weak', 'B1': 'medium', 'B2': 'medium', 'C1': 'advanced', 'C2': 'advanced'}
+        new_level = level_mapping.get(evaluation.estimated_level, user.level)
+
+        if new_level != old_level:
+            user.level = new_level
+            user.save()
+
+            # Create history record
+            VoiceEvaluationHistory.objects.create(
+                user=user,
+                evaluation=evaluation,
+                previous_level=old_level,
+                new_level=new_level,
+                improvement_score=evaluation.total_score
+            )
+
+
+# Global processor instance
+evaluation_processor = EvaluationProcessor()
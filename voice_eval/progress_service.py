@@ -0,0 +1,105 @@
+"""
+Per-user voice progress statistics
+Keeps one VoiceProgressSummary row per user up to date as evaluations
+complete, so progress pages read a single row instead of re-aggregating
+the evaluation history on every request
+"""
+from __future__ import annotations
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import VoiceEvaluation, VoiceProgressSummary
+
+logger = logging.getLogger(__name__)
+
+# Score fields with a running average in VoiceProgressSummary.average_scores
+AVERAGED_SCORES = [
+    'total_score', 'verbal_score', 'paraverbal_score', 'originality_score',
+    'fluency_score', 'vocabulary_score', 'structure_score',
+    'pitch_score', 'pace_score', 'energy_score',
+]
+
+# Level transitions kept on the summary (most recent last)
+MAX_LEVEL_TRANSITIONS = 20
+
+
+class VoiceProgressService:
+    """Incremental maintenance of VoiceProgressSummary rows"""
+
+    def get_summary(self, user) -> VoiceProgressSummary:
+        """The user's summary, built from their history the first time"""
+        summary = VoiceProgressSummary.objects.filter(user=user).first()
+        if summary is None:
+            summary = self.rebuild(user)
+        return summary
+
+    def record(self, evaluation: VoiceEvaluation) -> VoiceProgressSummary:
+        """Fold a newly completed evaluation into its user's summary"""
+        with transaction.atomic():
+            # Row lock: concurrent workers finishing evaluations of the same user serialize here
+            VoiceProgressSummary.objects.get_or_create(user_id=evaluation.user_id)
+            summary = VoiceProgressSummary.objects.select_for_update().get(user_id=evaluation.user_id)
+            self._apply(summary, evaluation)
+            summary.save()
+        return summary
+
+    def rebuild(self, user) -> VoiceProgressSummary:
+        """Recompute a summary from all completed evaluations (after rescoring or deletions)"""
+        evaluations = VoiceEvaluation.objects.filter(
+            user=user, processing_status='completed'
+        ).order_by('created_at', 'pk').only('pk', 'created_at', 'estimated_level', *AVERAGED_SCORES)
+
+        with transaction.atomic():
+            VoiceProgressSummary.objects.get_or_create(user=user)
+            summary = VoiceProgressSummary.objects.select_for_update().get(user=user)
+            self._reset(summary)
+            for evaluation in evaluations.iterator():
+                self._apply(summary, evaluation)
+            summary.save()
+        return summary
+
+    @staticmethod
+    def _reset(summary: VoiceProgressSummary):
+        summary.evaluation_count = 0
+        summary.average_scores = {}
+        summary.first_score = summary.previous_score = summary.latest_score = summary.best_score = 0.0
+        summary.latest_level = None
+        summary.latest_evaluation = summary.best_evaluation = None
+        summary.level_transitions = []
+
+    @staticmethod
+    def _apply(summary: VoiceProgressSummary, evaluation: VoiceEvaluation):
+        count = summary.evaluation_count + 1
+        averages = summary.average_scores
+        for field in AVERAGED_SCORES:
+            value = getattr(evaluation, field) or 0.0
+            previous = averages.get(field, 0.0)
+            averages[field] = round(previous + (value - previous) / count, 4)
+
+        score = evaluation.total_score
+        if summary.evaluation_count == 0:
+            summary.first_score = score
+        summary.previous_score = summary.latest_score if summary.evaluation_count else score
+        if summary.evaluation_count == 0 or score > summary.best_score:
+            summary.best_score = score
+            summary.best_evaluation_id = evaluation.pk
+
+        level = evaluation.estimated_level
+        if summary.latest_level and level and level != summary.latest_level:
+            summary.level_transitions = (summary.level_transitions + [{
+                'from': summary.latest_level,
+                'to': level,
+                'evaluation_id': evaluation.pk,
+                'at': (evaluation.created_at or timezone.now()).isoformat(),
+            }])[-MAX_LEVEL_TRANSITIONS:]
+
+        summary.evaluation_count = count
+        summary.latest_score = score
+        summary.latest_level = level or summary.latest_level
+        summary.latest_evaluation_id = evaluation.pk
+
+
+# Global service instance
+progress_service = VoiceProgressService()
@@ -1,9 +1,9 @@
 """Service for real-time pronunciation practice using Vosk API"""
-import os
 import json
-import wave
-import subprocess
-import tempfile
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 try:
     from vosk import Model, KaldiRecognizer
     VOSK_AVAILABLE = True
@@ -14,165 +14,262 @@ except ImportError:
 from django.conf import settings
 import difflib
 
+from .audio_ingest import AudioDecodeError, TARGET_SAMPLE_RATE, decode_audio_bytes, pcm16_to_wav, to_pcm16
+from .model_registry import model_registry
+from .inference_client import inference_client
+
+
+# Idle recognizers kept per (language, sample rate, grammar)
+RECOGNIZER_POOL_SIZE = 4
+# Practice texts whose grammar-constrained recognizers are kept (least recently used evicted)
+GRAMMAR_CACHE_SIZE = 64
+
+# Vosk token matching any out-of-grammar word
+UNKNOWN_WORD = '[unk]'
+
+
+def practice_grammar(expected_text):
+    """
+    Vosk grammar for a known practice text: the sentence, each of its words
+    and the unknown-word token, as the JSON list KaldiRecognizer expects
+    """
+    words = re.findall(r"[\w']+", expected_text.lower())
+    return json.dumps([' '.join(words), *dict.fromkeys(words), UNKNOWN_WORD], ensure_ascii=False)
+
+
+class RecognizerPool:
+    """
+    Reusable KaldiRecognizer objects per (language, sample rate, grammar)
+    
+    A recognizer is used by one caller at a time; it is reset and returned
+    to the pool afterwards instead of being rebuilt for every request.
+    Recognizers that raised are dropped. Grammar-constrained recognizers
+    (whose grammar is compiled when they are built) are kept for the
+    GRAMMAR_CACHE_SIZE most recently used grammars.
+    """
+    
+    def __init__(self, factory, max_idle=RECOGNIZER_POOL_SIZE, max_grammars=GRAMMAR_CACHE_SIZE):
+        self._factory = factory
+        self._max_idle = max_idle
+        self._max_grammars = max_grammars
+        self._idle = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def acquire(self, language, sample_rate=TARGET_SAMPLE_RATE, grammar=None):
+        """Idle recognizer or a new one (None if the model is unavailable)"""
+        key = (language, sample_rate, grammar)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self._idle.move_to_end(key)
+                return idle.pop()
+        if grammar is None:
+            return self._factory(language, sample_rate)
+        return self._factory(language, sample_rate, grammar)
+    
+    def release(self, language, sample_rate, recognizer, grammar=None):
+        """Reset a recognizer and keep it for the next caller"""
+        if recognizer is None:
+            return
+        reset = getattr(recognizer, 'Reset', None)
+        if reset:
+            reset()
+        key = (language, sample_rate, grammar)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            self._idle.move_to_end(key)
+            if len(idle) < self._max_idle:
+                idle.append(recognizer)
+            grammars = [k for k in self._idle if k[2] is not None]
+            for stale in grammars[:max(len(grammars) - self._max_grammars, 0)]:
+                del self._idle[stale]
+    
+    @contextmanager
+    def recognizer(self, language, sample_rate=TARGET_SAMPLE_RATE, grammar=None):
+        rec = self.acquire(language, sample_rate, grammar)
+        yield rec
+        # Not reached when the caller raised: a recognizer in an unknown state is dropped
+        self.release(language, sample_rate, rec, grammar)
+    
+    def clear(self):
+        with self._lock:
+            self._idle.clear()
+
 
 class PronunciationService:
     """Handle real-time pronunciation evaluation"""
     
-    def __init__(self):
-        self.models = {}
-        # Lazy loading: don't load models at init to save memory
-        # Models will be loaded on first use
-        self.model_paths = None
-    
-    def _load_models(self):
-        """Load Vosk models for supported languages"""
+    def _get_model(self, language):
+        """Vosk model for a language from the shared model registry (None if unavailable)"""
         if not VOSK_AVAILABLE:
-            print("Vosk not available. Pronunciation service disabled.")
-            return
-            
-        # Models should be downloaded and placed in ml_models/vosk/
-        vosk_path = os.path.join(settings.BASE_DIR, 'ml_models', 'vosk')
-        
-        if self.model_paths is None:
-            self.model_paths = {
-                'en': os.path.join(vosk_path, 'vosk-model-small-en-us-0.15'),
-                'fr': os.path.join(vosk_path, 'vosk-model-small-fr-0.22'),
-            }
-        
-        for lang, path in self.model_paths.items():
-            if lang in self.models:  # Already loaded
-                continue
-                
-            if os.path.exists(path):
-                try:
-                    self.models[lang] = Model(path)
-                    print(f"Loaded Vosk model for {lang}")
-                except Exception as e:
-                    print(f"Error loading Vosk model for {lang}: {e}")
-            else:
-                print(f"Vosk model not found at {path}")
-                print(f"Please download from: https://alphacephei.com/vosk/models")
+            return None
+        return model_registry.get('vosk', language)
     
-    def _convert_to_wav(self, audio_path):
+    def __init__(self):
+        self.recognizer_pool = RecognizerPool(self.create_recognizer)
+    
+    def transcribe_audio(self, audio_path, language='en', expected_text=None):
         """
-        Convert audio file to proper WAV format for Vosk (16kHz, mono, 16-bit PCM)
+        Transcribe audio file using Vosk
         
         Args:
-            audio_path: Path to input audio file
+            audio_path: Path to audio file
+            language: Language code ('en' or 'fr')
+            expected_text: Known practice text to constrain decoding to (optional)
             
         Returns:
-            Path to converted WAV file (temporary)
+            dict with 'success', 'text', and optional 'error'
         """
-        try:
-            # Try using ffmpeg if available
-            temp_wav = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-            temp_wav.close()
-            
-            # Convert using ffmpeg
-            cmd = [
-                'ffmpeg', '-i', audio_path,
-                '-ar', '16000',  # 16kHz sample rate
-                '-ac', '1',       # Mono
-                '-sample_fmt', 's16',  # 16-bit
-                '-y',             # Overwrite
-                temp_wav.name
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                return temp_wav.name
-            else:
-                # If ffmpeg fails, try to open as is
-                return None
-                
-        except Exception as e:
-            print(f"Audio conversion error: {e}")
-            return None
+        with open(audio_path, 'rb') as f:
+            return self.transcribe_bytes(f.read(), language, expected_text)
     
-    def transcribe_audio(self, audio_path, language='en'):
+    def transcribe_bytes(self, data, language='en', expected_text=None):
         """
-        Transcribe audio file using Vosk
+        Transcribe an in-memory upload using Vosk
+        
+        The upload is decoded and resampled to 16 kHz 16-bit mono in-process
+        (ffmpeg is only piped to for codecs libsndfile cannot read).
         
         Args:
-            audio_path: Path to audio file
+            data: Encoded audio (WAV, OGG, WebM...)
             language: Language code ('en' or 'fr')
+            expected_text: Known practice text to constrain decoding to (optional)
             
         Returns:
-            dict with 'success', 'text', and optional 'error'
+            dict with 'success', 'text', 'wav' (normalized audio) and optional 'error'
         """
-        # Lazy load models on first use
-        if not self.models:
-            self._load_models()
-        
-        if language not in self.models:
+        try:
+            pcm = to_pcm16(decode_audio_bytes(data))
+        except AudioDecodeError as e:
             return {
                 'success': False,
-                'error': f'Vosk model for {language} not loaded. Please download from https://alphacephei.com/vosk/models'
+                'error': str(e)
             }
         
-        converted_path = None
         try:
-            # Try to convert audio to proper format
-            converted_path = self._convert_to_wav(audio_path)
-            if converted_path:
-                audio_to_use = converted_path
-            else:
-                audio_to_use = audio_path
-            
-            # Open audio file
-            wf = wave.open(audio_to_use, "rb")
+            result = self.recognize_pcm(pcm, TARGET_SAMPLE_RATE, language, expected_text)
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+        if result.get('success'):
+            result['wav'] = pcm16_to_wav(pcm, TARGET_SAMPLE_RATE)
+        return result
+    
+    def recognize_pcm(self, pcm, sample_rate, language='en', expected_text=None):
+        """
+        Run Vosk on 16-bit mono PCM, in-process or in the shared inference service
+        
+        With an expected text (and VOICE_EVAL_PRACTICE_GRAMMAR enabled) the
+        recognizer only considers the words of that text plus an unknown-word
+        token, instead of the full open-vocabulary graph; words outside the
+        text come out as ``[unk]``.
+        
+        Args:
+            pcm: Raw little-endian 16-bit mono samples
+            sample_rate: Sample rate of the PCM data
+            language: Language code ('en' or 'fr')
+            expected_text: Known practice text (optional)
             
-            # Check format - if not correct, inform about conversion
-            if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
-                wf.close()
+        Returns:
+            dict with 'success', 'text', 'words' (Vosk word entries with
+            'word', 'start', 'end' and 'conf') and optional 'error'
+        """
+        if inference_client.enabled:
+            return inference_client.vosk_transcribe(pcm, language, sample_rate, expected_text=expected_text)
+        
+        grammar = self.grammar_for(expected_text)
+        with self.recognizer_pool.recognizer(language, sample_rate, grammar) as rec:
+            if rec is None:
                 return {
                     'success': False,
-                    'error': 'Audio format incompatible. Please install FFmpeg for automatic conversion: https://ffmpeg.org/download.html'
+                    'error': f'Vosk model for {language} not loaded. Please download from https://alphacephei.com/vosk/models'
                 }
             
-            # Create recognizer
-            rec = KaldiRecognizer(self.models[language], wf.getframerate())
-            rec.SetWords(True)
-            
-            # Process audio
+            # Process audio in 4000-frame chunks (2 bytes per frame)
             results = []
-            while True:
-                data = wf.readframes(4000)
-                if len(data) == 0:
-                    break
-                if rec.AcceptWaveform(data):
+            words = []
+            chunk_bytes = 4000 * 2
+            for start in range(0, len(pcm), chunk_bytes):
+                if rec.AcceptWaveform(pcm[start:start + chunk_bytes]):
                     result = json.loads(rec.Result())
                     if 'text' in result:
                         results.append(result['text'])
+                    words.extend(result.get('result', []))
             
             # Final result
             final_result = json.loads(rec.FinalResult())
             if 'text' in final_result:
                 results.append(final_result['text'])
+            words.extend(final_result.get('result', []))
+        
+        # Combine all results
+        return {
+            'success': True,
+            'text': ' '.join(results).strip(),
+            'words': words
+        }
+    
+    def grammar_for(self, expected_text):
+        """Grammar constraining recognition to a practice text (None: open vocabulary)"""
+        if not expected_text or not getattr(settings, 'VOICE_EVAL_PRACTICE_GRAMMAR', True):
+            return None
+        return practice_grammar(expected_text)
+    
+    def create_recognizer(self, language, sample_rate=16000, grammar=None):
+        """
+        New KaldiRecognizer on the shared Vosk model (use recognizer_pool to reuse them)
+        
+        Args:
+            grammar: JSON list of phrases (see practice_grammar) compiled into
+                the recognizer, or None for the model's full graph
+        
+        Returns:
+            Recognizer with word output enabled, or None if the model is unavailable
+        """
+        # Lazy load the model on first use
+        model = self._get_model(language)
+        if model is None:
+            return None
+        
+        rec = KaldiRecognizer(model, sample_rate, grammar) if grammar else KaldiRecognizer(model, sample_rate)
+        rec.SetWords(True)
+        return rec
+    
+    def save_practice(self, user, expected_text, spoken_text, comparison_result, evaluation_id=None, audio_content=None):
+        """
+        Store a pronunciation practice attempt
+        
+        Args:
+            user: User who practiced
+            expected_text: The text the user should say
+            spoken_text: Recognized text
+            comparison_result: Output of compare_texts
+            evaluation_id: Evaluation that triggered the practice (optional)
+            audio_content: WAV bytes of the attempt (optional)
             
-            # Combine all results
-            full_text = ' '.join(results).strip()
-            
-            wf.close()
-            
-            return {
-                'success': True,
-                'text': full_text
-            }
-            
-        except Exception as e:
-            return {
-                'success': False,
-                'error': str(e)
-            }
-        finally:
-            # Clean up temporary converted file
-            if converted_path and os.path.exists(converted_path):
-                try:
-                    os.remove(converted_path)
-                except:
-                    pass
+        Returns:
+            The created PronunciationPractice
+        """
+        from django.core.files.base import ContentFile
+        from .models import PronunciationPractice
+        
+        practice = PronunciationPractice.objects.create(
+            user=user,
+            evaluation_id=evaluation_id if evaluation_id else None,
+            expected_text=expected_text,
+            spoken_text=spoken_text,
+            comparison_data=comparison_result,
+            accuracy_score=comparison_result['accuracy_score'],
+            matched_words=comparison_result['matched_words'],
+            total_words=comparison_result['total_words']
+        )
+        
+        if audio_content:
+            practice.audio_file.save(f'practice_{practice.id}.wav', ContentFile(audio_content))
+        
+        return practice
     
     def compare_texts(self, expected_text, spoken_text):
         """
@@ -0,0 +1,465 @@
+"""
+Reference embedding index for originality checking
+Keeps L2-normalized float32 embeddings of ReferenceText rows in a
+memory-mapped .npy matrix per language, so scoring a transcription is a
+single matrix-vector product instead of a Python loop over JSON lists
+"""
+from __future__ import annotations
+import json
+import logging
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Records a language's delta segment may hold before it is merged into the base matrix
+DEFAULT_MAX_DELTA_ROWS = 1024
+
+# Kinds of delta records
+DELTA_DELETE = 0
+DELTA_UPSERT = 1
+
+
+def delta_dtype(dim: int) -> np.dtype:
+    """Fixed-size delta record: kind, row id, owner id and the normalized vector"""
+    return np.dtype([('kind', '<i8'), ('id', '<i8'), ('owner', '<i8'), ('vector', '<f4', (dim,))])
+
+
+def normalize(vectors) -> np.ndarray:
+    """L2-normalize a vector or the rows of a matrix as float32"""
+    array = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(array, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return array / norms
+
+
+@dataclass(frozen=True)
+class IndexSnapshot:
+    """
+    Consistent view of one language: the base segment and its delta
+
+    ``ids``, ``matrix`` and ``extras`` come from one manifest and the
+    ``delta_*`` arrays from the delta file that manifest names, so they
+    always describe the same version. ``live`` masks out the base rows the
+    delta replaced or deleted (None when every base row is live).
+    """
+    ids: np.ndarray
+    matrix: np.ndarray
+    extras: Dict[str, np.ndarray]
+    dim: int = 0
+    delta_file: Optional[str] = None
+    delta_records: int = 0
+    live: Optional[np.ndarray] = None
+    delta_ids: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    delta_owners: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    delta_matrix: Optional[np.ndarray] = None
+
+    @classmethod
+    def empty(cls) -> 'IndexSnapshot':
+        return cls(np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32), {})
+
+    @property
+    def count(self) -> int:
+        """Live rows across both segments"""
+        base = len(self.ids) if self.live is None else int(self.live.sum())
+        return base + len(self.delta_ids)
+
+    def __contains__(self, row_id) -> bool:
+        if np.any(self.delta_ids == row_id):
+            return True
+        position = np.flatnonzero(self.ids == row_id)
+        return bool(len(position)) and (self.live is None or bool(self.live[position[0]]))
+
+    def similarities(self, query: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(ids, similarities) of every live row against a normalized query"""
+        ids, similarities = self.ids, self.matrix @ query
+        if self.live is not None:
+            ids, similarities = ids[self.live], similarities[self.live]
+        if not len(self.delta_ids):
+            return ids, similarities
+        return np.concatenate([ids, self.delta_ids]), np.concatenate([similarities, self.delta_matrix @ query])
+
+    def materialize(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Live rows of both segments as writable in-memory (ids, matrix, owners)"""
+        live = slice(None) if self.live is None else self.live
+        ids = self.ids[live]
+        owners = self.extras.get('owners', np.zeros(len(self.ids), dtype=np.int64))
+        delta_matrix = self.delta_matrix if self.delta_matrix is not None else np.empty((0, self.dim))
+        return (
+            np.concatenate([ids, self.delta_ids]).astype(np.int64),
+            np.vstack([np.asarray(self.matrix[live]).reshape(len(ids), self.dim), delta_matrix]).astype(np.float32),
+            np.concatenate([owners[live], self.delta_owners]).astype(np.int64),
+        )
+
+
+class EmbeddingIndex:
+    """
+    Persistent per-language matrix of normalized embeddings plus a row-ID map
+
+    Files live in ``VOICE_EVAL_INDEX_DIR``. Each write produces a new
+    versioned ``.npy`` pair and then atomically swaps a small manifest, so
+    readers in other processes never see a half-written matrix; they notice
+    the new manifest on their next query and remap.
+
+    Single-row upserts and removals do not rewrite the matrix: they append a
+    fixed-size record to the language's delta segment, which readers apply
+    on top of the base. Once the delta holds ``VOICE_EVAL_INDEX_MAX_DELTA_ROWS``
+    records (or on ``rebuild``/``compact``) it is merged into a new base.
+    """
+
+    def __init__(self, name: str, root: Optional[str] = None):
+        self.name = name
+        self._root = root
+        self._cache = {}  # language -> (manifest stamp, base snapshot, delta size, snapshot)
+        self._lock = threading.RLock()
+
+    @property
+    def root(self) -> str:
+        return str(self._root or getattr(
+            settings, 'VOICE_EVAL_INDEX_DIR', os.path.join(settings.BASE_DIR, 'ml_models', 'indexes')
+        ))
+
+    @property
+    def max_delta_rows(self) -> int:
+        return max(1, int(getattr(settings, 'VOICE_EVAL_INDEX_MAX_DELTA_ROWS', DEFAULT_MAX_DELTA_ROWS)))
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def exists(self, language: str) -> bool:
+        return os.path.exists(self._manifest_path(language))
+
+    def load(self, language: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (ids, matrix) of the live rows of a language
+
+        The matrix is memory-mapped while the delta segment is empty, and an
+        in-memory merge of both segments otherwise. Both arrays are empty
+        when the index has not been built yet.
+        """
+        snapshot = self.snapshot(language)
+        if snapshot.live is None and not len(snapshot.delta_ids):
+            return snapshot.ids, snapshot.matrix
+        ids, matrix, _ = snapshot.materialize()
+        return ids, matrix
+
+    def load_extras(self, language: str) -> Dict[str, np.ndarray]:
+        """Additional arrays written with the base matrix by subclasses (empty if none)"""
+        return self.snapshot(language).extras
+
+    def snapshot(self, language: str) -> IndexSnapshot:
+        """Base segment, extras and delta of one language, all from the same manifest"""
+        for attempt in range(3):
+            try:
+                return self._snapshot(language)
+            except FileNotFoundError:
+                # A writer swapped the manifest and removed the files it named
+                if attempt == 2:
+                    raise
+
+    def _snapshot(self, language: str) -> IndexSnapshot:
+        manifest_path = self._manifest_path(language)
+        try:
+            stat = os.stat(manifest_path)
+        except FileNotFoundError:
+            return IndexSnapshot.empty()
+
+        stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        with self._lock:
+            cached = self._cache.get(language)
+            if cached and cached[0] == stamp:
+                base = cached[1]
+            else:
+                cached = None
+                base = self._load_base(self._read_manifest(language))
+
+            delta_size = os.path.getsize(os.path.join(self.root, base.delta_file)) if base.delta_file else 0
+            if cached and cached[2] == delta_size:
+                return cached[3]
+            snapshot = self._apply_delta(base, delta_size)
+            self._cache[language] = (stamp, base, delta_size, snapshot)
+            return snapshot
+
+    def _load_base(self, manifest: Dict) -> IndexSnapshot:
+        ids = np.load(os.path.join(self.root, manifest['ids']))
+        dim = manifest.get('dim', 0)
+        if len(ids):
+            matrix = np.load(os.path.join(self.root, manifest['matrix']), mmap_mode='r')
+        else:
+            matrix = np.empty((0, dim), dtype=np.float32)
+        extras = {
+            name: np.load(os.path.join(self.root, filename))
+            for name, filename in manifest.get('extras', {}).items()
+        }
+        return IndexSnapshot(ids, matrix, extras, dim=dim, delta_file=manifest.get('delta'))
+
+    def _apply_delta(self, base: IndexSnapshot, size: int) -> IndexSnapshot:
+        record = delta_dtype(base.dim)
+        # A record still being appended is ignored until it is complete
+        count = size // record.itemsize
+        if not count:
+            return base
+        records = np.fromfile(os.path.join(self.root, base.delta_file), dtype=record, count=count)
+
+        # The last record of each id wins
+        _, last_reversed = np.unique(records['id'][::-1], return_index=True)
+        latest = records[np.sort(len(records) - 1 - last_reversed)]
+        upserts = latest[latest['kind'] == DELTA_UPSERT]
+        return replace(
+            base,
+            delta_records=len(records),
+            live=~np.isin(base.ids, latest['id']),
+            delta_ids=upserts['id'].astype(np.int64),
+            delta_owners=upserts['owner'].astype(np.int64),
+            delta_matrix=np.ascontiguousarray(upserts['vector'], dtype=np.float32),
+        )
+
+    def search(self, language: str, query, k: int = 3) -> Dict:
+        """
+        Score a query vector against every row of a language
+
+        Args:
+            language: Language code
+            query: Query embedding (normalized here)
+            k: Number of nearest rows to return
+
+        Returns:
+            Dict with 'count', 'max_similarity', 'mean_similarity' and
+            'top' (list of (row_id, similarity) sorted by similarity)
+        """
+        snapshot = self.snapshot(language)
+        if not snapshot.count:
+            return {'count': 0, 'max_similarity': 0.0, 'mean_similarity': 0.0, 'top': []}
+
+        query = normalize(query)
+        if snapshot.dim != query.shape[0]:
+            logger.warning("Index %s/%s has dim %s, query has %s", self.name, language, snapshot.dim, query.shape[0])
+            return {'count': 0, 'max_similarity': 0.0, 'mean_similarity': 0.0, 'top': []}
+
+        ids, similarities = snapshot.similarities(query)
+        k = min(k, len(similarities))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+
+        return {
+            'count': int(len(similarities)),
+            'max_similarity': float(similarities[top[0]]),
+            'mean_similarity': float(similarities.mean()),
+            'top': [(int(ids[i]), float(similarities[i])) for i in top],
+        }
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def rebuild(self, language: str, rows: Iterable[Tuple[int, List[float]]]) -> int:
+        """Replace a language's index with the given (row_id, embedding) pairs"""
+        ids, vectors = self._collect(rows)
+        with self._write_lock(language):
+            self._write(language, ids, vectors)
+        return len(ids)
+
+    def upsert(self, language: str, row_id: int, embedding, owner: int = 0) -> None:
+        """Add or replace one row, moving it out of any other language"""
+        vector = normalize(embedding)
+        for other in self._languages():
+            if other != language:
+                self.remove(other, row_id)
+
+        with self._write_lock(language):
+            snapshot = self.snapshot(language)
+            if snapshot.dim and snapshot.dim != vector.shape[0]:
+                logger.warning("Skipping row %s: dim %s does not match index dim %s",
+                               row_id, vector.shape[0], snapshot.dim)
+                return
+            self._append(language, snapshot, DELTA_UPSERT, row_id, owner, vector)
+
+    def remove(self, language: str, row_id: int) -> bool:
+        """Drop one row; returns True if it was indexed"""
+        if not self.exists(language):
+            return False
+        with self._write_lock(language):
+            snapshot = self.snapshot(language)
+            if row_id not in snapshot:
+                return False
+            self._append(language, snapshot, DELTA_DELETE, row_id, 0, np.zeros(snapshot.dim, dtype=np.float32))
+            return True
+
+    def compact(self, language: str) -> int:
+        """Merge a language's delta segment into a new base; returns the row count"""
+        with self._write_lock(language):
+            return self._compact(language, self.snapshot(language))
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _append(self, language: str, snapshot: IndexSnapshot, kind: int, row_id: int, owner: int,
+                vector: np.ndarray):
+        """Record one change in the delta segment (caller holds the write lock)"""
+        if not snapshot.delta_file or not snapshot.dim:
+            # New index, or one written before delta segments: start a base segment
+            ids, matrix, owners = snapshot.materialize()
+            keep = ids != row_id
+            ids, matrix, owners = ids[keep], matrix[keep].reshape(-1, vector.shape[0]), owners[keep]
+            if kind == DELTA_UPSERT:
+                ids = np.append(ids, np.int64(row_id))
+                matrix = np.vstack([matrix, vector[None, :]])
+                owners = np.append(owners, np.int64(owner))
+            self._merge(language, ids, matrix, owners)
+            return
+
+        record = np.zeros(1, dtype=delta_dtype(snapshot.dim))
+        record['kind'], record['id'], record['owner'], record['vector'] = kind, row_id, owner, vector
+        with open(os.path.join(self.root, snapshot.delta_file), 'r+b') as f:
+            # Overwrites the tail of a record a crashed writer left incomplete
+            f.seek(snapshot.delta_records * record.itemsize)
+            f.write(record.tobytes())
+            f.truncate()
+
+        if snapshot.delta_records + 1 >= self.max_delta_rows:
+            self._compact(language, self.snapshot(language))
+
+    def _compact(self, language: str, snapshot: IndexSnapshot) -> int:
+        ids, matrix, owners = snapshot.materialize()
+        self._merge(language, ids, matrix, owners)
+        return len(ids)
+
+    def _merge(self, language: str, ids: np.ndarray, matrix: np.ndarray, owners: np.ndarray):
+        """Write merged rows as the new base segment; subclasses lay out their extras here"""
+        self._write(language, ids, matrix)
+
+    def _collect(self, rows) -> Tuple[np.ndarray, np.ndarray]:
+        ids, vectors, dim = [], [], None
+        for row_id, embedding in rows:
+            if not embedding:
+                continue
+            if dim is None:
+                dim = len(embedding)
+            if len(embedding) != dim:
+                logger.warning("Skipping row %s: embedding dim %s != %s", row_id, len(embedding), dim)
+                continue
+            ids.append(row_id)
+            vectors.append(embedding)
+
+        if not ids:
+            return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+        return np.asarray(ids, dtype=np.int64), normalize(vectors)
+
+    def _write(self, language: str, ids: np.ndarray, matrix: np.ndarray,
+               extras: Optional[Dict[str, np.ndarray]] = None):
+        os.makedirs(self.root, exist_ok=True)
+        version = uuid.uuid4().hex[:12]
+        prefix = f"{self.name}_{language}.{version}"
+        old_manifest = self._read_manifest(language) if self.exists(language) else None
+
+        np.save(os.path.join(self.root, f"{prefix}.ids.npy"), ids.astype(np.int64))
+        np.save(os.path.join(self.root, f"{prefix}.npy"), np.ascontiguousarray(matrix, dtype=np.float32))
+        open(os.path.join(self.root, f"{prefix}.delta"), 'wb').close()
+
+        manifest = {
+            'ids': f"{prefix}.ids.npy",
+            'matrix': f"{prefix}.npy",
+            'delta': f"{prefix}.delta",
+            'count': int(len(ids)),
+            'dim': int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+        }
+        if extras:
+            manifest['extras'] = {}
+            for name, array in extras.items():
+                manifest['extras'][name] = f"{prefix}.{name}.npy"
+                np.save(os.path.join(self.root, manifest['extras'][name]), array)
+        tmp_path = self._manifest_path(language) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._manifest_path(language))
+
+        # Old files stay readable by processes that still map them (POSIX)
+        if old_manifest:
+            old_files = [old_manifest['ids'], old_manifest['matrix'], *old_manifest.get('extras', {}).values()]
+            if old_manifest.get('delta'):
+                old_files.append(old_manifest['delta'])
+            for filename in old_files:
+                try:
+                    os.remove(os.path.join(self.root, filename))
+                except OSError:
+                    pass
+
+    def _read_manifest(self, language: str) -> Dict:
+        with open(self._manifest_path(language)) as f:
+            return json.load(f)
+
+    def _manifest_path(self, language: str) -> str:
+        return os.path.join(self.root, f"{self.name}_{language}.json")
+
+    def _languages(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        prefix = f"{self.name}_"
+        return [
+            filename[len(prefix):-len('.json')]
+            for filename in os.listdir(self.root)
+            if filename.startswith(prefix) and filename.endswith('.json')
+        ]
+
+    @contextmanager
+    def _write_lock(self, language: str):
+        """Serialize writers across threads and processes"""
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock:
+            with open(os.path.join(self.root, f"{self.name}_{language}.lock"), 'w') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class ReferenceTextIndex(EmbeddingIndex):
+    """Embedding index over ReferenceText rows"""
+
+    def __init__(self, root: Optional[str] = None):
+        super().__init__('references', root)
+
+    def rebuild_from_db(self, language: Optional[str] = None) -> Dict[str, int]:
+        """Rebuild one or all languages from the stored ReferenceText embeddings"""
+        from .models import ReferenceText, VoiceEvaluation
+
+        languages = [language] if language else [code for code, _ in VoiceEvaluation.LANGUAGE_CHOICES]
+        counts = {}
+        for lang in languages:
+            rows = ReferenceText.objects.filter(language=lang).values_list('id', 'embedding').iterator()
+            counts[lang] = self.rebuild(lang, rows)
+        return counts
+
+    def sync_reference(self, reference) -> None:
+        """Apply one ReferenceText save to the index"""
+        if reference.embedding:
+            self.upsert(reference.language, reference.pk, reference.embedding)
+        else:
+            self.remove(reference.language, reference.pk)
+
+    def score(self, language: str, query, k: int = 3) -> Dict:
+        """Search, building the language index from the database on first use"""
+        if not self.exists(language):
+            self.rebuild_from_db(language)
+        return self.search(language, query, k)
+
+
+# Global index instance
+reference_index = ReferenceTextIndex()
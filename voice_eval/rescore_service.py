@@ -0,0 +1,290 @@
+"""
+Re-scoring Service for Voice Evaluation
+Recomputes derived scores, levels and feedback of completed evaluations
+from their stored transcription and paraverbal metrics, after a change to
+the score weights, level thresholds or feedback rules
+(``manage.py rescore_voice_evaluations``)
+"""
+from __future__ import annotations
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import VoiceEvaluation
+from .ai_service import voice_service
+from .audio_ingest import load_audio
+from .paraverbal_features import has_current_metrics
+from .processing_service import evaluation_processor
+from .progress_service import progress_service
+
+logger = logging.getLogger(__name__)
+
+# Fields written back by a rescore
+RESCORED_FIELDS = [
+    'transcription', 'fluency_score', 'vocabulary_score', 'structure_score', 'verbal_score',
+    'pitch_score', 'pace_score', 'energy_score', 'paraverbal_score', 'duration', 'audio_features',
+    'total_score', 'estimated_level', 'feedback', 'updated_at',
+]
+
+DEFAULT_CHECKPOINT = os.path.join(settings.BASE_DIR, 'ml_models', 'rescore_checkpoint.json')
+
+
+class RescoreError(Exception):
+    """An artifact is missing and could not be recomputed"""
+
+
+def rescore_artifacts(items: List[Dict]) -> List[Dict]:
+    """
+    Rescore evaluation snapshots (see ``RescoreService.snapshot``)
+
+    Runs in pool workers, so it never touches the database. Whisper and
+    the paraverbal extraction only run when the transcription or the
+    stored metrics are missing or outdated. The transcriptions of each
+    language are scored together with ``analyze_verbal_batch`` (one ``nlp.pipe`` pass).
+
+    Returns:
+        One result per item, in order: ``{'id', 'fields', 'recomputed'}``
+        with the new value of every field in RESCORED_FIELDS and the
+        artifacts that had to be rebuilt, or ``{'id', 'error'}``
+    """
+    results, by_language = {}, {}
+    for item in items:
+        try:
+            prepared = _load_transcription(item)
+        except Exception as e:
+            results[item['id']] = _failure(item, e)
+            continue
+        by_language.setdefault(item['language'], []).append(prepared)
+
+    for language, group in by_language.items():
+        try:
+            verbal_results = voice_service.analyze_verbal_batch(
+                [prepared['evaluation'].transcription for prepared in group], language,
+                quality_issues=[prepared['quality_issues'] for prepared in group]
+            )
+        except Exception as e:
+            results.update((prepared['item']['id'], _failure(prepared['item'], e)) for prepared in group)
+            continue
+        for prepared, verbal_result in zip(group, verbal_results):
+            try:
+                results[prepared['item']['id']] = _apply_scores(prepared, verbal_result)
+            except Exception as e:
+                results[prepared['item']['id']] = _failure(prepared['item'], e)
+
+    return [results[item['id']] for item in items]
+
+
+def _load_transcription(item: Dict) -> Dict:
+    """Unsaved evaluation rebuilt from a snapshot, transcribing the audio if needed"""
+    evaluation = VoiceEvaluation(
+        pk=item['id'], language=item['language'], audio_file=item['audio_name'],
+        transcription=item['transcription'], transcription_profile=item['transcription_profile'],
+        audio_features=item['audio_features'], duration=item['duration'],
+        originality_score=item['originality_score'],
+    )
+    quality = item['transcription_quality']
+    prepared = {
+        'item': item, 'evaluation': evaluation, 'audio': None, 'recomputed': [],
+        'quality_issues': quality.get('issues', []), 'confidence': quality.get('confidence'),
+    }
+
+    if not evaluation.transcription:
+        if not item['audio_path']:
+            raise RescoreError('no transcription and no audio file')
+        prepared['audio'] = load_audio(item['audio_path'])
+        transcription_result = evaluation_processor.transcribe(evaluation, prepared['audio'])
+        if not transcription_result.get('success'):
+            raise RescoreError(f"transcription failed: {transcription_result.get('error')}")
+        evaluation.transcription = transcription_result['text']
+        prepared['quality_issues'] = transcription_result.get('quality_issues', [])
+        prepared['confidence'] = round(transcription_result.get('confidence', 1.0) * 100, 1)
+        prepared['recomputed'].append('transcription')
+    return prepared
+
+
+def _apply_scores(prepared: Dict, verbal_result: Dict) -> Dict:
+    """Paraverbal scores, total, level and feedback of one evaluation"""
+    item, evaluation, recomputed = prepared['item'], prepared['evaluation'], prepared['recomputed']
+    evaluation.fluency_score = verbal_result['fluency_score']
+    evaluation.vocabulary_score = verbal_result['vocabulary_score']
+    evaluation.structure_score = verbal_result['structure_score']
+    evaluation.verbal_score = verbal_result['verbal_score']
+
+    # Legacy metrics lack what the pitch and pace scorers read: extract them again
+    if has_current_metrics(evaluation.audio_features):
+        paraverbal_result = voice_service.score_paraverbal(evaluation.audio_features)
+    else:
+        if not item['audio_path']:
+            raise RescoreError('no current audio features and no audio file')
+        paraverbal_result = voice_service.analyze_paraverbal_communication(item['audio_path'], audio=prepared['audio'])
+        if not paraverbal_result.get('success'):
+            raise RescoreError(f"paraverbal analysis failed: {paraverbal_result.get('error')}")
+        evaluation.audio_features = paraverbal_result['audio_features']
+        evaluation.duration = paraverbal_result['duration']
+        recomputed.append('audio_features')
+    evaluation.pitch_score = paraverbal_result['pitch_score']
+    evaluation.pace_score = paraverbal_result['pace_score']
+    evaluation.energy_score = paraverbal_result['energy_score']
+    evaluation.paraverbal_score = paraverbal_result['paraverbal_score']
+
+    evaluation_processor.apply_scores(evaluation, verbal_result, prepared['quality_issues'], prepared['confidence'])
+    evaluation.updated_at = timezone.now()
+
+    return {
+        'id': item['id'],
+        'fields': {field: getattr(evaluation, field) for field in RESCORED_FIELDS},
+        'recomputed': recomputed,
+    }
+
+
+def _failure(item: Dict, error: Exception) -> Dict:
+    return {'id': item['id'], 'error': f'{type(error).__name__}: {error}'}
+
+
+def _init_worker():
+    # Needed with the 'spawn' start method; a no-op for forked workers
+    import django
+    django.setup()
+
+
+class RescoreService:
+    """Batch re-scoring of completed evaluations with a resumable checkpoint"""
+
+    def snapshot(self, evaluation: VoiceEvaluation) -> Dict:
+        """Picklable inputs of ``rescore_artifacts``"""
+        return {
+            'id': evaluation.pk,
+            'language': evaluation.language,
+            'transcription': evaluation.transcription,
+            'audio_features': evaluation.audio_features or {},
+            'duration': evaluation.duration,
+            'originality_score': evaluation.originality_score,
+            'transcription_quality': (evaluation.feedback or {}).get('transcription_quality', {}),
+            'transcription_profile': evaluation.transcription_profile,
+            'audio_name': evaluation.audio_file.name,
+            'audio_path': evaluation.audio_file.path if evaluation.audio_file else None,
+        }
+
+    def run(self, workers: int = 1, batch_size: int = 500, language: Optional[str] = None,
+            checkpoint: str = DEFAULT_CHECKPOINT, resume: bool = False,
+            on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Rescore every completed evaluation in primary-key order
+
+        Each batch is scored on the process pool, written back with one
+        bulk_update, followed by a progress summary rebuild for its users,
+        and then recorded in the checkpoint file. With ``resume`` the run
+        continues after the last checkpointed evaluation; the checkpoint is
+        removed once the run completes.
+
+        Args:
+            workers: Worker processes (1 scores in this process)
+            batch_size: Evaluations per bulk_update
+            language: Only rescore evaluations in this language
+            checkpoint: Path of the checkpoint file
+            resume: Continue from the checkpoint instead of starting over
+            on_progress: Called with the run statistics after every batch
+
+        Returns:
+            Run statistics (total, rescored, failed, recomputed artifacts,
+            last_id, and how many were already done when resuming)
+        """
+        state = self._load_checkpoint(checkpoint) if resume else {}
+        stats = {
+            'last_id': state.get('last_id', 0),
+            'total': 0,
+            'rescored': state.get('rescored', 0),
+            'failed': state.get('failed', 0),
+            'recomputed': state.get('recomputed', {'transcription': 0, 'audio_features': 0}),
+            'started_at': time.monotonic(),
+        }
+        queryset = VoiceEvaluation.objects.filter(processing_status='completed').select_related('user').order_by('pk')
+        if language:
+            queryset = queryset.filter(language=language)
+        stats['resumed'] = stats['rescored'] + stats['failed']
+        stats['total'] = stats['resumed'] + queryset.filter(pk__gt=stats['last_id']).count()
+
+        pool = None
+        if workers > 1:
+            # Forked workers must not share the parent's database sockets
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        try:
+            while True:
+                batch = list(queryset.filter(pk__gt=stats['last_id'])[:batch_size])
+                if not batch:
+                    break
+                items = [self.snapshot(evaluation) for evaluation in batch]
+                if pool:
+                    # Each worker scores a chunk, so its verbal analysis still runs in batches
+                    size = max(1, len(items) // (workers * 4))
+                    chunks = [items[start:start + size] for start in range(0, len(items), size)]
+                    results = [result for chunk in pool.map(rescore_artifacts, chunks) for result in chunk]
+                else:
+                    results = rescore_artifacts(items)
+
+                self._write_back(batch, results, stats)
+                stats['last_id'] = batch[-1].pk
+                self._save_checkpoint(checkpoint, stats)
+                if on_progress:
+                    on_progress(stats)
+        finally:
+            if pool:
+                pool.shutdown()
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        return stats
+
+    def _write_back(self, batch: List[VoiceEvaluation], results: List[Dict], stats: Dict):
+        by_id = {evaluation.pk: evaluation for evaluation in batch}
+        updated = []
+        for result in results:
+            if 'error' in result:
+                logger.warning("Could not rescore evaluation %s: %s", result['id'], result['error'])
+                stats['failed'] += 1
+                continue
+            evaluation = by_id[result['id']]
+            for field, value in result['fields'].items():
+                setattr(evaluation, field, value)
+            for artifact in result['recomputed']:
+                stats['recomputed'][artifact] += 1
+            updated.append(evaluation)
+
+        with transaction.atomic():
+            VoiceEvaluation.objects.bulk_update(updated, RESCORED_FIELDS)
+        stats['rescored'] += len(updated)
+
+        # Levels and averages changed: recompute the affected progress summaries
+        for user in {evaluation.user_id: evaluation.user for evaluation in updated}.values():
+            try:
+                progress_service.rebuild(user)
+            except Exception:
+                logger.exception("Could not rebuild progress summary for user %s", user.pk)
+
+    def _load_checkpoint(self, path: str) -> Dict:
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save_checkpoint(self, path: str, stats: Dict):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        state = {key: stats[key] for key in ('last_id', 'rescored', 'failed', 'recomputed')}
+        state['updated_at'] = timezone.now().isoformat()
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+
+# Global rescore service instance
+rescore_service = RescoreService()
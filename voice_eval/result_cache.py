@@ -0,0 +1,175 @@
+"""
+Content-addressed cache for transcription and audio analysis results
+Entries are keyed by a SHA-256 of the decoded audio plus the model and
+options that produced them, so resubmitting the same recording skips
+inference. Stored as small JSON files with size-bounded LRU eviction.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Dict, Optional
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class ResultCache:
+    """
+    On-disk JSON cache with least-recently-used eviction
+
+    Reads touch the entry's mtime, so the mtime order is the LRU order;
+    when a write pushes the store over its size limit the oldest entries
+    are removed until it is back under 90% of the limit.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None):
+        self._root = root
+        self._max_bytes = max_bytes
+        self._size = None  # bytes on disk, computed lazily
+        self._lock = threading.Lock()
+
+    @property
+    def root(self) -> str:
+        return str(self._root or getattr(
+            settings, 'VOICE_EVAL_CACHE_DIR', os.path.join(settings.BASE_DIR, 'ml_models', 'cache')
+        ))
+
+    @property
+    def max_bytes(self) -> int:
+        if self._max_bytes is not None:
+            return self._max_bytes
+        return int(getattr(settings, 'VOICE_EVAL_CACHE_MAX_MB', 256)) * 1024 * 1024
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(audio_digest: str, *parts) -> str:
+        """Cache key for an audio digest and everything that affects the result"""
+        return hashlib.sha256('|'.join([audio_digest, *map(str, parts)]).encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                value = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Dropping unreadable cache entry %s: %s", key, e)
+            self.delete(key)
+            return None
+
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return value
+
+    def set(self, key: str, value: Dict) -> None:
+        if not self.enabled:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            data = json.dumps(value, default=_json_default).encode('utf-8')
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+
+            # Atomic replace so concurrent readers never see a partial file
+            tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("Could not cache result %s: %s", key, e)
+            return
+
+        with self._lock:
+            if self._size is not None:
+                self._size += len(data) - previous
+            if self._current_size() > self.max_bytes:
+                self._evict()
+
+    def delete(self, key: str) -> None:
+        try:
+            size = os.path.getsize(self._path(key))
+            os.remove(self._path(key))
+        except OSError:
+            return
+        with self._lock:
+            if self._size is not None:
+                self._size -= size
+
+    def clear(self) -> int:
+        """Remove every entry; returns the number removed"""
+        removed = 0
+        with self._lock:
+            for path, _, _ in self._entries():
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+            self._size = 0
+        return removed
+
+    def _current_size(self) -> int:
+        if self._size is None:
+            self._size = sum(size for _, _, size in self._entries())
+        return self._size
+
+    def _evict(self):
+        # Other processes share the directory, so rescan instead of trusting _size
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        target = int(self.max_bytes * 0.9)
+        for path, _, size in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._size = total
+
+    def _entries(self):
+        """(path, mtime, size) for every entry on disk"""
+        if not os.path.isdir(self.root):
+            return []
+        entries = []
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.json'):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((entry.path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+
+# Global cache instance
+result_cache = ResultCache()
@@ -1,9 +1,11 @@
 from __future__ import annotations
 from rest_framework import serializers
+from django.urls import reverse
 from .models import (
     VoiceEvaluation, ReferenceText, VoiceEvaluationHistory,
-    Certificate, PronunciationPractice, TestingCenter
+    Certificate, PronunciationPractice, TestingCenter, VoiceProgressSummary
 )
+from .processing_service import evaluation_processor
 
 
 class VoiceEvaluationSerializer(serializers.ModelSerializer):
@@ -39,7 +41,40 @@ class VoiceEvaluationDetailSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = VoiceEvaluation
-        fields = '__all__'
+        exclude = ['transcription_embedding']
+
+
+class VoiceEvaluationStatusSerializer(serializers.ModelSerializer):
+    """Processing status with per-stage progress (used by the 202 response and status endpoint)"""
+    stages = serializers.SerializerMethodField()
+    percent_complete = serializers.SerializerMethodField()
+    status_url = serializers.SerializerMethodField()
+    detail_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = VoiceEvaluation
+        fields = [
+            'id', 'processing_status', 'processing_stage', 'stages',
+            'percent_complete', 'error_message', 'processing_started_at',
+            'processing_finished_at', 'status_url', 'detail_url'
+        ]
+        read_only_fields = fields
+    
+    def get_stages(self, obj):
+        return evaluation_processor.get_progress(obj)
+    
+    def get_percent_complete(self, obj):
+        return evaluation_processor.get_percent_complete(obj)
+    
+    def get_status_url(self, obj):
+        return self._build_url(reverse('voice_eval:voice-evaluation-status', args=[obj.pk]))
+    
+    def get_detail_url(self, obj):
+        return self._build_url(reverse('voice_eval:detail', args=[obj.pk]))
+    
+    def _build_url(self, path):
+        request = self.context.get('request')
+        return request.build_absolute_uri(path) if request else path
 
 
 class ReferenceTextSerializer(serializers.ModelSerializer):
@@ -104,3 +139,16 @@ class TestingCenterSerializer(serializers.ModelSerializer):
             'phone', 'email', 'website', 'languages', 'certifications', 'is_active'
         ]
 
+
+
+class VoiceProgressSummarySerializer(serializers.ModelSerializer):
+    improvement = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = VoiceProgressSummary
+        fields = [
+            'evaluation_count', 'average_scores', 'first_score', 'previous_score',
+            'latest_score', 'latest_level', 'latest_evaluation', 'best_score',
+            'best_evaluation', 'improvement', 'level_transitions', 'updated_at'
+        ]
+        read_only_fields = fields
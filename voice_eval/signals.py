@@ -0,0 +1,54 @@
+"""Signal handlers keeping voice evaluation caches and indexes in sync"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .map_service import map_service
+from .models import ReferenceText, TestingCenter, VoiceEvaluation
+from .progress_service import progress_service
+from .reference_index import reference_index
+from .submission_index import submission_index
+
+
+@receiver(post_save, sender=ReferenceText)
+def update_reference_index(sender, instance, **kwargs):
+    """Upsert the saved reference in the embedding index once the row is committed"""
+    transaction.on_commit(lambda: reference_index.sync_reference(instance))
+
+
+@receiver(post_delete, sender=ReferenceText)
+def remove_from_reference_index(sender, instance, **kwargs):
+    # The deleted instance has no pk anymore once the transaction commits
+    pk, language = instance.pk, instance.language
+    transaction.on_commit(lambda: reference_index.remove(language, pk))
+
+
+@receiver(post_save, sender=TestingCenter)
+@receiver(post_delete, sender=TestingCenter)
+def invalidate_testing_center_maps(sender, instance, **kwargs):
+    """Cached maps are keyed by the centers version; bump it once the change is committed"""
+    transaction.on_commit(map_service.bump_centers_version)
+
+
+@receiver(post_delete, sender=VoiceEvaluation)
+def refresh_voice_progress(sender, instance, **kwargs):
+    """Recompute the owner's progress summary without the deleted evaluation"""
+    # A requeued evaluation is still counted until it completes again
+    if instance.processing_status != 'completed' and not instance.progress_recorded:
+        return
+
+    def rebuild():
+        # Skipped when the evaluation went away with its user
+        user = get_user_model().objects.filter(pk=instance.user_id).first()
+        if user is not None:
+            progress_service.rebuild(user)
+
+    transaction.on_commit(rebuild)
+
+
+@receiver(post_delete, sender=VoiceEvaluation)
+def remove_from_submission_index(sender, instance, **kwargs):
+    # The deleted instance has no pk anymore once the transaction commits
+    pk, language = instance.pk, instance.language
+    transaction.on_commit(lambda: submission_index.remove(language, pk))
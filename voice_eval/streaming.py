@@ -0,0 +1,234 @@
+"""
+Streaming pronunciation practice over a WebSocket
+The browser sends 16 kHz mono 16-bit PCM frames while the user speaks; each
+connection feeds them straight into its own Vosk recognizer and gets partial
+transcriptions back, so the final alignment is ready as soon as they stop.
+
+Protocol (JSON text messages, PCM as binary messages):
+    client -> {"type": "start", "expected_text": ..., "language": "en",
+               "evaluation_id": null, "sample_rate": 16000}
+    server -> {"type": "ready"}
+    client -> <binary PCM frames>
+    server -> {"type": "partial", "text": ...} / {"type": "result", "text": ...}
+    client -> {"type": "stop"}
+    server -> {"type": "final", ...same fields as process_pronunciation_api...}
+    server -> {"type": "error", "error": ...} on failure
+"""
+import json
+import logging
+from importlib import import_module
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpRequest, parse_cookie
+from django.http.request import validate_host
+
+from .audio_ingest import pcm16_to_wav
+from .pronunciation_service import pronunciation_service
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+# Longest attempt kept in memory (and saved with the practice record)
+MAX_STREAM_SECONDS = 120
+
+
+class PronunciationStream:
+    """
+    Incremental recognition session for one WebSocket connection
+
+    Methods are synchronous (Vosk is CPU-bound); the ASGI handler runs them
+    in worker threads.
+    """
+
+    def __init__(self, recognizer, expected_text: str, sample_rate: int = SAMPLE_RATE,
+                 grammar: Optional[str] = None, language: str = 'en'):
+        self.recognizer = recognizer
+        self.expected_text = expected_text
+        self.sample_rate = sample_rate
+        self.grammar = grammar
+        self.language = language
+        self.pcm = bytearray()
+        self.segments = []
+        self._last_partial = ''
+
+    @property
+    def max_bytes(self) -> int:
+        return MAX_STREAM_SECONDS * self.sample_rate * 2
+
+    def feed(self, frames: bytes) -> Optional[Dict]:
+        """Feed PCM frames; returns a message for the client when the text changed"""
+        if len(self.pcm) + len(frames) > self.max_bytes:
+            raise ValueError(f'Recording longer than {MAX_STREAM_SECONDS} seconds')
+        self.pcm.extend(frames)
+
+        if self.recognizer.AcceptWaveform(bytes(frames)):
+            text = json.loads(self.recognizer.Result()).get('text', '')
+            self._last_partial = ''
+            if text:
+                self.segments.append(text)
+            return {'type': 'result', 'text': self.text}
+
+        partial = json.loads(self.recognizer.PartialResult()).get('partial', '')
+        if partial == self._last_partial:
+            return None
+        self._last_partial = partial
+        return {'type': 'partial', 'text': ' '.join(self.segments + [partial]).strip()}
+
+    def finish(self) -> Dict:
+        """Flush the recognizer and align the full transcription with the expected text"""
+        text = json.loads(self.recognizer.FinalResult()).get('text', '')
+        if text:
+            self.segments.append(text)
+        return pronunciation_service.compare_texts(self.expected_text, self.text)
+
+    @property
+    def text(self) -> str:
+        return ' '.join(self.segments).strip()
+
+    def wav_bytes(self) -> bytes:
+        """The received audio as a WAV file"""
+        return pcm16_to_wav(bytes(self.pcm), self.sample_rate)
+
+    def release(self, pool):
+        """Return the recognizer to the pool (at most once)"""
+        if self.recognizer is not None:
+            pool.release(self.language, self.sample_rate, self.recognizer, self.grammar)
+            self.recognizer = None
+
+
+# ----------------------------------------------------------------------
+# ASGI handler
+# ----------------------------------------------------------------------
+
+def _header(scope, name: bytes) -> str:
+    for key, value in scope.get('headers', []):
+        if key == name:
+            return value.decode('latin-1')
+    return ''
+
+
+def _origin_allowed(scope) -> bool:
+    """Reject cross-site WebSocket connections (browsers always send Origin)"""
+    origin = _header(scope, b'origin')
+    if not origin:
+        return True
+    allowed_hosts = settings.ALLOWED_HOSTS
+    if settings.DEBUG and not allowed_hosts:
+        allowed_hosts = ['.localhost', '127.0.0.1', '[::1]']
+    return validate_host(urlparse(origin).hostname or '', allowed_hosts)
+
+
+@sync_to_async
+def _get_user(scope):
+    """Authenticate the connection with the Django session cookie"""
+    from django.contrib.auth import get_user
+
+    cookies = parse_cookie(_header(scope, b'cookie'))
+    request = HttpRequest()
+    request.session = import_module(settings.SESSION_ENGINE).SessionStore(
+        cookies.get(settings.SESSION_COOKIE_NAME)
+    )
+    return get_user(request)
+
+
+@sync_to_async
+def _owned_evaluation(user, evaluation_id) -> bool:
+    from .models import VoiceEvaluation
+
+    return VoiceEvaluation.objects.filter(pk=evaluation_id, user=user).exists()
+
+
+@sync_to_async
+def _save_practice(user, stream: PronunciationStream, comparison: Dict, evaluation_id):
+    return pronunciation_service.save_practice(
+        user, stream.expected_text, stream.text, comparison,
+        evaluation_id=evaluation_id, audio_content=stream.wav_bytes()
+    )
+
+
+async def _send_json(send, message: Dict):
+    await send({'type': 'websocket.send', 'text': json.dumps(message)})
+
+
+async def pronunciation_websocket(scope, receive, send):
+    """ASGI application for ``/ws/voice/pronunciation/``"""
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+
+    if not _origin_allowed(scope):
+        await send({'type': 'websocket.close', 'code': 4403})
+        return
+    user = await _get_user(scope)
+    if not user.is_authenticated:
+        await send({'type': 'websocket.close', 'code': 4401})
+        return
+    await send({'type': 'websocket.accept'})
+
+    pool = pronunciation_service.recognizer_pool
+    stream = None
+    evaluation_id = None
+    while True:
+        event = await receive()
+        if event['type'] == 'websocket.disconnect':
+            if stream is not None:
+                stream.release(pool)
+            return
+
+        try:
+            if event.get('bytes') is not None:
+                if stream is None:
+                    raise ValueError('Send a start message before audio')
+                message = await sync_to_async(stream.feed, thread_sensitive=False)(event['bytes'])
+                if message:
+                    await _send_json(send, message)
+                continue
+
+            data = json.loads(event.get('text') or '{}')
+            if data.get('type') == 'start':
+                expected_text = (data.get('expected_text') or '').strip()
+                language = data.get('language', 'en')
+                sample_rate = int(data.get('sample_rate') or SAMPLE_RATE)
+                if not expected_text:
+                    raise ValueError('Expected text is required')
+                evaluation_id = data.get('evaluation_id')
+                if evaluation_id and not await _owned_evaluation(user, evaluation_id):
+                    raise ValueError('Evaluation not found')
+                # A new start restarts the attempt: hand back the previous recognizer first
+                if stream is not None:
+                    stream.release(pool)
+                    stream = None
+                grammar = pronunciation_service.grammar_for(expected_text)
+                recognizer = await sync_to_async(pool.acquire, thread_sensitive=False)(language, sample_rate, grammar)
+                if recognizer is None:
+                    raise ValueError(f'Vosk model for {language} not loaded')
+                stream = PronunciationStream(recognizer, expected_text, sample_rate, grammar, language)
+                await _send_json(send, {'type': 'ready'})
+
+            elif data.get('type') == 'stop':
+                if stream is None:
+                    raise ValueError('Nothing to stop')
+                comparison = await sync_to_async(stream.finish, thread_sensitive=False)()
+                stream.release(pool)
+                practice = await _save_practice(user, stream, comparison, evaluation_id)
+                await _send_json(send, {
+                    'type': 'final',
+                    'success': True,
+                    'practice_id': practice.id,
+                    'spoken_text': stream.text,
+                    'comparison': comparison['comparison'],
+                    'accuracy_score': comparison['accuracy_score'],
+                    'matched_words': comparison['matched_words'],
+                    'total_words': comparison['total_words'],
+                })
+                await send({'type': 'websocket.close', 'code': 1000})
+                return
+
+        except Exception as e:
+            logger.warning("Pronunciation stream error: %s", e)
+            await _send_json(send, {'type': 'error', 'error': str(e)})
+            await send({'type': 'websocket.close', 'code': 4400})
+            return
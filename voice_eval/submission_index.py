@@ -0,0 +1,237 @@
+"""
+Submission embedding index for cross-student originality checking
+Keeps the normalized transcription embedding of every completed
+VoiceEvaluation in a per-language inverted-file (IVF) index: rows are
+grouped by their nearest k-means centroid and stored contiguously in the
+memory-mapped matrix, so a query only reads the rows of the few lists
+closest to it instead of every past submission
+"""
+from __future__ import annotations
+import logging
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+
+from .reference_index import EmbeddingIndex, normalize
+
+logger = logging.getLogger(__name__)
+
+# Below this many rows every row is scanned and no centroids are kept
+IVF_MIN_ROWS = 256
+# Lists are retrained once sqrt(rows) reaches twice the current list count
+IVF_RETRAIN_FACTOR = 2
+KMEANS_ITERATIONS = 10
+# Rows scored against the centroids at once while training
+KMEANS_BATCH_ROWS = 8192
+DEFAULT_NPROBE = 8
+
+
+def assign_lists(matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the closest centroid (cosine) of every row"""
+    lists = np.empty(len(matrix), dtype=np.int64)
+    for start in range(0, len(matrix), KMEANS_BATCH_ROWS):
+        lists[start:start + KMEANS_BATCH_ROWS] = np.argmax(matrix[start:start + KMEANS_BATCH_ROWS] @ centroids.T, axis=1)
+    return lists
+
+
+def train_centroids(matrix: np.ndarray, nlist: int, iterations: int = KMEANS_ITERATIONS,
+                    seed: int = 0) -> np.ndarray:
+    """
+    Spherical k-means over normalized rows
+
+    Starts from ``nlist`` distinct rows picked at random; a centroid that
+    loses all its rows keeps its previous position.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = np.array(matrix[rng.choice(len(matrix), size=nlist, replace=False)], dtype=np.float32)
+    for _ in range(iterations):
+        lists = assign_lists(matrix, centroids)
+        members = sparse.csr_matrix((np.ones(len(lists), dtype=np.float32), (lists, np.arange(len(lists)))),
+                                    shape=(nlist, len(lists)))
+        sums = np.asarray(members @ matrix, dtype=np.float32)
+        filled = np.bincount(lists, minlength=nlist) > 0
+        centroids[filled] = normalize(sums[filled])
+    return centroids
+
+
+class SubmissionIndex(EmbeddingIndex):
+    """
+    IVF index over completed evaluations' transcription embeddings
+
+    Besides the ids and matrix, each language stores the owner of every
+    row, the list centroids and the list offsets: rows of list ``l`` are
+    ``offsets[l]:offsets[l + 1]``. New submissions and removals go to the
+    delta segment, which is scanned in full; merging it regroups every row
+    by list, retraining the lists as the index grows.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        super().__init__('submissions', root)
+
+    @property
+    def nprobe(self) -> int:
+        return int(getattr(settings, 'VOICE_EVAL_SUBMISSION_NPROBE', DEFAULT_NPROBE))
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def search_others(self, language: str, query, user_id: int, k: int = 3,
+                      nprobe: Optional[int] = None) -> Dict:
+        """
+        Nearest past submissions of other users
+
+        Args:
+            language: Language code
+            query: Query embedding (normalized here)
+            user_id: Owner whose own submissions are skipped
+            k: Number of nearest rows to return
+            nprobe: Lists to scan (default VOICE_EVAL_SUBMISSION_NPROBE)
+
+        Returns:
+            Dict with 'count' (indexed submissions), 'scanned' (rows scored)
+            and 'top' (list of (evaluation_id, user_id, similarity) sorted
+            by similarity)
+        """
+        snapshot = self.snapshot(language)
+        empty = {'count': snapshot.count, 'scanned': 0, 'top': []}
+        if not snapshot.count:
+            return empty
+
+        query = normalize(query)
+        if snapshot.dim != query.shape[0]:
+            logger.warning("Index %s/%s has dim %s, query has %s", self.name, language, snapshot.dim, query.shape[0])
+            return empty
+
+        ids, matrix, extras = snapshot.ids, snapshot.matrix, snapshot.extras
+        ranges = []
+        if len(ids):
+            centroids, offsets = extras['centroids'], extras['offsets']
+            if len(centroids):
+                probe = min(nprobe or self.nprobe, len(centroids))
+                closest = np.argpartition(-(centroids @ query), probe - 1)[:probe]
+                ranges = sorted((int(offsets[l]), int(offsets[l + 1])) for l in closest)
+            else:
+                ranges = [(0, len(ids))]
+
+        # Contiguous slices of the memory map: only the probed lists are read
+        found_ids, found_owners, similarities = [], [], []
+        owners = extras.get('owners')
+        for start, stop in ranges:
+            keep = owners[start:stop] != user_id
+            if snapshot.live is not None:
+                keep &= snapshot.live[start:stop]
+            others = np.flatnonzero(keep) + start
+            if len(others):
+                found_ids.append(ids[others])
+                found_owners.append(owners[others])
+                similarities.append(matrix[start:stop][others - start] @ query)
+
+        # Rows not merged into the lists yet
+        others = np.flatnonzero(snapshot.delta_owners != user_id)
+        if len(others):
+            found_ids.append(snapshot.delta_ids[others])
+            found_owners.append(snapshot.delta_owners[others])
+            similarities.append(snapshot.delta_matrix[others] @ query)
+        if not similarities:
+            return empty
+        found_ids, found_owners = np.concatenate(found_ids), np.concatenate(found_owners)
+        similarities = np.concatenate(similarities)
+
+        k = min(k, len(similarities))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return {
+            'count': snapshot.count,
+            'scanned': int(len(similarities)),
+            'top': [(int(found_ids[i]), int(found_owners[i]), float(similarities[i])) for i in top],
+        }
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def rebuild(self, language: str, rows: Iterable[Tuple[int, int, List[float]]]) -> int:
+        """Replace a language's index with the given (evaluation_id, user_id, embedding) rows"""
+        rows = list(rows)
+        owner_of = {evaluation_id: user_id for evaluation_id, user_id, _ in rows}
+        ids, matrix = self._collect((evaluation_id, embedding) for evaluation_id, _, embedding in rows)
+        owners = np.asarray([owner_of[row_id] for row_id in ids], dtype=np.int64)
+        with self._write_lock(language):
+            self._write_lists(language, ids, matrix, owners, self._train(matrix))
+        return len(ids)
+
+    def upsert(self, language: str, evaluation_id: int, user_id: int, embedding) -> None:
+        """Add or replace one submission, moving it out of any other language"""
+        super().upsert(language, evaluation_id, embedding, owner=user_id)
+
+    def rebuild_from_db(self, language: Optional[str] = None) -> Dict[str, int]:
+        """Rebuild one or all languages from the stored transcription embeddings"""
+        from .models import VoiceEvaluation
+
+        languages = [language] if language else [code for code, _ in VoiceEvaluation.LANGUAGE_CHOICES]
+        counts = {}
+        for lang in languages:
+            rows = (
+                VoiceEvaluation.objects.filter(language=lang, processing_status='completed')
+                .exclude(transcription_embedding=[])
+                .values_list('id', 'user_id', 'transcription_embedding')
+                .iterator()
+            )
+            counts[lang] = self.rebuild(lang, rows)
+        return counts
+
+    def sync_evaluation(self, evaluation) -> None:
+        """Apply one processed evaluation to the index"""
+        if evaluation.processing_status == 'completed' and evaluation.transcription_embedding:
+            self.upsert(evaluation.language, evaluation.pk, evaluation.user_id, evaluation.transcription_embedding)
+        else:
+            self.remove(evaluation.language, evaluation.pk)
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _needs_training(self, rows: int, nlist: int) -> bool:
+        if rows < IVF_MIN_ROWS:
+            return False
+        return not nlist or math.isqrt(rows) >= IVF_RETRAIN_FACTOR * nlist
+
+    def _train(self, matrix: np.ndarray) -> np.ndarray:
+        if len(matrix) < IVF_MIN_ROWS:
+            return np.empty((0, matrix.shape[1] if matrix.ndim == 2 else 0), dtype=np.float32)
+        return train_centroids(matrix, math.isqrt(len(matrix)))
+
+    def _merge(self, language: str, ids: np.ndarray, matrix: np.ndarray, owners: np.ndarray):
+        # Keep the current lists until the index has outgrown them
+        centroids = self.snapshot(language).extras.get('centroids', np.empty((0, 0), dtype=np.float32))
+        if self._needs_training(len(ids), len(centroids)):
+            centroids = self._train(matrix)
+        self._write_lists(language, ids, matrix, owners, centroids)
+
+    def _write_lists(self, language: str, ids: np.ndarray, matrix: np.ndarray, owners: np.ndarray,
+                     centroids: np.ndarray):
+        """Write rows grouped by list (a single list when there are no centroids)"""
+        if len(centroids):
+            lists = assign_lists(matrix, centroids)
+            order = np.argsort(lists, kind='stable')
+            ids, matrix, owners = ids[order], matrix[order], owners[order]
+            offsets = np.concatenate([[0], np.cumsum(np.bincount(lists, minlength=len(centroids)))])
+        else:
+            offsets = np.array([0, len(ids)])
+        self._write(language, ids, matrix, self._extras(owners, centroids, offsets))
+
+    @staticmethod
+    def _extras(owners: np.ndarray, centroids: np.ndarray, offsets: np.ndarray) -> Dict[str, np.ndarray]:
+        return {
+            'owners': owners.astype(np.int64),
+            'centroids': np.ascontiguousarray(centroids, dtype=np.float32),
+            'offsets': offsets.astype(np.int64),
+        }
+
+
+# Global index instance
+submission_index = SubmissionIndex()
@@ -0,0 +1,1485 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+import soundfile as sf
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.conf import settings
+from django.db import transaction
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from users.models import User
+from .models import (
+    VoiceEvaluation, PronunciationPractice, Certificate, TestingCenter, VoiceProgressSummary, ReferenceText
+)
+from .processing_service import evaluation_processor, PROCESSING_STAGES, TIMED_STAGES, stage_timing_percentiles
+from .audio_ingest import DecodedAudio, decode_audio_bytes, TARGET_SAMPLE_RATE
+from .reference_index import EmbeddingIndex
+from .submission_index import SubmissionIndex
+from .embedding_service import MicroBatcher, embedding_service
+from .model_registry import ModelRegistry
+from .inference_client import InferenceClient, InferenceError
+from .inference_server import InferenceServer, InferenceHandlers
+from .paraverbal_features import extract_paraverbal_metrics
+from .streaming import pronunciation_websocket
+from .pronunciation_service import RecognizerPool, practice_grammar, pronunciation_service
+from .result_cache import ResultCache
+from .map_service import map_service
+from .center_index import chord_to_km, to_unit_vectors
+from .progress_service import progress_service
+from .benchmarks import compare_reports, synthetic_speech, synthetic_transcript
+from .ai_service import voice_service
+from .text_stats import FILLER_WORDS, FillerMatcher, text_stats
+from .verbal_features import collect_verbal_stats
+from .vad import detect_speech, speech_chunks
+
+
+TEST_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class BackgroundProcessingTestCase(TestCase):
+    """Tests pour le traitement en arrière-plan des évaluations vocales"""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='speaker',
+            email='speaker@example.com',
+            password='testpass123'
+        )
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def _create_evaluation(self):
+        return VoiceEvaluation.objects.create(
+            user=self.user,
+            audio_file=SimpleUploadedFile('sample.wav', b'RIFF0000WAVE'),
+            language='en'
+        )
+
+    @override_settings(VOICE_EVAL_BACKGROUND_PROCESSING=True)
+    def test_create_returns_202_with_status_url(self):
+        """En mode arrière-plan, la création répond 202 sans traiter l'audio"""
+        with mock.patch.object(evaluation_processor, 'process') as process:
+            response = self.client.post('/voice/api/evaluations/', {
+                'audio_file': SimpleUploadedFile('sample.wav', b'RIFF0000WAVE'),
+                'language': 'en',
+            })
+
+        self.assertEqual(response.status_code, 202)
+        process.assert_not_called()
+        data = response.json()
+        self.assertEqual(data['processing_status'], 'pending')
+        self.assertEqual(len(data['stages']), len(PROCESSING_STAGES))
+        self.assertTrue(data['status_url'].endswith(f"/voice/api/evaluations/{data['id']}/status/"))
+        self.assertEqual(response['Location'], data['status_url'])
+
+    def test_status_endpoint_reports_stage_progress(self):
+        evaluation = self._create_evaluation()
+        evaluation.processing_status = 'processing'
+        evaluation.processing_stage = 'verbal'
+        evaluation.processing_progress = {
+            'ingest': {'status': 'done'},
+            'transcribe': {'status': 'done'},
+            'verbal': {'status': 'running'},
+        }
+        evaluation.save()
+
+        response = self.client.get(reverse('voice_eval:voice-evaluation-status', args=[evaluation.pk]))
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        statuses = {stage['stage']: stage['status'] for stage in data['stages']}
+        self.assertEqual(statuses['transcribe'], 'done')
+        self.assertEqual(statuses['verbal'], 'running')
+        self.assertEqual(statuses['scoring'], 'pending')
+        self.assertEqual(data['percent_complete'], 200 // len(PROCESSING_STAGES))
+
+    def test_claim_next_takes_each_evaluation_once(self):
+        first = self._create_evaluation()
+        second = self._create_evaluation()
+
+        claimed = [evaluation_processor.claim_next(), evaluation_processor.claim_next()]
+
+        self.assertEqual([e.pk for e in claimed], [first.pk, second.pk])
+        self.assertIsNone(evaluation_processor.claim_next())
+        first.refresh_from_db()
+        self.assertEqual(first.processing_status, 'processing')
+
+    def test_failed_stage_is_recorded(self):
+        evaluation = self._create_evaluation()
+
+        with mock.patch('voice_eval.processing_service.voice_service') as service, \
+                mock.patch('voice_eval.processing_service.load_audio'):
+            service.transcribe_audio.return_value = {'success': False, 'error': 'no audio'}
+            self.assertFalse(evaluation_processor.run(evaluation))
+
+        evaluation.refresh_from_db()
+        self.assertEqual(evaluation.processing_status, 'failed')
+        self.assertEqual(evaluation.processing_progress['transcribe']['status'], 'failed')
+        self.assertIn('no audio', evaluation.error_message)
+
+
+class AudioIngestTestCase(TestCase):
+    """Tests pour le décodage unique des fichiers audio"""
+
+    def test_wav_is_decoded_to_16k_mono_float32(self):
+        sr = 44100
+        t = np.arange(sr) / sr
+        stereo = np.stack([np.sin(2 * np.pi * 220 * t), np.sin(2 * np.pi * 220 * t)], axis=1) * 0.5
+        buffer = io.BytesIO()
+        sf.write(buffer, stereo, sr, format='WAV')
+
+        audio = decode_audio_bytes(buffer.getvalue())
+
+        self.assertEqual(audio.sample_rate, TARGET_SAMPLE_RATE)
+        self.assertEqual(audio.samples.dtype, np.float32)
+        self.assertEqual(audio.samples.ndim, 1)
+        self.assertAlmostEqual(audio.duration, 1.0, places=2)
+        self.assertAlmostEqual(float(np.abs(audio.samples).max()), 0.5, places=1)
+
+
+class ParaverbalFeaturesTestCase(TestCase):
+    """Tests pour le calcul des métriques paraverbales en une seule passe STFT"""
+
+    def test_pitch_and_energy_of_a_gliding_tone(self):
+        sr = TARGET_SAMPLE_RATE
+        t = np.arange(sr * 2) / sr
+        frequency = 150 + 50 * np.sin(2 * np.pi * 0.5 * t)  # one 100-200 Hz glide cycle
+        y = (0.2 * np.sin(2 * np.pi * np.cumsum(frequency) / sr)).astype(np.float32)
+
+        metrics = extract_paraverbal_metrics(y, sr)
+
+        self.assertGreater(metrics['voiced_ratio'], 0.9)
+        self.assertAlmostEqual(metrics['pitch_mean'], 150, delta=10)
+        self.assertAlmostEqual(metrics['pitch_range'], 100, delta=20)
+        self.assertAlmostEqual(metrics['rms_mean'], 0.2 / np.sqrt(2), delta=0.01)
+
+    def test_silence_has_no_pitch_or_onsets(self):
+        metrics = extract_paraverbal_metrics(np.zeros(TARGET_SAMPLE_RATE, dtype=np.float32), TARGET_SAMPLE_RATE)
+
+        self.assertEqual(metrics['voiced_ratio'], 0.0)
+        self.assertEqual(metrics['onset_count'], 0)
+        self.assertEqual(metrics['rms_mean'], 0.0)
+
+
+class ReferenceIndexTestCase(TestCase):
+    """Tests pour l'index d'embeddings des textes de référence"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.index = EmbeddingIndex('references', root=self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_search_matches_bruteforce_cosine(self):
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(50, 8))
+        self.index.rebuild('en', [(i + 1, v.tolist()) for i, v in enumerate(vectors)])
+        query = rng.normal(size=8)
+
+        result = self.index.search('en', query, k=3)
+
+        expected = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+        self.assertEqual(result['count'], 50)
+        self.assertAlmostEqual(result['max_similarity'], expected.max(), places=5)
+        self.assertAlmostEqual(result['mean_similarity'], expected.mean(), places=5)
+        self.assertEqual([row_id for row_id, _ in result['top']], list(np.argsort(-expected)[:3] + 1))
+
+    def test_incremental_upsert_and_remove(self):
+        self.index.upsert('en', 1, [1.0, 0.0])
+        self.index.upsert('en', 2, [0.0, 1.0])
+        self.index.upsert('en', 1, [0.0, 2.0])  # update in place
+        self.index.upsert('fr', 2, [1.0, 0.0])  # language change moves the row
+
+        ids, matrix = self.index.load('en')
+        self.assertEqual(list(ids), [1])
+        np.testing.assert_allclose(matrix[0], [0.0, 1.0])
+
+        self.assertTrue(self.index.remove('fr', 2))
+        self.assertEqual(self.index.search('fr', [1.0, 0.0])['count'], 0)
+
+    def test_deleted_reference_leaves_index_after_commit(self):
+        with mock.patch('voice_eval.signals.reference_index') as index:
+            reference = ReferenceText.objects.create(language='fr', theme='Climat', text='Le climat change.')
+            pk = reference.pk
+            with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+                reference.delete()
+        index.remove.assert_called_once_with('fr', pk)
+
+    @override_settings(VOICE_EVAL_INDEX_MAX_DELTA_ROWS=4)
+    def test_upserts_append_to_delta_until_compaction(self):
+        rng = np.random.default_rng(1)
+        vectors = rng.normal(size=(10, 8))
+        self.index.rebuild('en', [(i + 1, v.tolist()) for i, v in enumerate(vectors[:6])])
+        base = self.index._read_manifest('en')['matrix']
+
+        self.index.upsert('en', 7, vectors[6])
+        self.index.upsert('en', 2, vectors[7])  # replaces a base row
+        self.index.remove('en', 3)
+
+        self.assertEqual(self.index._read_manifest('en')['matrix'], base)
+        reader = EmbeddingIndex('references', root=self.root)  # another process
+        query = vectors[7]
+        result = reader.search('en', query, k=1)
+        self.assertEqual(result['count'], 6)
+        self.assertEqual(result['top'][0][0], 2)
+        self.assertAlmostEqual(result['top'][0][1], 1.0, places=5)
+        self.assertNotIn(3, reader.load('en')[0])
+
+        self.index.upsert('en', 8, vectors[8])  # fourth delta record: merged
+        manifest = self.index._read_manifest('en')
+        self.assertNotEqual(manifest['matrix'], base)
+        self.assertEqual(manifest['count'], 7)
+        self.assertEqual(os.path.getsize(os.path.join(self.root, manifest['delta'])), 0)
+        self.assertEqual(sorted(reader.load('en')[0]), [1, 2, 4, 5, 6, 7, 8])
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class SubmissionIndexTestCase(TestCase):
+    """Tests pour l'index IVF des transcriptions des autres étudiants"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.index = SubmissionIndex(root=self.root)
+        rng = np.random.default_rng(0)
+        # 20 topics, 30 submissions each, from 10 students
+        topics = rng.normal(size=(20, 16))
+        self.vectors = np.repeat(topics, 30, axis=0) + rng.normal(scale=0.2, size=(600, 16))
+        self.rows = [(i + 1, i % 10 + 1, v.tolist()) for i, v in enumerate(self.vectors)]
+
+    def test_deleted_evaluation_leaves_index_after_commit(self):
+        user = User.objects.create_user(username='student', password='pass12345')
+        evaluation = VoiceEvaluation.objects.create(
+            user=user, audio_file=SimpleUploadedFile('take.wav', b'RIFF0000WAVE'), language='fr'
+        )
+        pk = evaluation.pk
+
+        with mock.patch('voice_eval.signals.submission_index') as index:
+            with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+                evaluation.delete()
+        index.remove.assert_called_once_with('fr', pk)
+
+    def test_probes_few_lists_and_skips_own_submissions(self):
+        self.index.rebuild('en', self.rows)
+        query = self.vectors[42] + 0.01  # near-copy of evaluation 43, by student 3
+
+        from_other = self.index.search_others('en', query, user_id=1, k=3, nprobe=2)
+        from_author = self.index.search_others('en', query, user_id=3, k=3, nprobe=2)
+
+        self.assertEqual(len(self.index.load_extras('en')['centroids']), 24)  # isqrt(600)
+        self.assertLess(from_other['scanned'], 200)
+        self.assertEqual(from_other['top'][0][:2], (43, 3))
+        self.assertGreater(from_other['top'][0][2], 0.99)
+        self.assertNotIn(3, [owner for _, owner, _ in from_author['top']])
+
+    @override_settings(VOICE_EVAL_INDEX_MAX_DELTA_ROWS=64)
+    def test_incremental_updates_match_bruteforce(self):
+        for row in self.rows[:300]:
+            self.index.upsert('en', *row)
+        self.index.upsert('en', 5, 99, self.vectors[200].tolist())  # replaces a merged row
+        self.assertTrue(self.index.remove('en', 7))
+
+        snapshot = self.index.snapshot('en')
+        nlist = len(snapshot.extras['centroids'])
+        self.assertEqual(nlist, 16)  # trained once a merge reached 256 rows
+        self.assertEqual(len(snapshot.ids), 257)
+        self.assertEqual(len(snapshot.delta_ids), 44)  # 43 new rows and the new version of 5
+        self.assertEqual(snapshot.count, 299)
+
+        owners = {row_id: owner for row_id, owner, _ in self.rows[:300]}
+        owners[5] = 99
+        query = self.vectors[250]
+        for merged in (False, True):
+            if merged:
+                self.assertEqual(self.index.compact('en'), 299)
+            ids, matrix = self.index.load('en')
+            self.assertEqual(len(ids), 299)
+            result = self.index.search_others('en', query, user_id=1, k=5, nprobe=nlist)
+            expected = sorted(
+                ((row_id, float(np.dot(vector, query) / np.linalg.norm(vector) / np.linalg.norm(query)))
+                 for row_id, vector in zip(ids, np.asarray(matrix)) if owners[row_id] != 1),
+                key=lambda item: -item[1]
+            )[:5]
+            self.assertEqual([row_id for row_id, _, _ in result['top']], [row_id for row_id, _ in expected])
+
+        extras = self.index.load_extras('en')
+        self.assertEqual(list(extras['offsets'][[0, -1]]), [0, 299])
+        lists = np.argmax(np.asarray(matrix) @ extras['centroids'].T, axis=1)
+        self.assertTrue((np.diff(lists) >= 0).all())  # rows grouped by list
+
+    def test_originality_compares_other_students(self):
+        author = User.objects.create_user(username='author', password='pass12345')
+        copier = User.objects.create_user(username='copier', password='pass12345')
+        embedding = self.vectors[0]
+
+        with override_settings(VOICE_EVAL_INDEX_DIR=self.root), \
+                mock.patch.object(voice_service, 'encode_texts', return_value=embedding):
+            first = voice_service.check_originality('My memorized speech', 'en', user_id=author.pk)
+            evaluation = VoiceEvaluation.objects.create(
+                user=author, audio_file='voice_recordings/a.wav', language='en', processing_status='completed',
+                transcription_embedding=first['embedding'],
+            )
+            SubmissionIndex(root=self.root).sync_evaluation(evaluation)
+
+            copied = voice_service.check_originality('My memorized speech', 'en', user_id=copier.pk)
+            again = voice_service.check_originality('My memorized speech', 'en', user_id=author.pk)
+
+        self.assertEqual(first['originality_score'], 75.0)  # nothing to compare with
+        self.assertEqual(copied['similar_submissions'], [{'evaluation_id': evaluation.pk, 'similarity': mock.ANY}])
+        self.assertAlmostEqual(copied['originality_score'], 30.0, places=1)
+        self.assertEqual(again['originality_score'], 75.0)  # own submissions do not count
+
+    def test_peer_count_excludes_own_submissions(self):
+        author = User.objects.create_user(username='author', password='pass12345')
+        peer = User.objects.create_user(username='peer', password='pass12345')
+        index = SubmissionIndex(root=self.root)
+        for user, vector in [(author, self.vectors[0]), (author, self.vectors[1]), (peer, self.vectors[2])]:
+            index.sync_evaluation(VoiceEvaluation.objects.create(
+                user=user, audio_file='voice_recordings/a.wav', language='en', processing_status='completed',
+                transcription_embedding=vector.tolist(),
+            ))
+
+        with override_settings(VOICE_EVAL_INDEX_DIR=self.root), \
+                mock.patch.object(voice_service, '_originality_result', wraps=voice_service._originality_result) as result:
+            voice_service._check_originality_indexed(self.vectors[0], 'en', user_id=author.pk)
+
+        count = result.call_args.args[0]
+        self.assertEqual(count, 1)  # the peer's submission, not the author's own two
+
+
+class ModelRegistryTestCase(TestCase):
+    """Tests pour le registre de modèles partagé"""
+
+    def test_concurrent_first_requests_load_once(self):
+        registry = ModelRegistry()
+        calls = []
+
+        def loader(variant):
+            calls.append(variant)
+            time.sleep(0.05)
+            return {'variant': variant}
+
+        registry.register('dummy', loader)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.get('dummy', 'en'))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(calls, ['en'])
+        self.assertTrue(all(result is results[0] for result in results))
+        report = registry.report()
+        self.assertEqual(report[0]['name'], 'dummy')
+        self.assertGreaterEqual(report[0]['load_seconds'], 0.05)
+
+
+class InferenceServiceTestCase(TestCase):
+    """Tests pour le service d'inférence partagé (socket Unix)"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        socket_path = f"{self.root}/inference.sock"
+        self.server = InferenceServer(socket_path)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = InferenceClient(socket_path=socket_path, timeout=5)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_audio_and_embeddings_round_trip_as_binary(self):
+        samples = np.linspace(-1, 1, 16000, dtype=np.float32)
+        model = mock.Mock()
+        model.transcribe.side_effect = lambda audio, **kwargs: {
+            'text': 'hello', 'samples': len(audio), 'checksum': float(audio.sum()), 'language': kwargs['language']
+        }
+        model.encode.side_effect = lambda texts: np.arange(len(texts) * 4, dtype=np.float32).reshape(-1, 4)
+
+        with mock.patch('voice_eval.inference_server.model_registry.get', return_value=model):
+            result = self.client.transcribe(samples, 'fr', 'tiny', word_timestamps=True)
+            embeddings = self.client.embed(['a', 'b'])
+
+        self.assertEqual(result['samples'], 16000)
+        self.assertAlmostEqual(result['checksum'], float(samples.sum()), places=3)
+        self.assertEqual(result['language'], 'fr')
+        np.testing.assert_array_equal(embeddings, np.arange(8, dtype=np.float32).reshape(2, 4))
+
+    def test_server_errors_are_raised_by_the_client(self):
+        with self.assertRaises(InferenceError):
+            self.client._call('unknown', {})
+        self.assertEqual(self.client.status()['calls'], {'status': 1})
+
+
+class EmbeddingBatchingTestCase(TestCase):
+    """Tests pour le regroupement des calculs d'embeddings"""
+
+    def test_concurrent_requests_share_batches(self):
+        batches = []
+
+        def encode(texts):
+            batches.append(list(texts))
+            return np.array([[len(text), 1.0] for text in texts])
+
+        batcher = MicroBatcher(encode, max_batch_size=4, max_wait_ms=50)
+        futures = batcher.submit_many(['a', 'bb', 'ccc', 'dddd', 'e', 'ff', 'g', 'hh', 'i', 'jj'])
+        single = batcher.submit('kkk')
+
+        self.assertEqual([future.result(timeout=5)[0] for future in futures], [1, 2, 3, 4, 1, 2, 1, 2, 1, 2])
+        np.testing.assert_array_equal(single.result(timeout=5), [3, 1])
+        self.assertEqual([len(batch) for batch in batches], [4, 4, 3])
+        self.assertEqual(batcher.stats()['texts'], 11)
+
+    def test_encoder_errors_reach_every_request(self):
+        batcher = MicroBatcher(mock.Mock(side_effect=RuntimeError('out of memory')), max_wait_ms=20)
+
+        futures = batcher.submit_many(['a', 'b'])
+
+        for future in futures:
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=5)
+
+    def test_import_reference_texts_in_batches(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        path = os.path.join(root, 'references.jsonl')
+        with open(path, 'w') as f:
+            for i in range(5):
+                f.write(json.dumps({'theme': f'Theme {i}', 'text': f'Reference text number {i}'}) + '\n')
+            f.write(json.dumps({'theme': 'No text'}) + '\n')
+        encode_many = lambda texts: np.array([[float(len(text)), 1.0] for text in texts])
+
+        with override_settings(VOICE_EVAL_INDEX_DIR=root), \
+                mock.patch.object(embedding_service, 'encode_many', side_effect=encode_many) as encode:
+            call_command('import_reference_texts', path, language='fr', batch_size=2, stdout=io.StringIO(),
+                         stderr=io.StringIO())
+            call_command('import_reference_texts', path, language='fr', stdout=io.StringIO(), stderr=io.StringIO())
+            ids, _ = EmbeddingIndex('references', root=root).load('fr')
+
+        self.assertEqual(ReferenceText.objects.filter(language='fr').count(), 5)
+        self.assertEqual(ReferenceText.objects.get(theme='Theme 3').embedding, [23.0, 1.0])
+        self.assertEqual(encode.call_count, 3)  # 2 + 2 + 1, nothing new the second time
+        self.assertEqual(len(ids), 5)
+
+class FakeRecognizer:
+    """Recognizer that 'hears' one word per PCM message"""
+
+    def __init__(self, words):
+        self.words = list(words)
+        self.heard = []
+
+    def AcceptWaveform(self, data):
+        self.heard.append(self.words[len(self.heard)])
+        return len(self.heard) == 2  # end of utterance after two words
+
+    def Result(self):
+        text, self.heard = ' '.join(self.heard), []
+        self.words = self.words[2:]
+        return json.dumps({'text': text})
+
+    def PartialResult(self):
+        return json.dumps({'partial': ' '.join(self.heard)})
+
+    def FinalResult(self):
+        return json.dumps({'text': ' '.join(self.heard)})
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class PronunciationStreamingTestCase(TestCase):
+    """Tests pour la pratique de prononciation en streaming (WebSocket)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='streamer', password='testpass123')
+        self.client.force_login(self.user)
+        self.cookie = f"sessionid={self.client.cookies['sessionid'].value}".encode()
+
+    def _scope(self, cookie=b''):
+        return {'type': 'websocket', 'path': '/ws/voice/pronunciation/',
+                'headers': [(b'cookie', cookie)] if cookie else []}
+
+    @async_to_sync
+    async def _converse(self, scope, messages):
+        """Queue every client message, then collect server events until the socket closes"""
+        communicator = ApplicationCommunicator(pronunciation_websocket, scope)
+        await communicator.send_input({'type': 'websocket.connect'})
+        for message in messages:
+            await communicator.send_input(message)
+
+        received = []
+        while not received or received[-1]['type'] != 'websocket.close':
+            received.append(await communicator.receive_output(timeout=5))
+        return received
+
+    def test_anonymous_connection_is_rejected(self):
+        received = self._converse(self._scope(), [])
+        self.assertEqual(received, [{'type': 'websocket.close', 'code': 4401}])
+
+    def test_partials_and_final_alignment(self):
+        pcm = np.zeros(1600, dtype=np.int16).tobytes()
+        recognizer = FakeRecognizer(['hello', 'world', 'again'])
+
+        with mock.patch('voice_eval.streaming.pronunciation_service.recognizer_pool.acquire', return_value=recognizer):
+            received = self._converse(self._scope(self.cookie), [
+                {'type': 'websocket.receive', 'text': json.dumps({'type': 'start', 'expected_text': 'Hello world again'})},
+                {'type': 'websocket.receive', 'bytes': pcm},
+                {'type': 'websocket.receive', 'bytes': pcm},
+                {'type': 'websocket.receive', 'bytes': pcm},
+                {'type': 'websocket.receive', 'text': json.dumps({'type': 'stop'})},
+            ])
+
+        self.assertEqual(received[0], {'type': 'websocket.accept'})
+        messages = [json.loads(event['text']) for event in received if event['type'] == 'websocket.send']
+        self.assertEqual([m['type'] for m in messages], ['ready', 'partial', 'result', 'partial', 'final'])
+        self.assertEqual(messages[2]['text'], 'hello world')
+        self.assertEqual(messages[-1]['accuracy_score'], 100.0)
+        self.assertEqual(received[-1]['type'], 'websocket.close')
+
+        practice = PronunciationPractice.objects.get(pk=messages[-1]['practice_id'])
+        self.assertEqual(practice.spoken_text, 'hello world again')
+        self.assertTrue(practice.audio_file.name.endswith('.wav'))
+
+    def test_restart_returns_the_previous_recognizer(self):
+        first, second = FakeRecognizer(['hello']), FakeRecognizer(['bonjour'])
+        pool = pronunciation_service.recognizer_pool
+
+        with mock.patch.object(pool, 'acquire', side_effect=[first, second]), \
+                mock.patch.object(pool, 'release') as release:
+            self._converse(self._scope(self.cookie), [
+                {'type': 'websocket.receive', 'text': json.dumps({'type': 'start', 'expected_text': 'Hello'})},
+                {'type': 'websocket.receive', 'text': json.dumps(
+                    {'type': 'start', 'expected_text': 'Bonjour', 'language': 'fr'})},
+                {'type': 'websocket.receive', 'text': json.dumps({'type': 'stop'})},
+            ])
+
+        self.assertEqual([(call.args[0], call.args[2]) for call in release.call_args_list],
+                         [('en', first), ('fr', second)])
+
+    def test_evaluation_of_another_user_is_rejected(self):
+        other = User.objects.create_user(username='someone-else', password='testpass123')
+        evaluation = VoiceEvaluation.objects.create(user=other, audio_file='voice_recordings/x.wav')
+
+        with mock.patch.object(pronunciation_service.recognizer_pool, 'acquire') as acquire:
+            received = self._converse(self._scope(self.cookie), [
+                {'type': 'websocket.receive', 'text': json.dumps(
+                    {'type': 'start', 'expected_text': 'Hello', 'evaluation_id': evaluation.pk})},
+            ])
+
+        acquire.assert_not_called()
+        self.assertEqual(json.loads(received[-2]['text']), {'type': 'error', 'error': 'Evaluation not found'})
+        self.assertEqual(received[-1], {'type': 'websocket.close', 'code': 4400})
+        self.assertFalse(PronunciationPractice.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class PronunciationUploadTestCase(TestCase):
+    """Tests pour le décodage en mémoire et la réutilisation des recognizers"""
+
+    def test_recognizers_are_reused_and_failed_ones_dropped(self):
+        created = []
+        pool = RecognizerPool(lambda language, rate: created.append((language, rate)) or mock.Mock())
+
+        with pool.recognizer('en') as first:
+            pass
+        with pool.recognizer('en') as second:
+            pass
+        with self.assertRaises(RuntimeError):
+            with pool.recognizer('en'):
+                raise RuntimeError('decoder crashed')
+        with pool.recognizer('en') as third:
+            pass
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, third)
+        self.assertEqual(created, [('en', TARGET_SAMPLE_RATE)] * 2)
+        first.Reset.assert_called()
+
+    def test_upload_is_decoded_in_memory(self):
+        user = User.objects.create_user(username='practicer', password='testpass123')
+        self.client.force_login(user)
+        buffer = io.BytesIO()
+        sf.write(buffer, np.zeros(44100, dtype=np.float32), 44100, format='WAV')
+        recognizer = mock.Mock()
+        recognizer.AcceptWaveform.return_value = False
+        recognizer.FinalResult.return_value = json.dumps({'text': 'bonjour'})
+
+        with mock.patch.object(pronunciation_service.recognizer_pool, 'acquire', return_value=recognizer), \
+                mock.patch('voice_eval.audio_ingest.subprocess.run') as run:
+            response = self.client.post(reverse('voice_eval:process-pronunciation'), {
+                'expected_text': 'Bonjour',
+                'language': 'fr',
+                'audio_file': SimpleUploadedFile('attempt.wav', buffer.getvalue()),
+            })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['accuracy_score'], 100.0)
+        run.assert_not_called()
+        # One second resampled to 16 kHz 16-bit PCM, fed in 4000-frame chunks
+        fed = b''.join(call.args[0] for call in recognizer.AcceptWaveform.call_args_list)
+        self.assertEqual(len(fed), TARGET_SAMPLE_RATE * 2)
+
+
+class PracticeGrammarTestCase(TestCase):
+    """Tests pour le décodage Vosk restreint au texte de l'exercice"""
+
+    def test_grammar_lists_sentence_words_and_unknown_token(self):
+        grammar = json.loads(practice_grammar("It's a test, a real TEST!"))
+
+        self.assertEqual(grammar, ["it's a test a real test", "it's", 'a', 'test', 'real', '[unk]'])
+
+    def test_recognizers_are_cached_per_grammar(self):
+        created = []
+        pool = RecognizerPool(lambda *args: created.append(args) or mock.Mock(), max_grammars=2)
+        first, second, third = (practice_grammar(text) for text in ('one', 'two', 'three'))
+
+        for grammar in (first, second, first, third, first, None):
+            with pool.recognizer('en', TARGET_SAMPLE_RATE, grammar):
+                pass
+        with pool.recognizer('en', TARGET_SAMPLE_RATE, second):
+            pass
+
+        # 'second' was the least recently used grammar when 'third' came in
+        self.assertEqual(created, [
+            ('en', TARGET_SAMPLE_RATE, first),
+            ('en', TARGET_SAMPLE_RATE, second),
+            ('en', TARGET_SAMPLE_RATE, third),
+            ('en', TARGET_SAMPLE_RATE),
+            ('en', TARGET_SAMPLE_RATE, second),
+        ])
+
+    def test_view_decodes_with_the_practice_grammar(self):
+        user = User.objects.create_user(username='grammar', password='testpass123')
+        self.client.force_login(user)
+        buffer = io.BytesIO()
+        sf.write(buffer, np.zeros(16000, dtype=np.float32), 16000, format='WAV')
+        recognizer = mock.Mock()
+        recognizer.AcceptWaveform.return_value = False
+        recognizer.FinalResult.return_value = json.dumps({'text': 'the [unk] sat'})
+
+        with mock.patch.object(pronunciation_service.recognizer_pool, 'acquire', return_value=recognizer) as acquire:
+            response = self.client.post(reverse('voice_eval:process-pronunciation'), {
+                'expected_text': 'The cat sat.',
+                'language': 'en',
+                'audio_file': SimpleUploadedFile('attempt.wav', buffer.getvalue()),
+            })
+
+        acquire.assert_called_once_with('en', TARGET_SAMPLE_RATE, practice_grammar('The cat sat.'))
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(response.json()['accuracy_score'], 100.0)
+
+    @override_settings(VOICE_EVAL_PRACTICE_GRAMMAR=False)
+    def test_grammar_can_be_disabled(self):
+        self.assertIsNone(pronunciation_service.grammar_for('The cat sat.'))
+        self.assertIsNone(pronunciation_service.grammar_for(''))
+
+
+class ResultCacheTestCase(TestCase):
+    """Tests pour le cache des transcriptions et des analyses audio"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ResultCache(root=self.root, max_bytes=2500)
+        payload = {'text': 'x' * 1000}
+        cache.set('a' * 64, payload)
+        cache.set('b' * 64, payload)
+        os.utime(cache._path('a' * 64), (1, 1))
+        os.utime(cache._path('b' * 64), (2, 2))
+        self.assertEqual(cache.get('a' * 64), payload)  # refreshes 'a'
+
+        cache.set('c' * 64, payload)
+
+        self.assertIsNotNone(cache.get('a' * 64))
+        self.assertIsNone(cache.get('b' * 64))
+        self.assertIsNotNone(cache.get('c' * 64))
+
+    def test_resubmitted_audio_skips_whisper(self):
+        cache = ResultCache(root=self.root, max_bytes=10 * 1024 * 1024)
+        samples = np.sin(np.arange(TARGET_SAMPLE_RATE) / 10).astype(np.float32)
+        whisper_result = {'text': ' Hello there ', 'language': 'en', 'segments': [
+            {'avg_logprob': np.float32(-0.1), 'text': 'Hello there'}
+        ]}
+
+        with mock.patch('voice_eval.ai_service.result_cache', cache), \
+                mock.patch.object(voice_service, 'run_whisper', return_value=whisper_result) as run_whisper:
+            first = voice_service.transcribe_audio('first.wav', 'en', audio=DecodedAudio(samples))
+            second = voice_service.transcribe_audio('again.webm', 'en', audio=DecodedAudio(samples.copy()))
+            other_language = voice_service.transcribe_audio('again.webm', 'fr', audio=DecodedAudio(samples))
+
+        self.assertEqual(run_whisper.call_count, 2)
+        self.assertEqual(second, json.loads(json.dumps(first, default=float)))
+        self.assertEqual(second['text'], 'Hello there')
+        self.assertTrue(other_language['success'])
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class CertificateBatchTestCase(TestCase):
+    """Tests pour la génération de certificats en lot"""
+
+    def test_batch_issues_qualifying_certificates_with_shared_layout(self):
+        user = User.objects.create_user(username='graduate', first_name='Ada', last_name='Lovelace')
+        for score, profile in ((92, 'accurate'), (75, 'accurate'), (55, 'accurate'), (88, 'standard')):
+            VoiceEvaluation.objects.create(
+                user=user, audio_file=SimpleUploadedFile('sample.wav', b'RIFF0000WAVE'), language='en',
+                processing_status='completed', total_score=score, estimated_level='B2',
+                transcription_profile=profile
+            )
+        output = os.path.join(TEST_MEDIA_ROOT, 'ceremony.pdf')
+
+        call_command('generate_certificates', output=output, stdout=io.StringIO(), stderr=io.StringIO())
+
+        certificates = Certificate.objects.order_by('-score')
+        self.assertEqual([c.score for c in certificates], [92, 75])
+        self.assertTrue(all(c.pdf_file for c in certificates))
+        with open(output, 'rb') as f:
+            pdf = f.read()
+        self.assertEqual(pdf.count(b'/Type /Page\n'), 2)
+        # Layout form and QR image are embedded once for the whole batch
+        self.assertEqual(pdf.count(b'/Subtype /Form'), 1)
+        self.assertEqual(pdf.count(b'/Subtype /Image'), 1)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class CertificateTranscriptionProfileTestCase(TestCase):
+    """Tests pour le profil de transcription choisi côté serveur et exigé pour les certificats"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='candidate', password='pass12345')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    @override_settings(VOICE_EVAL_BACKGROUND_PROCESSING=True, VOICE_EVAL_TRANSCRIPTION_PROFILE='standard')
+    def test_client_cannot_choose_profile(self):
+        response = self.client.post('/voice/api/evaluations/', {
+            'language': 'en', 'transcription_profile': 'fast',
+            'audio_file': SimpleUploadedFile('sample.wav', b'RIFF0000WAVE', content_type='audio/wav'),
+        })
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(VoiceEvaluation.objects.get().transcription_profile, 'standard')
+
+    @override_settings(VOICE_EVAL_BACKGROUND_PROCESSING=True)
+    def test_certificate_requires_accurate_transcription(self):
+        evaluation = VoiceEvaluation.objects.create(
+            user=self.user, audio_file=SimpleUploadedFile('sample.wav', b'RIFF0000WAVE'), language='en',
+            processing_status='completed', total_score=85, estimated_level='B2', transcription_profile='standard'
+        )
+        url = reverse('voice_eval:generate-certificate', args=[evaluation.pk])
+
+        response = self.client.get(url)
+
+        self.assertRedirects(response, reverse('voice_eval:detail', args=[evaluation.pk]), fetch_redirect_response=False)
+        self.assertFalse(Certificate.objects.exists())
+        evaluation.refresh_from_db()
+        self.assertEqual((evaluation.processing_status, evaluation.transcription_profile), ('pending', 'accurate'))
+
+        # Asking again while the re-transcription is queued does not queue it twice
+        with mock.patch.object(evaluation_processor, 'requeue') as requeue:
+            self.client.get(url)
+        requeue.assert_not_called()
+
+    @override_settings(VOICE_EVAL_BACKGROUND_PROCESSING=False)
+    def test_certificate_retranscription_never_runs_in_request(self):
+        evaluation = VoiceEvaluation.objects.create(
+            user=self.user, audio_file=SimpleUploadedFile('sample.wav', b'RIFF0000WAVE'), language='en',
+            processing_status='completed', total_score=85, estimated_level='B2', transcription_profile='standard'
+        )
+        url = reverse('voice_eval:generate-certificate', args=[evaluation.pk])
+
+        with mock.patch.object(evaluation_processor, 'run') as run, \
+                mock.patch('voice_eval.processing_service.threading.Thread') as thread:
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                response = self.client.get(url)
+            self.assertRedirects(response, reverse('voice_eval:detail', args=[evaluation.pk]),
+                                 fetch_redirect_response=False)
+            self.assertEqual(VoiceEvaluation.objects.get(pk=evaluation.pk).processing_status, 'pending')
+            thread.assert_not_called()
+
+            # Without the worker, a daemon thread processes it once the request commits
+            for callback in callbacks:
+                callback()
+        run.assert_not_called()
+        thread.assert_called_once()
+        self.assertTrue(thread.call_args.kwargs['daemon'])
+
+    def test_certificate_rerun_is_counted_once_in_progress(self):
+        evaluation = VoiceEvaluation.objects.create(
+            user=self.user, audio_file=SimpleUploadedFile('sample.wav', b'RIFF0000WAVE'), language='en',
+            processing_status='completed', total_score=85, estimated_level='B2', transcription_profile='standard'
+        )
+        progress_service.rebuild(self.user)
+
+        evaluation_processor.requeue(evaluation, 'accurate')
+        with mock.patch.object(evaluation_processor, '_run_stages'), \
+                mock.patch.object(evaluation_processor, '_index_submission'):
+            evaluation_processor.process(evaluation)
+        self.assertEqual(VoiceProgressSummary.objects.get(user=self.user).evaluation_count, 1)
+
+        # A requeued row is still counted: deleting it updates the summary
+        evaluation_processor.requeue(evaluation, 'accurate')
+        with self.captureOnCommitCallbacks(execute=True):
+            evaluation.delete()
+        self.assertEqual(VoiceProgressSummary.objects.get(user=self.user).evaluation_count, 0)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, MEDIA_ACCEL_REDIRECT_PREFIX='')
+class MediaDeliveryTestCase(TestCase):
+    """Tests pour la diffusion des fichiers médias (permissions, Range, 304)"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='pass12345')
+        User.objects.create_user(username='stranger', password='pass12345')
+        self.content = bytes(range(256)) * 4
+        self.evaluation = VoiceEvaluation.objects.create(
+            user=self.owner, audio_file=SimpleUploadedFile('take.wav', self.content), language='en'
+        )
+        self.url = settings.MEDIA_URL + self.evaluation.audio_file.name
+
+    def test_only_owner_can_download(self):
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.login(username='stranger', password='pass12345')
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+        self.client.login(username='owner', password='pass12345')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_range_and_conditional_requests(self):
+        self.client.login(username='owner', password='pass12345')
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+        self.assertEqual(b''.join(response.streaming_content), self.content[100:200])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-10:])
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=5000-').status_code, 416)
+        # Stale If-Range: the whole file is sent again
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_path_traversal_is_rejected(self):
+        self.client.login(username='owner', password='pass12345')
+        response = self.client.get(settings.MEDIA_URL + '../manage.py')
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(
+    MEDIA_ROOT=TEST_MEDIA_ROOT,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'map-tests'}},
+)
+class TestingCenterMapCacheTestCase(TestCase):
+    """Tests pour le cache des cartes de centres d'examen"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='mapper', password='pass12345')
+        self.evaluation = VoiceEvaluation.objects.create(
+            user=self.user, audio_file=SimpleUploadedFile('take.wav', b'RIFF0000WAVE'), language='en',
+            processing_status='completed', total_score=85
+        )
+        TestingCenter.objects.create(
+            name='Centre A', address='1 rue', city='Tunis', country='Tunisia',
+            latitude=36.8, longitude=10.18, languages=['en', 'fr'], certifications=['IELTS']
+        )
+        self.url = reverse('voice_eval:certificate-map', args=[self.evaluation.pk])
+        self.client.login(username='mapper', password='pass12345')
+
+    def test_map_rendered_once_until_centers_change(self):
+        with mock.patch.object(map_service, 'generate_map', return_value='<div>map</div>') as generate:
+            self.client.get(self.url)
+            self.client.get(self.url)
+            self.assertEqual(generate.call_count, 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                TestingCenter.objects.create(
+                    name='Centre B', address='2 rue', city='Sfax', country='Tunisia',
+                    latitude=34.7, longitude=10.76, languages=['en'], certifications=['TOEFL']
+                )
+            response = self.client.get(self.url)
+            self.assertEqual(generate.call_count, 2)
+            self.assertEqual(len(generate.call_args[0][0]), 2)
+            self.assertContains(response, '<div>map</div>')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'center-index-tests'}})
+class NearestTestingCenterTestCase(TestCase):
+    """Tests pour la recherche des centres d'examen les plus proches"""
+
+    CITIES = [
+        ('Tunis', 36.8065, 10.1815, ['en', 'fr']),
+        ('Sfax', 34.7406, 10.7603, ['fr']),
+        ('Paris', 48.8566, 2.3522, ['en', 'fr']),
+        ('London', 51.5074, -0.1278, ['en']),
+    ]
+
+    def setUp(self):
+        for city, latitude, longitude, languages in self.CITIES:
+            TestingCenter.objects.create(
+                name=f'Centre {city}', address='-', city=city, country='-',
+                latitude=latitude, longitude=longitude, languages=languages, certifications=[]
+            )
+        User.objects.create_user(username='traveller', password='pass12345')
+        self.client.login(username='traveller', password='pass12345')
+        self.url = reverse('voice_eval:nearest-testing-centers')
+
+    def test_chord_distance_matches_haversine(self):
+        a, b = to_unit_vectors([48.8566, 51.5074], [2.3522, -0.1278])
+        self.assertAlmostEqual(float(chord_to_km(np.linalg.norm(a - b))), 343.5, delta=1.0)
+
+    def test_nearest_centers_ranked_and_filtered_by_language(self):
+        # From Sousse: Tunis then Sfax, for any language
+        response = self.client.get(self.url, {'lat': 35.8256, 'lng': 10.6411, 'k': 2})
+        self.assertEqual([c['city'] for c in response.json()['results']], ['Tunis', 'Sfax'])
+        self.assertLess(response.json()['results'][0]['distance_km'], 150)
+
+        response = self.client.get(self.url, {'lat': 35.8256, 'lng': 10.6411, 'k': 2, 'language': 'en'})
+        self.assertEqual([c['city'] for c in response.json()['results']], ['Tunis', 'Paris'])
+
+        response = self.client.get(self.url, {'lat': 35.8256, 'lng': 10.6411, 'max_distance_km': 500})
+        self.assertEqual(response.json()['count'], 2)
+
+    def test_index_rebuilt_when_centers_change(self):
+        params = {'lat': 51.0, 'lng': 0.0, 'k': 1}
+        self.assertEqual(self.client.get(self.url, params).json()['results'][0]['city'], 'London')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TestingCenter.objects.filter(city='London').get().delete()
+        self.assertEqual(self.client.get(self.url, params).json()['results'][0]['city'], 'Paris')
+
+    def test_invalid_coordinates(self):
+        self.assertEqual(self.client.get(self.url, {'lat': 'north', 'lng': 1}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'lat': 95, 'lng': 1}).status_code, 400)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class VoiceProgressSummaryTestCase(TestCase):
+    """Tests pour le résumé de progression incrémental"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='learner', password='pass12345')
+
+    def _complete(self, total, level, verbal=50.0):
+        evaluation = VoiceEvaluation.objects.create(
+            user=self.user, audio_file=SimpleUploadedFile('take.wav', b'RIFF0000WAVE'), language='en',
+            processing_status='completed', total_score=total, verbal_score=verbal, estimated_level=level
+        )
+        progress_service.record(evaluation)
+        return evaluation
+
+    def test_record_updates_running_statistics(self):
+        self._complete(60, 'B1', verbal=40)
+        best = self._complete(80, 'B2', verbal=60)
+        self._complete(70, 'B2', verbal=80)
+
+        summary = VoiceProgressSummary.objects.get(user=self.user)
+        self.assertEqual(summary.evaluation_count, 3)
+        self.assertAlmostEqual(summary.average_scores['total_score'], 70.0)
+        self.assertAlmostEqual(summary.average_scores['verbal_score'], 60.0)
+        self.assertEqual((summary.best_score, summary.best_evaluation_id), (80, best.pk))
+        self.assertEqual((summary.latest_score, summary.previous_score, summary.improvement), (70, 80, 10))
+        self.assertEqual([(t['from'], t['to']) for t in summary.level_transitions], [('B1', 'B2')])
+
+        # A rebuild from history gives the same row
+        rebuilt = progress_service.rebuild(self.user)
+        self.assertEqual(rebuilt.average_scores, summary.average_scores)
+        self.assertEqual(rebuilt.level_transitions, summary.level_transitions)
+
+    def test_my_progress_reads_summary_and_follows_deletions(self):
+        first = self._complete(50, 'A2')
+        self._complete(90, 'C1')
+        self.client.login(username='learner', password='pass12345')
+        url = reverse('voice_eval:voice-evaluation-my-progress')
+
+        with self.assertNumQueries(5):  # session, user, summary, evaluations, history
+            statistics = self.client.get(url).json()['statistics']
+        self.assertEqual(statistics['total_evaluations'], 2)
+        self.assertEqual(statistics['average_score'], 70.0)
+        self.assertEqual(statistics['improvement'], 40.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        statistics = self.client.get(url).json()['statistics']
+        self.assertEqual((statistics['total_evaluations'], statistics['average_score']), (1, 90.0))
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class StageTimingsTestCase(TestCase):
+    """Tests pour la mesure du temps de chaque étape du traitement"""
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='ops', email='ops@example.com', password='pass12345')
+
+    def _process(self, transcription_ok=True):
+        evaluation = VoiceEvaluation.objects.create(
+            user=self.user, audio_file=SimpleUploadedFile('sample.wav', b'RIFF0000WAVE'), language='en'
+        )
+        with mock.patch('voice_eval.processing_service.voice_service') as service, \
+                mock.patch('voice_eval.processing_service.load_audio'):
+            service.transcribe_audio.return_value = (
+                {'success': True, 'text': 'hello there'} if transcription_ok else {'success': False, 'error': 'x'}
+            )
+            service.analyze_verbal_communication.return_value = {
+                'fluency_score': 60, 'vocabulary_score': 60, 'structure_score': 60, 'verbal_score': 60
+            }
+            service.analyze_paraverbal_communication.return_value = {'success': False}
+            service.check_originality.return_value = {'success': False}
+            service.calculate_language_level.return_value = 'B1'
+            service.generate_feedback.return_value = {}
+            evaluation_processor.run(evaluation)
+        evaluation.refresh_from_db()
+        return evaluation
+
+    def test_every_stage_is_timed_and_persisted(self):
+        evaluation = self._process()
+
+        self.assertEqual(evaluation.processing_status, 'completed')
+        self.assertEqual(list(evaluation.stage_timings), TIMED_STAGES)
+        for timing in evaluation.stage_timings.values():
+            self.assertGreaterEqual(timing['wall_ms'], 0)
+            self.assertGreaterEqual(timing['cpu_ms'], 0)
+
+    def test_failed_evaluation_keeps_timings_up_to_failure(self):
+        evaluation = self._process(transcription_ok=False)
+
+        self.assertEqual(evaluation.processing_status, 'failed')
+        self.assertEqual(list(evaluation.stage_timings), ['ingest', 'transcribe'])
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_percentiles_and_admin_page(self):
+        rows = stage_timing_percentiles(
+            [{'transcribe': {'wall_ms': float(ms), 'cpu_ms': ms / 2}} for ms in range(1, 101)]
+        )
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows[0]['count'], rows[0]['wall_p50'], rows[0]['cpu_p50']), (100, 50.5, 25.2))
+        self.assertEqual(rows[0]['wall_p99'], 99.0)
+
+        self._process()
+        self.client.login(username='ops', password='pass12345')
+        response = self.client.get(reverse('admin:voice_eval_voiceevaluation_stage_timings'), {'days': 30})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['stage'] for row in response.context['rows']], TIMED_STAGES)
+
+
+class BenchmarkSuiteTestCase(TestCase):
+    """Tests pour la suite de benchmarks"""
+
+    def test_fixtures_are_deterministic_and_speech_like(self):
+        audio = synthetic_speech(2)
+        self.assertEqual(len(audio), 32000)
+        np.testing.assert_array_equal(audio, synthetic_speech(2))
+        features = extract_paraverbal_metrics(audio, 16000)
+        self.assertGreater(features['voiced_ratio'], 0.2)
+        self.assertGreater(features['onset_count'], 0)
+        self.assertEqual(len(synthetic_transcript(10).split()), 25)
+
+    def test_command_writes_comparable_report(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        output = os.path.join(root, 'bench.json')
+        options = {'durations': '1', 'references': '10', 'repeat': 1, 'stderr': io.StringIO()}
+
+        call_command('benchmark_voice_eval', output=output, only='compare_texts', **options)
+        with open(output) as f:
+            baseline = json.load(f)
+        self.assertEqual([r['name'] for r in baseline['results']], ['compare_texts'])
+        self.assertEqual(baseline['results'][0]['params'], {'seconds': 1})
+
+        call_command('benchmark_voice_eval', output=output, only='originality_index', compare=output, **options)
+        with open(output) as f:
+            report = json.load(f)
+        self.assertIn('median_ms', report['results'][0])
+        self.assertEqual(report['comparison']['cases'], [])
+        self.assertEqual(len(compare_reports(baseline, baseline)), 1)
+
+
+def _token(text, pos='X', dep='dep', lemma=None, is_stop=False):
+    return SimpleNamespace(text=text, pos_=pos, dep_=dep, lemma_=lemma or text.lower(),
+                           is_stop=is_stop, is_punct=pos == 'PUNCT')
+
+
+class VerbalFeaturesTestCase(TestCase):
+    """Tests pour l'analyse verbale en une seule passe"""
+
+    TEXT = 'Students learn languages. they practice.'
+
+    def _doc(self):
+        return SimpleNamespace(sents=[
+            [_token('Students', 'NOUN', 'nsubj', 'student'), _token('learn', 'VERB', 'ROOT'),
+             _token('languages', 'NOUN', 'dobj', 'language'), _token('.', 'PUNCT', 'punct')],
+            [_token('they', 'PRON', 'nsubj', is_stop=True), _token('practice', 'VERB', 'ROOT'),
+             _token('.', 'PUNCT', 'punct')],
+        ])
+
+    def test_collects_statistics_in_one_pass(self):
+        stats = collect_verbal_stats(self._doc(), self.TEXT)
+        self.assertEqual((stats.word_count, stats.sentence_lengths, stats.sentence_count), (5, [3, 2], 2))
+        self.assertEqual((stats.content_word_count, stats.unique_content_words, stats.unique_content_lemmas), (4, 4, 4))
+        self.assertEqual(stats.average_content_word_length, 7.5)
+        self.assertEqual(stats.content_pos_tags, {'NOUN', 'VERB'})
+        self.assertEqual((stats.complete_sentences, stats.sentence_patterns, stats.well_formed_sentences), (2, 2, 1))
+
+    def test_single_and_batch_analysis_score_the_same(self):
+        doc = self._doc()
+        nlp = mock.Mock(side_effect=lambda text: doc)
+        nlp.pipe.side_effect = lambda texts, batch_size: (doc for _ in texts)
+
+        with mock.patch.object(type(voice_service), 'nlp_en', new_callable=mock.PropertyMock, return_value=nlp):
+            result = voice_service.analyze_verbal_communication(self.TEXT, 'en')
+            batch = voice_service.analyze_verbal_batch([self.TEXT, self.TEXT], 'en')
+
+        self.assertEqual(
+            (result['fluency_score'], result['vocabulary_score'], result['structure_score'], result['verbal_score']),
+            (40, 93, 95, 76)
+        )
+        self.assertEqual(result['details'], {'word_count': 5, 'sentence_count': 2, 'unique_words': 4})
+        self.assertEqual(batch, [result, result])
+        nlp.pipe.assert_called_once()
+
+    def test_batch_falls_back_without_spacy(self):
+        issues = [[], ['LOW_CONFIDENCE: 40%']]
+        with mock.patch.object(type(voice_service), 'nlp_fr', new_callable=mock.PropertyMock, return_value=None):
+            batch = voice_service.analyze_verbal_batch([self.TEXT, self.TEXT], 'fr', quality_issues=issues)
+            single = [voice_service.analyze_verbal_communication(self.TEXT, 'fr', quality_issues=i) for i in issues]
+        self.assertEqual(batch, single)
+        self.assertLess(batch[1]['verbal_score'], batch[0]['verbal_score'])
+
+
+class TextStatsTestCase(TestCase):
+    """Tests pour les statistiques de texte calculées en une passe"""
+
+    def test_filler_matcher_counts_like_str_count(self):
+        text = "euh, donc, um... you know, like, I basically uh like it, you knowwhat i mean ben benoit"
+
+        hits = FillerMatcher(FILLER_WORDS).count(text)
+
+        self.assertEqual(hits, {filler: text.count(filler) for filler in FILLER_WORDS if filler in text})
+        self.assertEqual(hits['uh'], 2)  # 'uh' and the end of 'euh'
+
+    def test_statistics_of_one_pass(self):
+        stats = text_stats("Hello world. hello again, 42 times! Um")
+
+        self.assertEqual(stats.words, ('hello', 'world', 'hello', 'again', '42', 'times', 'um'))
+        self.assertEqual(stats.sentence_lengths, (2, 4, 1))
+        self.assertEqual(stats.capitalized_sentences, 2)
+        self.assertAlmostEqual(stats.type_token_ratio, 6 / 7)
+        self.assertAlmostEqual(stats.digit_ratio, 1 / 7)
+        self.assertEqual(stats.content_words, ('hello', 'world', 'hello', 'again', 'times'))
+        self.assertEqual(stats.unique_content_count, 4)
+        self.assertEqual(stats.filler_count(), 1)
+        self.assertEqual(stats.punctuation, {'.', ',', '!'})
+        self.assertFalse(stats.has_nonsense_pattern)
+
+    def test_quality_check_and_scoring_share_the_statistics(self):
+        text_stats.cache_clear()
+        text = 'um the the the um the the the um'
+
+        issues = voice_service._check_transcription_quality(text, 0.9)
+        voice_service._analyze_verbal_simple(text, 'en', issues)
+
+        self.assertEqual(text_stats.cache_info().misses, 1)
+        self.assertEqual([issue.split(':')[0] for issue in issues], ['REPETITIVE_TEXT', 'NONSENSICAL_PATTERN'])
+
+    def test_quality_thresholds_count_whitespace_tokens(self):
+        def codes(text):
+            return [issue.split(':')[0] for issue in voice_service._check_transcription_quality(text, 0.9)]
+
+        # 7 whitespace tokens, none a number; split on \w+ this would be 4 numbers out of 9
+        phone = 'Please call 555-1234 or 555-9876 before tomorrow.'
+        self.assertEqual(text_stats(phone).words.count('555'), 2)
+        self.assertEqual(codes(phone), [])
+        self.assertEqual(codes('Room 12 and 14, then 16 17 18 please.'), ['EXCESSIVE_NUMBERS'])
+
+        # 6 distinct tokens; \w+ words would be 'la' 27 times
+        chant = 'La-la-la la-la la-la-la-la la-la-la-la-la la-la-la-la-la-la la-la-la-la-la-la-la.'
+        self.assertEqual(set(text_stats(chant).words), {'la'})
+        self.assertEqual(codes(chant), [])
+        self.assertEqual(codes('Yes yes yes yes yes yes yes no.'), ['REPETITIVE_TEXT'])
+        # Only 4 whitespace tokens: too few to judge, although \w+ finds 8 words
+        self.assertEqual(codes("well-being well-being well-being well-being."), [])
+
+    def test_spacy_fluency_counts_fillers_from_the_verbal_stats(self):
+        text = 'Um, I basically like it, you know.'
+        stats = collect_verbal_stats(SimpleNamespace(sents=[]), text)
+
+        self.assertEqual(stats.filler_count, text_stats(text).filler_count())
+        with mock.patch('voice_eval.ai_service.text_stats') as shared_stats:
+            voice_service._analyze_fluency(stats)
+        shared_stats.assert_not_called()
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class RescoreEvaluationsTestCase(TestCase):
+    """Tests pour le recalcul des scores à partir des artefacts enregistrés"""
+
+    TEXT = 'I usually practice speaking every morning. It helps me remember new words quickly.'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='rescored', password='pass12345')
+        self.features = extract_paraverbal_metrics(synthetic_speech(2), 16000)
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.checkpoint = os.path.join(self.root, 'checkpoint.json')
+
+    def _evaluation(self, **fields):
+        defaults = {'language': 'en', 'transcription': self.TEXT, 'audio_features': self.features,
+                    'originality_score': 80.0}
+        return VoiceEvaluation.objects.create(
+            user=self.user, audio_file=SimpleUploadedFile('take.wav', b'RIFF0000WAVE'),
+            processing_status='completed', **{**defaults, **fields}
+        )
+
+    def _rescore(self, **options):
+        options = {'workers': 1, 'batch_size': 1, **options}
+        call_command('rescore_voice_evaluations', checkpoint=self.checkpoint, stdout=io.StringIO(), **options)
+
+    def test_rescores_from_stored_artifacts(self):
+        stored = self._evaluation()
+        missing_features = self._evaluation(audio_features={})
+        unusable = self._evaluation(transcription='', total_score=12.0)
+        paraverbal = {**voice_service.score_paraverbal(self.features), 'duration': 2.0,
+                      'audio_features': self.features, 'success': True}
+
+        with mock.patch.object(voice_service, 'transcribe_audio') as transcribe, \
+                mock.patch.object(voice_service, 'analyze_paraverbal_communication', return_value=paraverbal) as analyze:
+            self._rescore()
+        transcribe.assert_not_called()
+        analyze.assert_called_once()
+
+        verbal = voice_service.analyze_verbal_communication(self.TEXT, 'en')
+        expected_paraverbal = voice_service.score_paraverbal(self.features)['paraverbal_score']
+        for evaluation in (stored, missing_features):
+            evaluation.refresh_from_db()
+            self.assertEqual(evaluation.verbal_score, verbal['verbal_score'])
+            self.assertEqual(evaluation.paraverbal_score, expected_paraverbal)
+            self.assertAlmostEqual(
+                evaluation.total_score, verbal['verbal_score'] * 0.4 + expected_paraverbal * 0.3 + 80.0 * 0.3
+            )
+            self.assertTrue(evaluation.estimated_level)
+            self.assertIn('overall', evaluation.feedback)
+        self.assertEqual(missing_features.duration, 2.0)
+
+        unusable.refresh_from_db()
+        self.assertEqual(unusable.total_score, 12.0)
+        self.assertEqual(VoiceProgressSummary.objects.get(user=self.user).evaluation_count, 3)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_legacy_audio_features_are_extracted_again(self):
+        legacy = {'spectral_centroid': 1800.0, 'spectral_rolloff': 3500.0, 'zero_crossing_rate': 0.08,
+                  'rms_mean': 0.05, 'rms_std': 0.02}
+        evaluation = self._evaluation(audio_features=legacy)
+        paraverbal = {**voice_service.score_paraverbal(self.features), 'duration': 2.0,
+                      'audio_features': self.features, 'success': True}
+
+        with mock.patch.object(voice_service, 'analyze_paraverbal_communication', return_value=paraverbal) as analyze:
+            self._rescore()
+
+        analyze.assert_called_once()
+        evaluation.refresh_from_db()
+        self.assertEqual(evaluation.audio_features, json.loads(json.dumps(self.features)))
+        self.assertEqual(evaluation.paraverbal_score, paraverbal['paraverbal_score'])
+
+    def test_verbal_analysis_runs_in_batches_per_language(self):
+        english = [self._evaluation(), self._evaluation()]
+        french = self._evaluation(language='fr', transcription='Je parle souvent avec mes amis le soir.')
+
+        with mock.patch.object(voice_service, 'analyze_verbal_batch', wraps=voice_service.analyze_verbal_batch) as batch, \
+                mock.patch.object(voice_service, 'analyze_verbal_communication') as single:
+            self._rescore(batch_size=10)
+        single.assert_not_called()
+        self.assertEqual(sorted((call.args[1], len(call.args[0])) for call in batch.call_args_list), [('en', 2), ('fr', 1)])
+
+        expected = {'en': voice_service.analyze_verbal_communication(self.TEXT, 'en')['verbal_score'],
+                    'fr': voice_service.analyze_verbal_communication(french.transcription, 'fr')['verbal_score']}
+        for evaluation in [*english, french]:
+            evaluation.refresh_from_db()
+            self.assertEqual(evaluation.verbal_score, expected[evaluation.language])
+
+    def test_resume_continues_after_checkpoint(self):
+        done, pending = self._evaluation(), self._evaluation()
+        with open(self.checkpoint, 'w') as f:
+            json.dump({'last_id': done.pk, 'rescored': 1, 'failed': 0,
+                       'recomputed': {'transcription': 0, 'audio_features': 0}}, f)
+
+        self._rescore(resume=True)
+
+        done.refresh_from_db()
+        pending.refresh_from_db()
+        self.assertEqual(done.total_score, 0.0)
+        self.assertGreater(pending.total_score, 0.0)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+
+class VoiceActivityTestCase(TestCase):
+    """Tests pour la détection de parole et la transcription par segments"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        sr = TARGET_SAMPLE_RATE
+
+        def tone(seconds):
+            return 0.3 * np.sin(2 * np.pi * 180 * np.arange(int(seconds * sr)) / sr)
+
+        def quiet(seconds):
+            return 0.001 * rng.standard_normal(int(seconds * sr))
+
+        # Speech at 1-3 s and 6-7.5 s
+        self.samples = np.concatenate([quiet(1), tone(2), quiet(3), tone(1.5), quiet(1)]).astype(np.float32)
+
+    def test_speech_regions_and_chunks(self):
+        regions = [(start / TARGET_SAMPLE_RATE, stop / TARGET_SAMPLE_RATE)
+                   for start, stop in detect_speech(self.samples, TARGET_SAMPLE_RATE)]
+        self.assertEqual(len(regions), 2)
+        for (start, stop), (expected_start, expected_stop) in zip(regions, [(1, 3), (6, 7.5)]):
+            self.assertAlmostEqual(start, expected_start - 0.2, delta=0.05)
+            self.assertAlmostEqual(stop, expected_stop + 0.2, delta=0.05)
+
+        chunks = speech_chunks(self.samples, TARGET_SAMPLE_RATE)
+        self.assertEqual(len(chunks), 1)
+        self.assertAlmostEqual(chunks[0].duration, 4.3, delta=0.1)
+        # The first region (0.8-3.2 s with padding) then the second (5.8-7.7 s)
+        self.assertAlmostEqual(chunks[0].source_time(1.3), 2.1, delta=0.05)
+        self.assertAlmostEqual(chunks[0].source_time(2.9), 6.25, delta=0.05)
+
+        short = speech_chunks(self.samples, TARGET_SAMPLE_RATE, max_chunk_seconds=2)
+        self.assertEqual(len(short), 3)
+        self.assertTrue(all(chunk.duration <= 2 for chunk in short))
+        self.assertEqual(speech_chunks(np.zeros(TARGET_SAMPLE_RATE, dtype=np.float32), TARGET_SAMPLE_RATE), [])
+
+    def test_transcription_skips_silence_and_maps_timestamps(self):
+        whisper_result = {'text': ' Hello. ', 'language': 'en', 'segments': [
+            {'start': 2.6, 'end': 3.0, 'text': 'Hello.',
+             'words': [{'word': 'Hello.', 'start': 2.6, 'end': 3.0, 'probability': 0.9}]}
+        ]}
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        with mock.patch('voice_eval.ai_service.result_cache', ResultCache(root=root)), \
+                mock.patch.object(voice_service, 'run_whisper', return_value=whisper_result) as run_whisper:
+            result = voice_service.transcribe_audio('take.wav', 'en', audio=DecodedAudio(self.samples))
+
+        run_whisper.assert_called_once()
+        self.assertLess(len(run_whisper.call_args.args[0]), 4.5 * TARGET_SAMPLE_RATE)
+        self.assertEqual(result['text'], 'Hello.')
+        segment = result['segments'][0]
+        self.assertAlmostEqual(segment['start'], 5.95, delta=0.05)
+        self.assertAlmostEqual(segment['words'][0]['end'], 6.35, delta=0.05)
+        self.assertAlmostEqual(result['confidence'], 0.9)
+
+
+class TranscriptionProfileTestCase(TestCase):
+    """Tests pour les profils de transcription rapide / standard / précis"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.samples = np.sin(np.arange(TARGET_SAMPLE_RATE) / 10).astype(np.float32)
+
+    def _transcribe(self, profile, whisper_result):
+        with mock.patch('voice_eval.ai_service.result_cache', ResultCache(root=self.root)), \
+                mock.patch.object(voice_service, 'run_whisper', return_value=whisper_result) as run_whisper:
+            result = voice_service.transcribe_audio('take.wav', 'en', audio=DecodedAudio(self.samples), profile=profile)
+        return result, run_whisper.call_args
+
+    def test_profiles_select_model_and_decoding(self):
+        fast, call = self._transcribe('fast', {'text': 'Hi there.', 'segments': [
+            {'start': 0.0, 'end': 1.0, 'text': 'Hi there.', 'avg_logprob': -0.5}
+        ]})
+        self.assertEqual(call.args[2], 'tiny')
+        self.assertEqual((call.kwargs['word_timestamps'], call.kwargs['temperature']), (False, 0.0))
+        self.assertAlmostEqual(fast['confidence'], np.exp(-0.5))
+        self.assertEqual(fast['profile'], 'fast')
+
+        accurate, call = self._transcribe('accurate', {'text': 'Hi there.', 'segments': [
+            {'start': 0.0, 'end': 1.0, 'text': 'Hi there.',
+             'words': [{'word': 'Hi', 'start': 0.0, 'end': 0.4, 'probability': 0.8}]}
+        ]})
+        self.assertEqual(call.args[2], 'small')
+        self.assertEqual((call.kwargs['beam_size'], call.kwargs['word_timestamps']), (5, True))
+        self.assertAlmostEqual(accurate['confidence'], 0.8)
+
+        with self.assertRaises(ValueError):
+            voice_service.transcribe_audio('take.wav', 'en', audio=DecodedAudio(self.samples), profile='turbo')
+
+    @override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+    def test_evaluation_profile_reaches_transcription(self):
+        user = User.objects.create_user(username='profiled', password='pass12345')
+        evaluation = VoiceEvaluation.objects.create(
+            user=user, audio_file=SimpleUploadedFile('take.wav', b'RIFF0000WAVE'), transcription_profile='accurate'
+        )
+        with mock.patch('voice_eval.processing_service.voice_service') as service, \
+                mock.patch('voice_eval.processing_service.load_audio'):
+            service.transcribe_audio.return_value = {'success': False, 'error': 'stop here'}
+            evaluation_processor.run(evaluation)
+        self.assertEqual(service.transcribe_audio.call_args.kwargs['profile'], 'accurate')
+
+
+class CascadedTranscriptionTestCase(TestCase):
+    """Tests pour la transcription en cascade Vosk puis Whisper"""
+
+    WORDS = [
+        {'word': 'i', 'start': 0.0, 'end': 0.2, 'conf': 0.95},
+        {'word': 'like', 'start': 0.25, 'end': 0.5, 'conf': 0.9},
+        {'word': 'tea', 'start': 0.55, 'end': 0.9, 'conf': 1.0},
+        {'word': 'every', 'start': 2.0, 'end': 2.3, 'conf': 0.9},
+        {'word': 'morning', 'start': 2.35, 'end': 2.8, 'conf': 0.95},
+    ]
+
+    def setUp(self):
+        self.audio = DecodedAudio(np.zeros(TARGET_SAMPLE_RATE, dtype=np.float32))
+
+    def _transcribe(self, words, profile='standard'):
+        vosk = {'success': True, 'text': ' '.join(w['word'] for w in words), 'words': words}
+        whisper = {'text': 'Whisper text.', 'confidence': 0.9, 'quality_issues': [], 'success': True}
+        with mock.patch.object(pronunciation_service, 'recognize_pcm', return_value=vosk) as recognize, \
+                mock.patch.object(voice_service, 'transcribe_audio', return_value=whisper) as transcribe:
+            result = voice_service.transcribe_cascaded('take.wav', 'en', audio=self.audio, profile=profile)
+        return result, recognize, transcribe
+
+    def test_confident_vosk_result_skips_whisper(self):
+        result, _, transcribe = self._transcribe(self.WORDS)
+
+        transcribe.assert_not_called()
+        self.assertEqual(result['engine'], 'vosk')
+        self.assertEqual(result['text'], 'I like tea. Every morning.')
+        self.assertEqual([s['start'] for s in result['segments']], [0.0, 2.0])
+        self.assertAlmostEqual(result['confidence'], 0.94)
+
+    @override_settings(VOICE_EVAL_CASCADE_MIN_CONFIDENCE=0.95)
+    def test_low_confidence_or_accurate_profile_uses_whisper(self):
+        result, _, transcribe = self._transcribe(self.WORDS)
+        self.assertEqual((result['engine'], result['text']), ('whisper', 'Whisper text.'))
+        transcribe.assert_called_once_with('take.wav', 'en', audio=self.audio, profile='standard')
+
+        result, recognize, _ = self._transcribe(self.WORDS, profile='accurate')
+        recognize.assert_not_called()
+        self.assertEqual(result['engine'], 'whisper')
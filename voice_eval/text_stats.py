@@ -0,0 +1,176 @@
+"""
+Surface text statistics
+Tokenizes a transcription once and derives every count the transcription
+quality check and the fallback verbal scorer read (words, sentences,
+type-token ratios, filler hits, digits, punctuation), instead of each of
+them re-lowering, re-splitting and re-scanning the text
+"""
+from __future__ import annotations
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Tuple
+
+FILLER_WORDS = ('um', 'uh', 'like', 'you know', 'basically', 'actually', 'euh', 'ben', 'donc')
+# The fallback scorer has never counted 'donc'; kept so its scores do not move
+FALLBACK_FILLER_WORDS = tuple(filler for filler in FILLER_WORDS if filler != 'donc')
+
+# Basic stop word list of the fallback scorer
+STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'been',
+    'le', 'la', 'les', 'un', 'une', 'des', 'de', 'et', 'ou', 'dans', 'sur',
+})
+
+PUNCTUATION_MARKS = frozenset('.!?,;:')
+
+WORD_RE = re.compile(r'\b\w+\b')
+SENTENCE_SPLIT_RE = re.compile(r'[.!?]+')
+# Word sequences that usually mean the recognizer was fed noise
+NONSENSE_RES = (
+    re.compile(r'\b(\w+)\s+and\s+\1\s+and\b'),  # "book and book and"
+    re.compile(r'\b(a|an|the)\s+(a|an|the)\s+(a|an|the)\b'),  # "a a the"
+    re.compile(r'\b\w{1,2}\s+\w{1,2}\s+\w{1,2}\s+\w{1,2}\s+\w{1,2}\b'),  # Too many short words
+)
+
+TEXT_STATS_CACHE_SIZE = 256
+
+
+class FillerMatcher:
+    """
+    Aho-Corasick automaton counting every filler in one scan of the text
+
+    Matches are substrings, like ``str.count``: "uh" is also found in "euh".
+    None of the fillers overlaps itself, so the counts equal summing
+    ``text.count(filler)`` over the list.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = tuple(patterns)
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for pattern in self.patterns:
+            state = 0
+            for char in pattern:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._output[state].append(pattern)
+
+        # Breadth-first failure links; each state also reports its suffixes' matches
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, child in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+                queue.append(child)
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Occurrences of each pattern in ``text`` (patterns not found are omitted)"""
+        hits = {}
+        state = 0
+        goto, fail, output = self._goto, self._fail, self._output
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern in output[state]:
+                hits[pattern] = hits.get(pattern, 0) + 1
+        return hits
+
+
+filler_matcher = FillerMatcher(FILLER_WORDS)
+
+
+@dataclass(frozen=True)
+class TextStats:
+    """Counts of one transcription; built by ``text_stats``, treat as read-only"""
+    text: str
+    words: Tuple[str, ...]  # lowercased \w+ tokens
+    tokens: Tuple[str, ...]  # lowercased whitespace tokens (the quality check's thresholds assume these)
+    sentence_lengths: Tuple[int, ...]  # whitespace tokens per sentence
+    capitalized_sentences: int
+    unique_token_count: int
+    content_words: Tuple[str, ...]  # words longer than two letters, not in STOP_WORDS
+    unique_content_count: int
+    digit_token_count: int
+    filler_hits: Dict[str, int]
+    punctuation: FrozenSet[str]  # PUNCTUATION_MARKS present in the text
+    has_nonsense_pattern: bool
+
+    @property
+    def word_count(self) -> int:
+        return len(self.words)
+
+    @property
+    def token_count(self) -> int:
+        return len(self.tokens)
+
+    @property
+    def sentence_count(self) -> int:
+        return len(self.sentence_lengths)
+
+    @property
+    def type_token_ratio(self) -> float:
+        """Distinct whitespace tokens per token"""
+        return self.unique_token_count / self.token_count if self.tokens else 0.0
+
+    @property
+    def repetition_ratio(self) -> float:
+        return 1 - self.type_token_ratio if self.tokens else 0.0
+
+    @property
+    def content_type_token_ratio(self) -> float:
+        return self.unique_content_count / len(self.content_words) if self.content_words else 0.0
+
+    @property
+    def average_content_word_length(self) -> float:
+        if not self.content_words:
+            return 0.0
+        return sum(len(word) for word in self.content_words) / len(self.content_words)
+
+    @property
+    def digit_ratio(self) -> float:
+        """Share of whitespace tokens that are numbers"""
+        return self.digit_token_count / self.token_count if self.tokens else 0.0
+
+    def filler_count(self, fillers: Iterable[str] = FILLER_WORDS) -> int:
+        """Total hits of the given fillers (a subset of FILLER_WORDS)"""
+        return sum(self.filler_hits.get(filler, 0) for filler in fillers)
+
+
+@lru_cache(maxsize=TEXT_STATS_CACHE_SIZE)
+def text_stats(text: str) -> TextStats:
+    """
+    Statistics of a transcription
+
+    Cached, so the quality check run after transcription and the verbal
+    scorers that follow share one tokenization of the same text.
+    """
+    lower = text.lower()
+    words = tuple(WORD_RE.findall(lower))
+    tokens = tuple(lower.split())
+    content_words = tuple(word for word in words if len(word) > 2 and word not in STOP_WORDS)
+    sentences = [sentence.strip() for sentence in SENTENCE_SPLIT_RE.split(text)]
+    sentences = [sentence for sentence in sentences if sentence]
+    return TextStats(
+        text=text,
+        words=words,
+        tokens=tokens,
+        sentence_lengths=tuple(len(sentence.split()) for sentence in sentences),
+        capitalized_sentences=sum(1 for sentence in sentences if sentence[0].isupper()),
+        unique_token_count=len(set(tokens)),
+        content_words=content_words,
+        unique_content_count=len(set(content_words)),
+        digit_token_count=sum(1 for token in tokens if token.isdigit()),
+        filler_hits=filler_matcher.count(lower),
+        punctuation=PUNCTUATION_MARKS.intersection(text),
+        has_nonsense_pattern=any(pattern.search(lower) for pattern in NONSENSE_RES),
+    )
@@ -15,6 +15,8 @@ urlpatterns = [
     path('api/', include(router.urls)),
     path('api/languages/', views.get_supported_languages, name='supported-languages'),
     path('api/pronunciation/process/', views.process_pronunciation_api, name='process-pronunciation'),
+    path('api/models/', views.model_registry_status, name='model-registry-status'),
+    path('api/testing-centers/nearest/', views.nearest_testing_centers, name='nearest-testing-centers'),
     
     # Web interface
     path('', views.voice_eval_home, name='home'),
@@ -0,0 +1,146 @@
+"""
+Voice activity detection
+Finds the speech regions of a decoded recording from short-frame energy and
+packs them into chunks of at most one Whisper window, so transcription time
+follows the amount of speech rather than the length of the file: leading
+and trailing dead air and long pauses are never sent to the model
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+
+# Bump when the detection changes so cached transcriptions are recomputed
+VAD_VERSION = 1
+
+FRAME_SECONDS = 0.03
+HOP_SECONDS = 0.01
+
+# A frame is speech when it is THRESHOLD_DB above the noise floor (a low
+# percentile of the frame energies); the threshold never goes above
+# SPEECH_RANGE_DB below the loud frames, so a recording without real
+# pauses is kept whole, nor below MIN_SPEECH_DB
+NOISE_PERCENTILE = 10
+PEAK_PERCENTILE = 95
+THRESHOLD_DB = 12.0
+SPEECH_RANGE_DB = 30.0
+MIN_SPEECH_DB = -50.0
+
+MIN_GAP_SECONDS = 0.3  # shorter pauses do not end a speech region
+MIN_REGION_SECONDS = 0.15  # shorter bursts (clicks, breaths) are dropped
+PAD_SECONDS = 0.2  # kept around each region so word edges are not clipped
+
+# Whisper decodes 30 s windows
+MAX_CHUNK_SECONDS = 30.0
+# Long regions are cut at the quietest frame in the last part of the window
+SPLIT_SEARCH_SECONDS = 5.0
+
+
+@dataclass
+class SpeechChunk:
+    """Speech regions transcribed together, as sample ranges of the source buffer"""
+    pieces: List[Tuple[int, int]]
+    sample_rate: int
+
+    @property
+    def duration(self) -> float:
+        return sum(stop - start for start, stop in self.pieces) / self.sample_rate
+
+    def extract(self, samples: np.ndarray) -> np.ndarray:
+        """The chunk's audio: its pieces back to back"""
+        return np.concatenate([samples[start:stop] for start, stop in self.pieces])
+
+    def source_time(self, t: float) -> float:
+        """Map a time in the chunk's audio (seconds) to the source recording"""
+        offset = 0.0
+        for start, stop in self.pieces:
+            length = (stop - start) / self.sample_rate
+            if t < offset + length:
+                return start / self.sample_rate + max(t - offset, 0.0)
+            offset += length
+        return self.pieces[-1][1] / self.sample_rate
+
+
+def frame_energy_db(y: np.ndarray, sr: int) -> np.ndarray:
+    """Energy (dBFS) of FRAME_SECONDS frames every HOP_SECONDS"""
+    frame, hop = int(FRAME_SECONDS * sr), int(HOP_SECONDS * sr)
+    y = np.asarray(y, dtype=np.float32)
+    if len(y) < frame:
+        y = np.pad(y, (0, frame - len(y)))
+    frames = np.lib.stride_tricks.sliding_window_view(y, frame)[::hop]
+    return 10 * np.log10(np.mean(frames.astype(np.float64) ** 2, axis=1) + 1e-10)
+
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """(start, stop) indices of the True runs of a boolean array"""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    starts, stops = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    return [(int(start), int(stop)) for start, stop in zip(starts, stops)]
+
+
+def detect_speech(y: np.ndarray, sr: int) -> List[Tuple[int, int]]:
+    """
+    Speech regions of a recording
+
+    Returns:
+        Non-overlapping (start, stop) sample ranges, padded by PAD_SECONDS
+    """
+    if len(y) == 0:
+        return []
+    energy = frame_energy_db(y, sr)
+    threshold = min(
+        np.percentile(energy, NOISE_PERCENTILE) + THRESHOLD_DB,
+        np.percentile(energy, PEAK_PERCENTILE) - SPEECH_RANGE_DB,
+    )
+    speech = energy > max(threshold, MIN_SPEECH_DB)
+
+    # Bridge short pauses, then drop isolated bursts
+    hop = int(HOP_SECONDS * sr)
+    for start, stop in _runs(~speech):
+        if start > 0 and stop < len(speech) and (stop - start) * HOP_SECONDS < MIN_GAP_SECONDS:
+            speech[start:stop] = True
+    frame, pad = int(FRAME_SECONDS * sr), int(PAD_SECONDS * sr)
+    regions = []
+    for start, stop in _runs(speech):
+        if (stop - start) * HOP_SECONDS < MIN_REGION_SECONDS:
+            continue
+        begin, end = max(start * hop - pad, 0), min((stop - 1) * hop + frame + pad, len(y))
+        if regions and begin <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((begin, end))
+    return regions
+
+
+def speech_chunks(y: np.ndarray, sr: int, max_chunk_seconds: float = MAX_CHUNK_SECONDS) -> List[SpeechChunk]:
+    """
+    Speech regions packed into chunks of at most ``max_chunk_seconds``
+
+    Consecutive regions share a chunk while they fit (the silence between
+    them is left out); a region longer than a chunk is cut at its quietest
+    frame near the limit.
+    """
+    max_samples = int(max_chunk_seconds * sr)
+    search = int(min(SPLIT_SEARCH_SECONDS, max_chunk_seconds / 2) * sr)
+    hop = int(HOP_SECONDS * sr)
+    pieces = []
+    for start, stop in detect_speech(y, sr):
+        while stop - start > max_samples:
+            window = y[start + max_samples - search:start + max_samples]
+            quietest = int(np.argmin(frame_energy_db(window, sr))) * hop
+            cut = start + max_samples - search + quietest
+            pieces.append((start, cut))
+            start = cut
+        pieces.append((start, stop))
+
+    chunks, current, length = [], [], 0
+    for start, stop in pieces:
+        if current and length + stop - start > max_samples:
+            chunks.append(SpeechChunk(current, sr))
+            current, length = [], 0
+        current.append((start, stop))
+        length += stop - start
+    if current:
+        chunks.append(SpeechChunk(current, sr))
+    return chunks
@@ -0,0 +1,76 @@
+"""
+Verbal feature extraction
+Walks a parsed spaCy document once and collects every token and sentence
+statistic the fluency, vocabulary and structure scorers need, instead of
+each scorer re-iterating the document and rebuilding its sentence list
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import List, Set
+
+from .text_stats import filler_matcher
+
+# Dependency labels counted as a sentence subject
+SUBJECT_DEPS = frozenset({'nsubj', 'nsubjpass'})
+
+
+@dataclass
+class VerbalStats:
+    """Token and sentence statistics of one transcription"""
+    text: str = ''
+    word_count: int = 0  # non-punctuation tokens
+    sentence_lengths: List[int] = field(default_factory=list)  # non-punctuation tokens per sentence
+    content_word_count: int = 0  # non-punctuation, non-stop-word tokens
+    content_word_chars: int = 0
+    unique_content_words: int = 0  # distinct lowercased texts
+    unique_content_lemmas: int = 0  # distinct lowercased lemmas
+    content_pos_tags: Set[str] = field(default_factory=set)
+    complete_sentences: int = 0  # with a verb and a subject
+    sentence_patterns: int = 0  # distinct first-five-POS patterns
+    well_formed_sentences: int = 0  # capitalized and ending with punctuation
+    filler_count: int = 0  # FILLER_WORDS hits in the text
+
+    @property
+    def sentence_count(self) -> int:
+        return len(self.sentence_lengths)
+
+    @property
+    def average_content_word_length(self) -> float:
+        return self.content_word_chars / self.content_word_count if self.content_word_count else 0.0
+
+
+def collect_verbal_stats(doc, text: str) -> VerbalStats:
+    """Single pass over a parsed document"""
+    stats = VerbalStats(text=text, filler_count=sum(filler_matcher.count(text.lower()).values()))
+    content_words, content_lemmas, patterns = set(), set(), set()
+
+    for sent in doc.sents:
+        length = 0
+        has_verb = has_subject = False
+        pattern = []
+        for token in sent:
+            if token.is_punct:
+                continue
+            length += 1
+            pos = token.pos_
+            if len(pattern) < 5:
+                pattern.append(pos)
+            has_verb = has_verb or pos == 'VERB'
+            has_subject = has_subject or token.dep_ in SUBJECT_DEPS
+            if not token.is_stop:
+                stats.content_word_count += 1
+                stats.content_word_chars += len(token.text)
+                content_words.add(token.text.lower())
+                content_lemmas.add(token.lemma_.lower())
+                stats.content_pos_tags.add(pos)
+
+        stats.sentence_lengths.append(length)
+        stats.word_count += length
+        stats.complete_sentences += has_verb and has_subject
+        patterns.add('-'.join(pattern))
+        stats.well_formed_sentences += bool(sent[0].text[:1].isupper() and sent[-1].is_punct)
+
+    stats.unique_content_words = len(content_words)
+    stats.unique_content_lemmas = len(content_lemmas)
+    stats.sentence_patterns = len(patterns)
+    return stats
@@ -7,6 +7,7 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from django.contrib.auth.decorators import login_required
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
+from django.conf import settings
 import os
 import sys
 
@@ -19,16 +20,22 @@ from .serializers import (
     VoiceEvaluationSerializer, 
     VoiceEvaluationCreateSerializer,
     VoiceEvaluationDetailSerializer,
+    VoiceEvaluationStatusSerializer,
     ReferenceTextSerializer,
     VoiceEvaluationHistorySerializer,
     CertificateSerializer,
     PronunciationPracticeSerializer,
-    TestingCenterSerializer
+    TestingCenterSerializer,
+    VoiceProgressSummarySerializer
 )
 from .ai_service import voice_service
-from .certificate_service import certificate_generator
+from .certificate_service import certificate_generator, CERTIFICATE_MIN_SCORE, CERTIFICATE_TRANSCRIPTION_PROFILE
 from .pronunciation_service import pronunciation_service
 from .map_service import map_service
+from .center_index import center_index
+from .progress_service import progress_service
+from .processing_service import evaluation_processor
+from .model_registry import model_registry
 
 
 class VoiceEvaluationViewSet(viewsets.ModelViewSet):
@@ -87,8 +94,12 @@ class VoiceEvaluationViewSet(viewsets.ModelViewSet):
             
             logger.error("Step 3: Saving evaluation")
             print("Step 3: Saving evaluation", file=sys.stderr)
-            # Create the evaluation object
-            evaluation = serializer.save(user=request.user, processing_status='pending')
+            # Create the evaluation object (the transcription profile is not the client's choice)
+            evaluation = serializer.save(
+                user=request.user, processing_status='pending',
+                transcription_profile=getattr(settings, 'VOICE_EVAL_TRANSCRIPTION_PROFILE',
+                                              voice_service.DEFAULT_TRANSCRIPTION_PROFILE),
+            )
             print(f"Step 4: Evaluation created with ID: {evaluation.id}", file=sys.stderr)
             sys.stderr.flush()
         except Exception as e:
@@ -107,12 +118,19 @@ class VoiceEvaluationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
         
-        # Process the audio asynchronously (or synchronously for now)
+        # Background mode: hand the evaluation over to the worker and return immediately
+        if getattr(settings, 'VOICE_EVAL_BACKGROUND_PROCESSING', False):
+            output_serializer = VoiceEvaluationStatusSerializer(evaluation, context={'request': request})
+            return Response(
+                output_serializer.data,
+                status=status.HTTP_202_ACCEPTED,
+                headers={'Location': output_serializer.data['status_url']}
+            )
+        
+        # Inline mode: process the audio synchronously
         try:
             print("Step 5: Starting processing")
             self._process_evaluation(evaluation)
-            evaluation.processing_status = 'completed'
-            evaluation.save()
             print("Step 6: Processing completed successfully")
         except Exception as e:
             error_details = traceback.format_exc()
@@ -121,9 +139,7 @@ class VoiceEvaluationViewSet(viewsets.ModelViewSet):
             print(error_details)
             print("="*80)
             sys.stdout.flush()
-            evaluation.processing_status = 'failed'
-            evaluation.error_message = str(e)
-            evaluation.save()
+            evaluation_processor.mark_failed(evaluation, e)
             return Response(
                 {'error': f'Processing failed: {str(e)}', 'details': error_details},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -136,124 +152,20 @@ class VoiceEvaluationViewSet(viewsets.ModelViewSet):
     
     def _process_evaluation(self, evaluation):
         """Process the voice evaluation"""
-        import traceback
-        
-        try:
-            evaluation.processing_status = 'processing'
-            evaluation.save()
-            
-            audio_path = evaluation.audio_file.path
-            language = evaluation.language
-            
-            print(f"Processing evaluation: {evaluation.id}")
-            print(f"Audio path: {audio_path}")
-            print(f"Language: {language}")
-            
-        except Exception as e:
-            print(f"Error in _process_evaluation setup: {traceback.format_exc()}")
-            raise
-        
-        # Step 1: Transcribe audio
-        transcription_result = voice_service.transcribe_audio(audio_path, language)
-        if not transcription_result.get('success'):
-            raise Exception(f"Transcription failed: {transcription_result.get('error')}")
-        
-        evaluation.transcription = transcription_result['text']
-        
-        # Check transcription quality
-        quality_issues = transcription_result.get('quality_issues', [])
-        confidence = transcription_result.get('confidence', 1.0)
-        
-        # Step 2: Analyze verbal communication (pass quality issues)
-        verbal_result = voice_service.analyze_verbal_communication(
-            transcription_result['text'],
-            language,
-            quality_issues=quality_issues
-        )
-        evaluation.fluency_score = verbal_result['fluency_score']
-        evaluation.vocabulary_score = verbal_result['vocabulary_score']
-        evaluation.structure_score = verbal_result['structure_score']
-        evaluation.verbal_score = verbal_result['verbal_score']
-        
-        # Store quality warnings in feedback
-        if 'quality_warning' in verbal_result:
-            if not evaluation.feedback:
-                evaluation.feedback = {}
-            evaluation.feedback['transcription_quality'] = {
-                'confidence': round(confidence * 100, 1),
-                'issues': quality_issues,
-                'warning': verbal_result['quality_warning']
-            }
-        
-        # Step 3: Analyze paraverbal communication
-        paraverbal_result = voice_service.analyze_paraverbal_communication(audio_path)
-        if paraverbal_result.get('success'):
-            evaluation.pitch_score = paraverbal_result['pitch_score']
-            evaluation.pace_score = paraverbal_result['pace_score']
-            evaluation.energy_score = paraverbal_result['energy_score']
-            evaluation.paraverbal_score = paraverbal_result['paraverbal_score']
-            evaluation.duration = paraverbal_result['duration']
-            evaluation.audio_features = paraverbal_result['audio_features']
-        
-        # Step 4: Check originality
-        reference_texts = ReferenceText.objects.filter(language=language).values(
-            'theme', 'text', 'embedding', 'language'
-        )
-        originality_result = voice_service.check_originality(
-            transcription_result['text'],
-            language,
-            list(reference_texts)
-        )
-        if originality_result.get('success'):
-            evaluation.originality_score = originality_result['originality_score']
-        
-        # Step 5: Calculate total score
-        # Weights: Verbal 40%, Paraverbal 30%, Originality 30%
-        evaluation.total_score = (
-            evaluation.verbal_score * 0.4 +
-            evaluation.paraverbal_score * 0.3 +
-            evaluation.originality_score * 0.3
-        )
-        
-        # Step 6: Determine language level
-        scores = {
-            'total_score': evaluation.total_score,
-            'verbal_score': evaluation.verbal_score,
-            'paraverbal_score': evaluation.paraverbal_score,
-            'originality_score': evaluation.originality_score,
-            'fluency_score': evaluation.fluency_score,
-            'vocabulary_score': evaluation.vocabulary_score,
-            'structure_score': evaluation.structure_score,
-            'pitch_score': evaluation.pitch_score,
-            'pace_score': evaluation.pace_score,
-        }
-        evaluation.estimated_level = voice_service.calculate_language_level(scores)
-        
-        # Step 7: Generate feedback
-        evaluation.feedback = voice_service.generate_feedback(scores, language)
-        
-        # Step 8: Update user's level if improved
-        user = evaluation.user
-        old_level = user.level
-        
-        # Update user level based on evaluation
-        level_mapping = {'A1': 'weak', 'A2': 'weak', 'B1': 'medium', 'B2': 'medium', 'C1': 'advanced', 'C2': 'advanced'}
-        new_level = level_mapping.get(evaluation.estimated_level, user.level)
-        
-        if new_level != old_level:
-            user.level = new_level
-            user.save()
-            
-            # Create history record
-            VoiceEvaluationHistory.objects.create(
-                user=user,
-                evaluation=evaluation,
-                previous_level=old_level,
-                new_level=new_level,
-                improvement_score=evaluation.total_score
-            )
-        
-        evaluation.save()
+        return evaluation_processor.process(evaluation)
+    
+    @action(detail=True, methods=['get'], url_path='status', url_name='status')
+    def processing_status(self, request, pk=None):
+        """
+        Get processing status and per-stage progress of an evaluation
+        
+        Returns immediately; clients poll it every second or two while the
+        evaluation is pending or processing (a request held open here would
+        tie up a worker thread).
+        """
+        evaluation = self.get_object()
+        serializer = VoiceEvaluationStatusSerializer(evaluation, context={'request': request})
+        return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def my_progress(self, request):
@@ -262,30 +174,25 @@ class VoiceEvaluationViewSet(viewsets.ModelViewSet):
         evaluations = VoiceEvaluation.objects.filter(
             user=user,
             processing_status='completed'
-        ).order_by('-created_at')[:10]
+        ).select_related('user').order_by('-created_at')[:10]
         
         history = VoiceEvaluationHistory.objects.filter(user=user).order_by('-created_at')[:5]
         
-        # Calculate statistics
-        if evaluations.exists():
-            avg_score = sum(e.total_score for e in evaluations) / len(evaluations)
-            latest_score = evaluations[0].total_score
-            improvement = latest_score - evaluations[-1].total_score if len(evaluations) > 1 else 0
-        else:
-            avg_score = 0
-            latest_score = 0
-            improvement = 0
+        # Statistics come from the incrementally maintained summary row
+        summary = progress_service.get_summary(user)
         
         return Response({
             'evaluations': VoiceEvaluationSerializer(evaluations, many=True).data,
             'history': VoiceEvaluationHistorySerializer(history, many=True).data,
             'statistics': {
-                'total_evaluations': evaluations.count(),
-                'average_score': round(avg_score, 2),
-                'latest_score': round(latest_score, 2),
-                'improvement': round(improvement, 2),
+                'total_evaluations': summary.evaluation_count,
+                'average_score': round(summary.average_scores.get('total_score', 0.0), 2),
+                'latest_score': round(summary.latest_score, 2),
+                'best_score': round(summary.best_score, 2),
+                'improvement': round(summary.improvement, 2),
                 'current_level': user.level or 'Not set'
-            }
+            },
+            'progress': VoiceProgressSummarySerializer(summary).data,
         })
 
 
@@ -313,6 +220,55 @@ class ReferenceTextViewSet(viewsets.ModelViewSet):
         )
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def model_registry_status(request):
+    """Load times and memory estimates of the ML models loaded in this worker"""
+    models = model_registry.report()
+    return Response({
+        'pid': os.getpid(),
+        'models': models,
+        'total_rss_delta_mb': round(sum(m['rss_delta_mb'] for m in models), 1),
+    })
+
+
+MAX_NEAREST_CENTERS = 50
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def nearest_testing_centers(request):
+    """
+    The k nearest active testing centers to a location
+
+    Query parameters: lat, lng, language (optional), k (default 5),
+    max_distance_km (optional)
+    """
+    try:
+        latitude = float(request.query_params['lat'])
+        longitude = float(request.query_params['lng'])
+        k = min(int(request.query_params.get('k', 5)), MAX_NEAREST_CENTERS)
+        max_distance = request.query_params.get('max_distance_km')
+        max_distance = float(max_distance) if max_distance else None
+    except (KeyError, ValueError):
+        return Response(
+            {'error': 'lat and lng are required numbers; k and max_distance_km must be numbers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return Response({'error': 'Coordinates out of range'}, status=status.HTTP_400_BAD_REQUEST)
+
+    language = request.query_params.get('language') or None
+    nearest = center_index.nearest(latitude, longitude, language=language, k=k, max_distance_km=max_distance)
+    centers = TestingCenter.objects.in_bulk([center_id for center_id, _ in nearest])
+
+    results = []
+    for center_id, distance in nearest:
+        if center_id in centers:  # deleted since the index was built
+            results.append({**TestingCenterSerializer(centers[center_id]).data, 'distance_km': distance})
+    return Response({'count': len(results), 'results': results})
+
+
 # Traditional Django views for web interface
 @login_required
 def voice_eval_home(request):
@@ -323,6 +279,7 @@ def voice_eval_home(request):
     
     context = {
         'evaluations': evaluations,
+        'progress': progress_service.get_summary(request.user),
         'user': request.user
     }
     return render(request, 'voice_eval/home.html', context)
@@ -366,9 +323,10 @@ def get_supported_languages(request):
 @login_required
 def generate_certificate_view(request, evaluation_id):
     """Generate certificate for high-scoring evaluation"""
-    from django.http import Http404, HttpResponse
+    from django.http import Http404
     from django.contrib import messages
     from django.core.files.base import ContentFile
+    from main.media import serve_file
     
     try:
         evaluation = VoiceEvaluation.objects.get(pk=evaluation_id, user=request.user)
@@ -376,10 +334,23 @@ def generate_certificate_view(request, evaluation_id):
         raise Http404("Evaluation not found")
     
     # Check if score qualifies for certificate (70+)
-    if evaluation.total_score < 70:
+    if evaluation.total_score < CERTIFICATE_MIN_SCORE:
         messages.error(request, 'Certificate is only available for scores of 70 or higher.')
         return redirect('voice_eval:detail', pk=evaluation_id)
     
+    # Certified scores must come from the accurate transcription: re-transcribe first
+    if evaluation.transcription_profile != CERTIFICATE_TRANSCRIPTION_PROFILE:
+        if evaluation.processing_status in ('pending', 'processing'):
+            messages.info(request, 'Your recording is still being processed. Please try again in a moment.')
+            return redirect('voice_eval:detail', pk=evaluation_id)
+        # Never transcribe in the request: the worker (or a detached thread) picks it up
+        evaluation_processor.requeue(evaluation, CERTIFICATE_TRANSCRIPTION_PROFILE)
+        if not getattr(settings, 'VOICE_EVAL_BACKGROUND_PROCESSING', False):
+            evaluation_processor.run_detached(evaluation)
+        messages.info(request, 'Certificates require a certificate-grade transcription: your recording is '
+                               'being transcribed again. Download your certificate once the new score is ready.')
+        return redirect('voice_eval:detail', pk=evaluation_id)
+    
     # Check if certificate already exists
     try:
         certificate = Certificate.objects.get(evaluation=evaluation)
@@ -437,15 +408,18 @@ def generate_certificate_view(request, evaluation_id):
             traceback.print_exc()
             raise Http404(f"Error generating certificate: {str(e)}")
     
-    # Return PDF response
+    # Stream the stored PDF (conditional GET and Range supported)
     if certificate.pdf_file and certificate.pdf_file.name:
         try:
-            pdf_file = certificate.pdf_file.open('rb')
-            response = HttpResponse(pdf_file.read(), content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="GenEx_Certificate_{request.user.username}.pdf"'
-            pdf_file.close()
-            return response
-        except Exception as e:
+            return serve_file(
+                request,
+                certificate.pdf_file.path,
+                filename=f'GenEx_Certificate_{request.user.username}.pdf',
+                as_attachment=True,
+                content_type='application/pdf',
+                relative_path=certificate.pdf_file.name,
+            )
+        except OSError as e:
             raise Http404(f"Error reading certificate file: {str(e)}")
     else:
         raise Http404("Certificate file not found")
@@ -472,8 +446,8 @@ def certificate_map_view(request, evaluation_id):
     all_centers = TestingCenter.objects.filter(is_active=True)
     centers_list = [c for c in all_centers if evaluation.language in c.languages]
     
-    # Generate map (pass list, not QuerySet)
-    map_html = map_service.generate_map(centers_list)
+    # Rendered once per (language, centers version), see map_service
+    map_html = map_service.get_language_map(evaluation.language, centers_list)
     
     context = {
         'evaluation': evaluation,
@@ -531,61 +505,35 @@ def process_pronunciation_api(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Save audio file temporarily
-    import tempfile
-    import os
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_file:
-        for chunk in audio_file.chunks():
-            temp_file.write(chunk)
-        temp_path = temp_file.name
+    # Decode the upload in memory (no temporary files)
+    transcription_result = pronunciation_service.transcribe_bytes(audio_file.read(), language, expected_text)
     
-    try:
-        # Transcribe audio
-        transcription_result = pronunciation_service.transcribe_audio(temp_path, language)
-        
-        if not transcription_result['success']:
-            return Response(
-                {'error': transcription_result.get('error', 'Transcription failed')},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-        
-        spoken_text = transcription_result['text']
-        
-        # Compare texts
-        comparison_result = pronunciation_service.compare_texts(expected_text, spoken_text)
-        
-        # Create pronunciation practice record
-        practice = PronunciationPractice.objects.create(
-            user=request.user,
-            evaluation_id=evaluation_id if evaluation_id else None,
-            expected_text=expected_text,
-            spoken_text=spoken_text,
-            comparison_data=comparison_result,
-            accuracy_score=comparison_result['accuracy_score'],
-            matched_words=comparison_result['matched_words'],
-            total_words=comparison_result['total_words']
+    if not transcription_result['success']:
+        return Response(
+            {'error': transcription_result.get('error', 'Transcription failed')},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
-        
-        # Save audio file
-        from django.core.files.base import ContentFile
-        with open(temp_path, 'rb') as f:
-            practice.audio_file.save(f'practice_{practice.id}.wav', ContentFile(f.read()))
-        
-        return Response({
-            'success': True,
-            'practice_id': practice.id,
-            'spoken_text': spoken_text,
-            'comparison': comparison_result['comparison'],
-            'accuracy_score': comparison_result['accuracy_score'],
-            'matched_words': comparison_result['matched_words'],
-            'total_words': comparison_result['total_words']
-        })
-        
-    finally:
-        # Clean up temp file
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+    
+    spoken_text = transcription_result['text']
+    
+    # Compare texts
+    comparison_result = pronunciation_service.compare_texts(expected_text, spoken_text)
+    
+    # Create pronunciation practice record with the normalized 16 kHz WAV
+    practice = pronunciation_service.save_practice(
+        request.user, expected_text, spoken_text, comparison_result,
+        evaluation_id=evaluation_id, audio_content=transcription_result['wav']
+    )
+    
+    return Response({
+        'success': True,
+        'practice_id': practice.id,
+        'spoken_text': spoken_text,
+        'comparison': comparison_result['comparison'],
+        'accuracy_score': comparison_result['accuracy_score'],
+        'matched_words': comparison_result['matched_words'],
+        'total_words': comparison_result['total_words']
+    })
 
 
 @login_required